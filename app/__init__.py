@@ -1,3 +1,6 @@
+import os
+
+import click
 from flask import Flask, session
 from .config import Config
 
@@ -11,11 +14,72 @@ def create_app():
     app.config['SESSION_COOKIE_PATH'] = '/'
     app.config['SESSION_COOKIE_DOMAIN'] = None
 
-    @app.before_request
-    def make_session_permanent():
-        session.permanent = True
+    # Server-side sessies (memory/sqlite) regelen hun vervaldatum zelf via sliding expiry;
+    # de standaard cookie-sessie blijft permanent zoals voorheen
+    from .sessions import create_session_interface
+
+    session_interface = create_session_interface(app.config)
+    if session_interface is not None:
+        app.session_interface = session_interface
+    else:
+
+        @app.before_request
+        def make_session_permanent():
+            session.permanent = True
+
+    # Dataversies van de dashboardcache delen tussen workers (zie app/cache.py)
+    from .cache import data_versions
+
+    if app.config.get("DATA_VERSIONS_BACKEND") == "sqlite":
+        data_versions.use_sqlite(instance_file(app, "DATA_VERSIONS_PATH", "data_versions.db"))
+    else:
+        data_versions.use_memory()
+
+    # Publisher voor de live updates (zie app/events.py)
+    from .events import configure_event_bus
+
+    if app.config.get("EVENTS_BACKEND") == "sqlite":
+        app.config["EVENTS_SQLITE_PATH"] = instance_file(app, "EVENTS_SQLITE_PATH", "events.db")
+    configure_event_bus(app.config)
+
+    # Query-telling/-timing per request, Server-Timing header en /metrics
+    from .instrumentation import install_instrumentation
+
+    install_instrumentation(app)
 
     from .routes import bp
     app.register_blueprint(bp)
 
-    return app
\ No newline at end of file
+    # Herbouw de maandelijkse tonnage-rollup: flask --app run rebuild-stats
+    @app.cli.command("rebuild-stats")
+    @click.option("--company-id", type=int, default=None, help="Enkel dit bedrijf herbouwen.")
+    def rebuild_stats_command(company_id):
+        from .routes.routes import rebuild_order_stats
+
+        row_count = rebuild_order_stats(company_id)
+        click.echo(f"{row_count} rollup-rijen geschreven.")
+
+    # Vul de lokale SQLite-database met testdata: STORAGE_BACKEND=sqlite flask --app run seed-local
+    @app.cli.command("seed-local")
+    @click.option("--orders", type=int, default=100_000, help="Aantal orders.")
+    @click.option("--companies", type=int, default=5, help="Aantal bedrijven.")
+    @click.option("--drivers", type=int, default=20, help="Chauffeurs per bedrijf.")
+    @click.option("--clients", type=int, default=1000, help="Aantal klanten.")
+    def seed_local_command(orders, companies, drivers, clients):
+        from .config import supabase
+        from .storage.sqlite_backend import seed_demo_data
+
+        if app.config.get("STORAGE_BACKEND") != "sqlite" or supabase is None:
+            raise click.ClickException("seed-local werkt enkel met STORAGE_BACKEND=sqlite.")
+        seed_demo_data(supabase, companies, drivers, clients, orders)
+        click.echo(f"{orders} orders toegevoegd aan {supabase.path}.")
+
+    return app
+
+
+# Pad uit de config, of standaard een bestand in de instance-map van de app
+def instance_file(app, key, filename):
+    if app.config.get(key):
+        return app.config[key]
+    os.makedirs(app.instance_path, exist_ok=True)
+    return os.path.join(app.instance_path, filename)
\ No newline at end of file
@@ -1,17 +1,229 @@
-from datetime import datetime, date
-from typing import List, Dict, Optional
+import heapq
+import threading
+from array import array
+from datetime import datetime, date, timedelta, timezone
+from typing import List, Dict, Optional, Tuple
 
 WORKDAY_HOURS = 12.0
 TRAVEL_TIME_HOURS = 0.75
 
-def calculate_priority_score(order: Dict) -> float:
-    score = 0.0
-    if order.get('deadline'):
-        try:
-            deadline = datetime.strptime(order['deadline'], '%Y-%m-%d').date()
-            today = datetime.now().date()
-            days_until_deadline = (deadline - today).days
-            
+DEADLINE_MISSING = 0
+DEADLINE_INVALID = -1
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROS_PER_DAY = 86_400_000_000
+
+STATUS_CODES = {'pending': 0, 'accepted': 1, 'completed': 2}
+_STATUS_UNKNOWN = -1
+_NO_ID = -1
+DEFAULT_HORIZON_DAYS = 90
+# Decimalen waarop opgetelde uren in WorkloadIndex afgerond worden
+HOURS_PRECISION = 9
+# Resolutie van de capaciteit in CapacityPlan (hele eenheden per uur)
+CAPACITY_UNITS_PER_HOUR = 1_000_000
+
+class Order:
+    # Genormaliseerde order: gewicht, taaktype, status en datums worden één
+    # keer geparst bij het laden, zodat de algoritmes in hun lussen geen
+    # strings meer hoeven te parsen. get() leest uit de oorspronkelijke rij.
+    __slots__ = (
+        'id', 'driver_id', 'status', 'task_type_id', 'weight', 'deadline',
+        'deadline_invalid', 'created_at', 'custom_time_per_1000kg', 'priority_score', 'raw',
+    )
+
+    def __init__(self, id=None, driver_id=None, status=None, task_type_id=None, weight: float = 0.0,
+                 deadline: Optional[date] = None, deadline_invalid: bool = False,
+                 created_at: Optional[datetime] = None, custom_time_per_1000kg: Optional[float] = None,
+                 raw: Optional[Dict] = None):
+        self.id = id
+        self.driver_id = driver_id
+        self.status = status
+        self.task_type_id = task_type_id
+        self.weight = weight
+        self.deadline = deadline
+        self.deadline_invalid = deadline_invalid
+        self.created_at = created_at
+        self.custom_time_per_1000kg = custom_time_per_1000kg
+        self.priority_score = None
+        self.raw = raw if raw is not None else {}
+
+    @classmethod
+    def from_dict(cls, row: Dict) -> 'Order':
+        deadline_value = row.get('deadline')
+        deadline = parse_deadline_date(deadline_value)
+        status = row.get('status')
+        return cls(
+            id=row.get('id'),
+            driver_id=row.get('driver_id'),
+            status=status.strip().lower() if isinstance(status, str) else status,
+            task_type_id=_parse_task_type_id(row.get('task_type_id')),
+            weight=_parse_weight(row.get('Weight') or row.get('weight')),
+            deadline=deadline,
+            deadline_invalid=bool(deadline_value) and deadline is None,
+            created_at=_parse_created_at(row.get('created_at')),
+            custom_time_per_1000kg=row.get('_custom_time_per_1000kg'),
+            raw=row,
+        )
+
+    def get(self, key: str, default=None):
+        return self.raw.get(key, default)
+
+    @property
+    def deadline_ordinal(self) -> int:
+        if self.deadline is not None:
+            return self.deadline.toordinal()
+        return DEADLINE_INVALID if self.deadline_invalid else DEADLINE_MISSING
+
+    @property
+    def created_at_micros(self) -> Optional[int]:
+        if self.created_at is None:
+            return None
+        return (self.created_at - _EPOCH) // timedelta(microseconds=1)
+
+
+def _parse_weight(weight) -> float:
+    if not weight:
+        return 0.0
+    try:
+        return float(weight)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _parse_task_type_id(task_type_id) -> Optional[int]:
+    if task_type_id is None or task_type_id == '':
+        return None
+    try:
+        return int(task_type_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _parse_created_at(created_at) -> Optional[datetime]:
+    # Naïeve tijdstippen gelden als lokale tijd
+    if not created_at:
+        return None
+    if isinstance(created_at, datetime):
+        return created_at if created_at.tzinfo else created_at.astimezone()
+    try:
+        parsed = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+    except (ValueError, TypeError, AttributeError):
+        return None
+    return parsed if parsed.tzinfo else parsed.astimezone()
+
+
+def as_order(order) -> Order:
+    return order if isinstance(order, Order) else Order.from_dict(order)
+
+
+class OrderBatch:
+    # Kolomopslag voor veel orders (typed arrays, ~37 bytes per order) die
+    # eenmaal per request wordt opgebouwd en door workload-, beschikbaarheids-
+    # en suggestiefuncties gedeeld wordt. Ontbrekende id's zijn _NO_ID,
+    # deadlines zijn ordinals of DEADLINE_MISSING/DEADLINE_INVALID.
+    # Een _custom_time_per_1000kg op een rij wordt niet overgenomen.
+    __slots__ = ('ids', 'driver_ids', 'statuses', 'deadlines', 'task_type_ids', 'weights')
+
+    def __init__(self):
+        self.ids = array('q')
+        self.driver_ids = array('q')
+        self.statuses = array('b')
+        self.deadlines = array('i')
+        self.task_type_ids = array('q')
+        self.weights = array('d')
+
+    @classmethod
+    def from_orders(cls, orders: List) -> 'OrderBatch':
+        batch = cls()
+        for order in orders:
+            batch.append(order)
+        return batch
+
+    def append(self, order) -> None:
+        if isinstance(order, Order):
+            order_id, driver_id, status = order.id, order.driver_id, order.status
+            deadline_ordinal, task_type_id, weight = order.deadline_ordinal, order.task_type_id, order.weight
+        else:
+            # Ruwe rij: enkel de kolommen parsen die de batch nodig heeft
+            order_id, driver_id, status = order.get('id'), order.get('driver_id'), order.get('status')
+            deadline_value = order.get('deadline')
+            deadline = parse_deadline_date(deadline_value)
+            if deadline is not None:
+                deadline_ordinal = deadline.toordinal()
+            else:
+                deadline_ordinal = DEADLINE_INVALID if deadline_value else DEADLINE_MISSING
+            task_type_id = _parse_task_type_id(order.get('task_type_id'))
+            weight = _parse_weight(order.get('Weight') or order.get('weight'))
+        self.ids.append(_NO_ID if order_id is None else order_id)
+        self.driver_ids.append(_NO_ID if driver_id is None else driver_id)
+        if isinstance(status, str):
+            status = status.strip().lower()
+        self.statuses.append(STATUS_CODES.get(status, _STATUS_UNKNOWN))
+        self.deadlines.append(deadline_ordinal)
+        self.task_type_ids.append(_NO_ID if task_type_id is None else task_type_id)
+        self.weights.append(weight)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def order_hours(self, custom_task_times: Optional[Dict[int, float]] = None) -> array:
+        # Benodigde uren per order (zelfde formule als calculate_order_time_hours)
+        factors = {}
+        if custom_task_times:
+            factors = {tt: custom_task_times[tt] for tt in set(self.task_type_ids) if tt and tt in custom_task_times}
+        return array('d', [
+            (weight / 1000.0) * factors.get(task_type_id, 1.0) + TRAVEL_TIME_HOURS
+            for weight, task_type_id in zip(self.weights, self.task_type_ids)
+        ])
+
+    def hours_by_driver_day(self, custom_task_times: Optional[Dict[int, float]] = None, status: str = 'accepted') -> Dict[Tuple[int, int], float]:
+        # Group-by (driver_id, deadline-ordinal) -> uren; orders zonder geldige
+        # deadline komen samen onder DEADLINE_MISSING.
+        status_code = STATUS_CODES[status]
+        groups: Dict[Tuple[int, int], float] = {}
+        for driver_id, row_status, deadline_ordinal, hours in zip(
+            self.driver_ids, self.statuses, self.deadlines, self.order_hours(custom_task_times)
+        ):
+            if row_status != status_code or driver_id == _NO_ID:
+                continue
+            key = (driver_id, deadline_ordinal if deadline_ordinal > 0 else DEADLINE_MISSING)
+            groups[key] = groups.get(key, 0.0) + hours
+        return groups
+
+
+def calculate_priority_score(order) -> float:
+    order = as_order(order)
+    return calculate_priority_scores([order.deadline_ordinal], [order.weight], [order.created_at_micros])[0]
+
+
+def build_priority_columns(orders: List) -> Tuple[List[int], List[float], List[Optional[int]]]:
+    # Zet orders eenmalig om naar kolommen: deadline-ordinal (of
+    # DEADLINE_MISSING/DEADLINE_INVALID), gewicht en created_at in
+    # microseconden sinds epoch (None als onbekend).
+    records = [as_order(order) for order in orders]
+    return (
+        [record.deadline_ordinal for record in records],
+        [record.weight for record in records],
+        [record.created_at_micros for record in records],
+    )
+
+
+def calculate_priority_scores(deadline_ordinals: List[int], weights: List[float], created_at_micros: List[Optional[int]], now: Optional[datetime] = None) -> List[float]:
+    # Batch-variant van calculate_priority_score met één "vandaag"-snapshot
+    # voor alle orders; geeft exact dezelfde scores als de scalaire functie.
+    if now is None:
+        now = datetime.now().astimezone()
+    today_ordinal = now.date().toordinal()
+    now_micros = (now.astimezone(timezone.utc) - _EPOCH) // timedelta(microseconds=1)
+
+    scores = []
+    for deadline_ordinal, weight, created_micros in zip(deadline_ordinals, weights, created_at_micros):
+        score = 0.0
+        if deadline_ordinal == DEADLINE_MISSING:
+            score += 10
+        elif deadline_ordinal == DEADLINE_INVALID:
+            score += 15
+        else:
+            days_until_deadline = deadline_ordinal - today_ordinal
             if days_until_deadline < 0:
                 score += 50
             elif days_until_deadline == 0:
@@ -22,92 +234,426 @@ def calculate_priority_score(order: Dict) -> float:
                 score += 30 - (days_until_deadline * 2)
             else:
                 score += max(10, 20 - days_until_deadline)
-        except (ValueError, TypeError):
-            score += 15
-    else:
-        score += 10
-    
-    weight = order.get('Weight') or order.get('weight') or 0
-    if weight:
-        try:
-            weight_float = float(weight)
-            score += min(30, weight_float / 33.33)
-        except (ValueError, TypeError):
-            pass
-    
-    if order.get('created_at'):
-        try:
-            created_at = datetime.fromisoformat(order['created_at'].replace('Z', '+00:00'))
-            days_old = (datetime.now(created_at.tzinfo) - created_at).days
-            
+
+        if weight:
+            score += min(30, weight / 33.33)
+
+        if created_micros is not None:
+            days_old = (now_micros - created_micros) // _MICROS_PER_DAY
             score += min(20, days_old * 2.86)
-        except (ValueError, TypeError, AttributeError):
-            pass
-    
-    return min(100.0, max(0.0, score))
+
+        scores.append(min(100.0, max(0.0, score)))
+    return scores
+
+
+def argsort_by_priority(scores: List[float]) -> List[int]:
+    # Indices van hoogste naar laagste score; gelijke scores behouden hun volgorde
+    return sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+
+
+def calculate_order_time_hours(order, custom_task_times: Optional[Dict[int, float]] = None) -> float:
+    return _order_time_hours(as_order(order), custom_task_times)
 
 
-def calculate_order_time_hours(order: Dict, custom_task_times: Optional[Dict[int, float]] = None) -> float:
-    if order.get('_custom_time_per_1000kg'):
-        time_per_1000kg = order['_custom_time_per_1000kg']
+def _order_time_hours(order: Order, custom_task_times: Optional[Dict[int, float]]) -> float:
+    if order.custom_time_per_1000kg:
+        time_per_1000kg = order.custom_time_per_1000kg
     else:
-        task_type_id = order.get('task_type_id')
+        task_type_id = order.task_type_id
         
         if custom_task_times and task_type_id and task_type_id in custom_task_times:
             time_per_1000kg = custom_task_times[task_type_id]
         else:
             time_per_1000kg = 1.0
     
-    try:
-        weight_float = float(order.get('Weight') or order.get('weight') or 0)
-    except (ValueError, TypeError):
-        weight_float = 0
-    
-    work_time = (weight_float / 1000.0) * time_per_1000kg
+    work_time = (order.weight / 1000.0) * time_per_1000kg
     total_time = work_time + TRAVEL_TIME_HOURS
     
     return total_time
 
 
-def calculate_driver_workload_hours(driver_id: int, orders: List[Dict], target_date: Optional[date] = None, custom_task_times: Optional[Dict[int, float]] = None) -> float:
+def parse_deadline_date(deadline) -> Optional[date]:
+    if not deadline:
+        return None
+    if isinstance(deadline, datetime):
+        return deadline.date()
+    if isinstance(deadline, date):
+        return deadline
+    # Snel pad voor de gangbare 'YYYY-MM-DD'; strptime blijft de fallback
+    if isinstance(deadline, str) and len(deadline) == 10 and deadline[4] == '-' and deadline[7] == '-':
+        try:
+            return date.fromisoformat(deadline)
+        except ValueError:
+            pass
+    try:
+        return datetime.strptime(deadline, '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        return None
+
+
+def calculate_driver_workload_hours(driver_id: int, orders: List, target_date: Optional[date] = None, custom_task_times: Optional[Dict[int, float]] = None) -> float:
     total_hours = 0.0
     
+    if isinstance(orders, OrderBatch):
+        target_ordinal = target_date.toordinal() if target_date else None
+        for (order_driver_id, deadline_ordinal), hours in orders.hours_by_driver_day(custom_task_times).items():
+            if order_driver_id != driver_id:
+                continue
+            if target_ordinal and deadline_ordinal != DEADLINE_MISSING and deadline_ordinal != target_ordinal:
+                continue
+            total_hours += hours
+        return total_hours
+
     for order in orders:
-        if order.get('driver_id') == driver_id and order.get('status') == 'accepted':
-            if target_date:
-                order_deadline = order.get('deadline')
-                if order_deadline:
-                    try:
-                        deadline_date = datetime.strptime(order_deadline, '%Y-%m-%d').date()
-                        if deadline_date != target_date:
-                            continue  
-                    except (ValueError, TypeError):
-                        pass
+        if not isinstance(order, Order):
+            order = Order.from_dict(order)
+        if order.driver_id == driver_id and order.status == 'accepted':
+            # Orders zonder (geldige) deadline tellen op elke dag mee
+            if target_date and order.deadline is not None and order.deadline != target_date:
+                continue
             
-            order_time = calculate_order_time_hours(order, custom_task_times)
-            total_hours += order_time
+            total_hours += _order_time_hours(order, custom_task_times)
     
     return total_hours
 
 
-def calculate_driver_score(driver: Dict, order: Dict, driver_workload_hours: Dict[int, float], all_orders: List[Dict], custom_task_times: Optional[Dict[int, float]] = None) -> float:
+class WorkloadIndex:
+    # Uren per (driver_id, deadline-datum), eenmaal per request opgebouwd.
+    # Orders zonder (geldige) deadline tellen mee op elke dag, net als in
+    # calculate_driver_workload_hours.
+    __slots__ = ('_hours_by_day', '_undated_hours', '_total_hours')
+
+    def __init__(self):
+        self._hours_by_day: Dict[tuple, float] = {}
+        self._undated_hours: Dict[int, float] = {}
+        self._total_hours: Dict[int, float] = {}
+
+    @classmethod
+    def build(cls, orders, custom_task_times: Optional[Dict[int, float]] = None) -> 'WorkloadIndex':
+        index = cls()
+        if isinstance(orders, OrderBatch):
+            for (driver_id, deadline_ordinal), hours in orders.hours_by_driver_day(custom_task_times).items():
+                deadline_date = date.fromordinal(deadline_ordinal) if deadline_ordinal != DEADLINE_MISSING else None
+                index.add(driver_id, deadline_date, hours)
+            return index
+        for order in orders:
+            order = as_order(order)
+            if order.status != 'accepted' or order.driver_id is None:
+                continue
+            index.add(order.driver_id, order.deadline, _order_time_hours(order, custom_task_times))
+        return index
+
+    # Sommen worden afgerond zodat toevoegen en weer aftrekken (PlanningState) exact
+    # dezelfde uren geeft als een volledige opbouw; anders kantelen gelijke
+    # chauffeurs in de toewijzing op afrondingsruis
+    def add(self, driver_id: int, deadline_date: Optional[date], hours: float) -> None:
+        if deadline_date is None:
+            self._undated_hours[driver_id] = round(self._undated_hours.get(driver_id, 0.0) + hours, HOURS_PRECISION)
+        else:
+            key = (driver_id, deadline_date)
+            self._hours_by_day[key] = round(self._hours_by_day.get(key, 0.0) + hours, HOURS_PRECISION)
+        self._total_hours[driver_id] = round(self._total_hours.get(driver_id, 0.0) + hours, HOURS_PRECISION)
+
+    def hours_on(self, driver_id: int, target_date: Optional[date]) -> float:
+        if target_date is None:
+            return self.total_hours(driver_id)
+        return self._hours_by_day.get((driver_id, target_date), 0.0) + self._undated_hours.get(driver_id, 0.0)
+
+    def total_hours(self, driver_id: int) -> float:
+        return self._total_hours.get(driver_id, 0.0)
+
+    def copy(self) -> 'WorkloadIndex':
+        clone = WorkloadIndex()
+        clone._hours_by_day = dict(self._hours_by_day)
+        clone._undated_hours = dict(self._undated_hours)
+        clone._total_hours = dict(self._total_hours)
+        return clone
+
+
+class ProjectedWorkload(WorkloadIndex):
+    # Laag bovenop een WorkloadIndex: toevoegingen komen in de laag, de basis
+    # blijft ongewijzigd (geen kopie van de hele index nodig).
+    __slots__ = ('base',)
+
+    def __init__(self, base: WorkloadIndex):
+        super().__init__()
+        self.base = base
+
+    def hours_on(self, driver_id: int, target_date: Optional[date]) -> float:
+        return self.base.hours_on(driver_id, target_date) + WorkloadIndex.hours_on(self, driver_id, target_date)
+
+    def total_hours(self, driver_id: int) -> float:
+        return self.base.total_hours(driver_id) + self._total_hours.get(driver_id, 0.0)
+
+
+class CapacityPlan:
+    # Meerdaagse capaciteitsplanning per chauffeur: geaccepteerde orders mogen
+    # op elke dag van vandaag (start) t.e.m. hun deadline uitgevoerd worden.
+    # Per chauffeur worden ze earliest-deadline-first over dagbuckets van
+    # workday_hours verdeeld (een order mag over dagen gesplitst worden); wat
+    # niet vóór de deadline past telt als late uren. EDF is hier optimaal: als
+    # er een planning bestaat die alle deadlines haalt, vindt deze sweep ze.
+    # Verlopen deadlines vallen op de eerste dag, orders zonder deadline en
+    # deadlines na de horizon op de laatste dag.
+    # De speling wordt in hele CAPACITY_UNITS_PER_HOUR bijgehouden, zodat ze niet
+    # afhangt van de volgorde waarin uren opgeteld of gereserveerd worden.
+    __slots__ = ('start', 'horizon_days', 'workday_hours', '_day_units', '_used', '_slack', '_free_from', '_late_hours', '_late_orders')
+
+    def __init__(self, start: date, horizon_days: int = DEFAULT_HORIZON_DAYS, workday_hours: float = WORKDAY_HOURS):
+        self.start = start
+        self.horizon_days = horizon_days
+        self.workday_hours = workday_hours
+        self._day_units = _capacity_units(workday_hours)
+        self._used: Dict[int, List[float]] = {}
+        # _slack[driver][k]: capaciteit t.e.m. dag k min de vraag met deadline t.e.m. k
+        self._slack: Dict[int, List[int]] = {}
+        # _free_from[driver][d]: suffix-minimum van de speling vanaf dag d, dus wat nog
+        # bij kan met deadline op dag d zonder een bestaande deadline te missen (< 0 = niets)
+        self._free_from: Dict[int, List[int]] = {}
+        self._late_hours: Dict[int, float] = {}
+        self._late_orders: Dict[int, List[int]] = {}
+
+    @classmethod
+    def build(cls, orders, custom_task_times: Optional[Dict[int, float]] = None, start: Optional[date] = None, horizon_days: int = DEFAULT_HORIZON_DAYS, workday_hours: float = WORKDAY_HOURS) -> 'CapacityPlan':
+        plan = cls(start or date.today(), horizon_days, workday_hours)
+        start_ordinal = plan.start.toordinal()
+        last_day = horizon_days - 1
+
+        # (dag-index van de deadline, order_id, uren) per chauffeur
+        jobs_by_driver: Dict[int, List[Tuple[int, int, float]]] = {}
+        if isinstance(orders, OrderBatch):
+            accepted = STATUS_CODES['accepted']
+            rows = zip(orders.ids, orders.driver_ids, orders.statuses, orders.deadlines, orders.order_hours(custom_task_times))
+            for order_id, driver_id, status, deadline_ordinal, hours in rows:
+                if status != accepted or driver_id == _NO_ID:
+                    continue
+                day = deadline_ordinal - start_ordinal if deadline_ordinal > 0 else last_day
+                jobs_by_driver.setdefault(driver_id, []).append((min(max(day, 0), last_day), order_id, hours))
+        else:
+            for order in orders:
+                if not isinstance(order, Order):
+                    order = Order.from_dict(order)
+                if order.status != 'accepted' or order.driver_id is None:
+                    continue
+                jobs_by_driver.setdefault(order.driver_id, []).append(plan._job(order, custom_task_times))
+
+        for driver_id, jobs in jobs_by_driver.items():
+            plan._schedule(driver_id, jobs)
+        return plan
+
+    def _job(self, order: Order, custom_task_times: Optional[Dict[int, float]]) -> Tuple[int, int, float]:
+        return (self._day_index(order.deadline), order.id, calculate_order_time_hours(order, custom_task_times))
+
+    # Plan één chauffeur opnieuw met de geaccepteerde orders (bv. na een toewijzing).
+    # Geeft de vroegste dag-index terug waarop de beschikbare uren veranderden, of None.
+    def reschedule(self, driver_id: int, orders, custom_task_times: Optional[Dict[int, float]] = None) -> Optional[int]:
+        before = self._free_from.get(driver_id)
+        for values in (self._used, self._slack, self._free_from, self._late_hours, self._late_orders):
+            values.pop(driver_id, None)
+        jobs = []
+        for order in orders:
+            order = as_order(order)
+            if order.status == 'accepted' and order.driver_id == driver_id:
+                jobs.append(self._job(order, custom_task_times))
+        if jobs:
+            self._schedule(driver_id, jobs)
+        after = self._free_from.get(driver_id)
+        if before is None and after is None:
+            return None
+        empty = self._empty_free_from()
+        for day, (old, new) in enumerate(zip(before or empty, after or empty)):
+            if max(old, 0) != max(new, 0):
+                return day
+        return None
+
+    def _schedule(self, driver_id: int, jobs: List[Tuple[int, int, float]]) -> None:
+        capacity = self.workday_hours
+        used = [0.0] * self.horizon_days
+        demand = [0] * self.horizon_days
+        late_hours = 0.0
+        late_orders = []
+
+        # Enkel op deadline sorteren: order_id kan None zijn, gelijke deadlines houden hun volgorde
+        jobs.sort(key=lambda job: job[0])
+        day = 0
+        for deadline_day, order_id, hours in jobs:
+            demand[deadline_day] += _capacity_units(hours)
+            # Waterval: vul de vroegste dag met vrije capaciteit, niet voorbij de deadline
+            while hours > 1e-9 and day <= deadline_day:
+                take = min(capacity - used[day], hours)
+                used[day] += take
+                hours -= take
+                if used[day] >= capacity - 1e-9:
+                    day += 1
+            if hours > 1e-9:
+                late_hours += hours
+                late_orders.append(order_id)
+
+        # Speling op dag k = capaciteit t.e.m. k min de vraag met deadline t.e.m. k
+        cumulative_demand = 0
+        slack = []
+        for k in range(self.horizon_days):
+            cumulative_demand += demand[k]
+            slack.append((k + 1) * self._day_units - cumulative_demand)
+
+        self._used[driver_id] = used
+        self._slack[driver_id] = slack
+        self._free_from[driver_id] = _suffix_min(slack)
+        if late_orders:
+            self._late_hours[driver_id] = late_hours
+            self._late_orders[driver_id] = late_orders
+
+    def _empty_free_from(self) -> List[int]:
+        return [(k + 1) * self._day_units for k in range(self.horizon_days)]
+
+    def _day_index(self, day: Optional[date]) -> int:
+        if day is None:
+            return self.horizon_days - 1
+        return min(max(day.toordinal() - self.start.toordinal(), 0), self.horizon_days - 1)
+
+    def used_hours(self, driver_id: int, day: date) -> float:
+        offset = day.toordinal() - self.start.toordinal()
+        if not 0 <= offset < self.horizon_days:
+            return 0.0
+        used = self._used.get(driver_id)
+        return used[offset] if used else 0.0
+
+    def utilisation(self, driver_id: int, day: date) -> float:
+        return self.used_hours(driver_id, day) / self.workday_hours
+
+    # Geprojecteerde bezetting per dag: [{'date', 'hours', 'utilisation'}, ...]
+    def calendar(self, driver_id: int) -> List[Dict]:
+        used = self._used.get(driver_id) or [0.0] * self.horizon_days
+        return [
+            {'date': self.start + timedelta(days=offset), 'hours': hours, 'utilisation': hours / self.workday_hours}
+            for offset, hours in enumerate(used)
+        ]
+
+    # Uren die de chauffeur nog kan opnemen voor een order met deze deadline
+    # zonder dat een van de bestaande orders te laat komt
+    def available_hours_until(self, driver_id: int, deadline: Optional[date]) -> float:
+        return self.available_hours_at(driver_id, self._day_index(deadline))
+
+    # Idem voor een dag-index (zie _day_index), voor lussen over veel chauffeurs
+    def available_hours_at(self, driver_id: int, day_index: int) -> float:
+        free_from = self._free_from.get(driver_id)
+        if free_from is None:
+            return (day_index + 1) * self._day_units / CAPACITY_UNITS_PER_HOUR
+        return max(free_from[day_index], 0) / CAPACITY_UNITS_PER_HOUR
+
+    # Chauffeur met de meeste beschikbare uren op dag-index (bij gelijkheid de eerste)
+    # als (driver_id, uren); (None, 0.0) zonder chauffeurs
+    def most_available_at(self, driver_ids: List[int], day_index: int) -> Tuple[Optional[int], float]:
+        return self._most_available(driver_ids, day_index, self._free_from, {})
+
+    def _most_available(self, driver_ids, day_index, free_from_by_driver, fallback) -> Tuple[Optional[int], float]:
+        empty_units = (day_index + 1) * self._day_units
+        best_id = None
+        best_units = 0
+        for driver_id in driver_ids:
+            free_from = free_from_by_driver.get(driver_id) or fallback.get(driver_id)
+            units = free_from[day_index] if free_from is not None else empty_units
+            if best_id is None or units > best_units:
+                best_id, best_units = driver_id, units
+        return best_id, max(best_units, 0) / CAPACITY_UNITS_PER_HOUR
+
+    def late_hours(self, driver_id: int) -> float:
+        return self._late_hours.get(driver_id, 0.0)
+
+    def late_orders(self, driver_id: int) -> List[int]:
+        return list(self._late_orders.get(driver_id, ()))
+
+
+class ProjectedCapacity(CapacityPlan):
+    # Laag bovenop een CapacityPlan, zoals ProjectedWorkload: gereserveerde uren
+    # verlagen de speling van de chauffeur vanaf hun deadline-dag, de basis blijft
+    # ongewijzigd. Enkel chauffeurs met reserveringen krijgen een eigen kopie;
+    # enkel de beschikbare uren zijn geprojecteerd, niet de kalender.
+    __slots__ = ('base',)
+
+    def __init__(self, base: CapacityPlan):
+        super().__init__(base.start, base.horizon_days, base.workday_hours)
+        self.base = base
+
+    def available_hours_at(self, driver_id: int, day_index: int) -> float:
+        if driver_id not in self._free_from:
+            return self.base.available_hours_at(driver_id, day_index)
+        return super().available_hours_at(driver_id, day_index)
+
+    def most_available_at(self, driver_ids: List[int], day_index: int) -> Tuple[Optional[int], float]:
+        return self._most_available(driver_ids, day_index, self._free_from, self.base._free_from)
+
+    def _own(self, driver_id: int) -> Tuple[List[int], List[int]]:
+        slack = self._slack.get(driver_id)
+        if slack is None:
+            base_slack = self.base._slack.get(driver_id)
+            if base_slack is None:
+                slack = self._empty_free_from()
+                free_from = list(slack)
+            else:
+                slack = list(base_slack)
+                free_from = list(self.base._free_from[driver_id])
+            self._slack[driver_id] = slack
+            self._free_from[driver_id] = free_from
+        return slack, self._free_from[driver_id]
+
+    def reserve(self, driver_id: int, deadline: Optional[date], hours: float) -> None:
+        units = _capacity_units(hours)
+        day = self._day_index(deadline)
+        slack, free_from = self._own(driver_id)
+        slack[day:] = [value - units for value in slack[day:]]
+        free_from[day:] = [value - units for value in free_from[day:]]
+        # Vóór de deadline-dag enkel bijwerken tot het suffix-minimum niet meer verandert
+        for k in range(day - 1, -1, -1):
+            value = min(slack[k], free_from[k + 1])
+            if value == free_from[k]:
+                break
+            free_from[k] = value
+
+    # Veel reserveringen (driver_id, deadline, uren) tegelijk: één pass per chauffeur
+    def reserve_many(self, reservations) -> None:
+        deltas: Dict[int, List[int]] = {}
+        for driver_id, deadline, hours in reservations:
+            delta = deltas.get(driver_id)
+            if delta is None:
+                delta = deltas[driver_id] = [0] * self.horizon_days
+            delta[self._day_index(deadline)] += _capacity_units(hours)
+        for driver_id, delta in deltas.items():
+            slack, _ = self._own(driver_id)
+            reserved = 0
+            for k, units in enumerate(delta):
+                reserved += units
+                slack[k] -= reserved
+            self._free_from[driver_id] = _suffix_min(slack)
+
+
+def _capacity_units(hours: float) -> int:
+    return int(round(hours * CAPACITY_UNITS_PER_HOUR))
+
+
+def _suffix_min(values: List[int]) -> List[int]:
+    result = list(values)
+    for k in range(len(result) - 2, -1, -1):
+        if result[k + 1] < result[k]:
+            result[k] = result[k + 1]
+    return result
+
+
+def calculate_driver_score(driver: Dict, order, driver_workload_hours: Dict[int, float], all_orders: List, custom_task_times: Optional[Dict[int, float]] = None, workload_index: Optional[WorkloadIndex] = None) -> float:
     driver_id = driver.get('id')
     if not driver_id:
         return 0.0
     
-    order_time = calculate_order_time_hours(order, custom_task_times)
-    
-    order_deadline_date = None
-    if order.get('deadline'):
-        try:
-            order_deadline_date = datetime.strptime(order['deadline'], '%Y-%m-%d').date()
-        except (ValueError, TypeError):
-            pass
+    order = as_order(order)
+    order_time = _order_time_hours(order, custom_task_times)
+    order_deadline_date = order.deadline
     
     if not order_deadline_date:
         return 50.0
     
-    hours_on_deadline_day = calculate_driver_workload_hours(driver_id, all_orders, order_deadline_date, custom_task_times)
+    if workload_index is None:
+        workload_index = WorkloadIndex.build(all_orders, custom_task_times)
+    hours_on_deadline_day = workload_index.hours_on(driver_id, order_deadline_date)
     available_hours = WORKDAY_HOURS - hours_on_deadline_day
     
     if available_hours < order_time:
@@ -124,24 +670,32 @@ def calculate_driver_score(driver: Dict, order: Dict, driver_workload_hours: Dic
     
     return score
 
-def suggest_best_driver(drivers: List[Dict], order: Dict, driver_workload_hours: Dict[int, float], all_orders: List[Dict], custom_task_times: Optional[Dict[int, float]] = None) -> Optional[Dict]:
+def suggest_best_driver(drivers: List[Dict], order, driver_workload_hours: Dict[int, float], all_orders: List, custom_task_times: Optional[Dict[int, float]] = None, workload_index: Optional[WorkloadIndex] = None, capacity_plan: Optional[CapacityPlan] = None) -> Optional[Dict]:
+    # Met een capacity_plan telt alle vrije capaciteit van vandaag t.e.m. de
+    # deadline mee (meerdaagse planning) in plaats van enkel de deadline-dag.
     if not drivers:
         return None
 
-    order_time = calculate_order_time_hours(order, custom_task_times)
-    order_deadline_date = None
-    if order.get('deadline'):
-        try:
-            order_deadline_date = datetime.strptime(order['deadline'], '%Y-%m-%d').date()
-        except (ValueError, TypeError):
-            pass
+    if workload_index is None and capacity_plan is None:
+        workload_index = WorkloadIndex.build(all_orders, custom_task_times)
+
+    order = as_order(order)
+    order_time = _order_time_hours(order, custom_task_times)
+    order_deadline_date = order.deadline
 
     driver_scores = []
     for driver in drivers:
-        score = calculate_driver_score(driver, order, driver_workload_hours, all_orders, custom_task_times)
+        if capacity_plan is not None:
+            available_hours = capacity_plan.available_hours_until(driver['id'], order_deadline_date)
+            if available_hours < order_time:
+                continue
+            driver_scores.append({'driver': driver, 'score': _score_for_available_hours(available_hours, order_time)})
+            continue
+
+        score = calculate_driver_score(driver, order, driver_workload_hours, all_orders, custom_task_times, workload_index)
 
         if order_deadline_date:
-            hours_on_deadline = calculate_driver_workload_hours(driver['id'], all_orders, order_deadline_date, custom_task_times)
+            hours_on_deadline = workload_index.hours_on(driver['id'], order_deadline_date)
             if hours_on_deadline + order_time > WORKDAY_HOURS:
                 continue
         
@@ -160,8 +714,10 @@ def suggest_best_driver(drivers: List[Dict], order: Dict, driver_workload_hours:
     total_hours = driver_workload_hours.get(driver_id, 0.0)
 
     available_hours = WORKDAY_HOURS
-    if order_deadline_date:
-        hours_on_deadline = calculate_driver_workload_hours(driver_id, all_orders, order_deadline_date, custom_task_times)
+    if capacity_plan is not None:
+        available_hours = capacity_plan.available_hours_until(driver_id, order_deadline_date)
+    elif order_deadline_date:
+        hours_on_deadline = workload_index.hours_on(driver_id, order_deadline_date)
         available_hours = WORKDAY_HOURS - hours_on_deadline
     
     return {
@@ -173,6 +729,92 @@ def suggest_best_driver(drivers: List[Dict], order: Dict, driver_workload_hours:
     }
 
 
+def _score_for_available_hours(available_hours: float, order_time: float) -> float:
+    if available_hours < order_time:
+        return 0.0
+    if available_hours >= order_time + 4:
+        return 100.0
+    if available_hours >= order_time + 2:
+        return 80.0
+    if available_hours >= order_time + 1:
+        return 70.0
+    return 60.0
+
+
+def plan_driver_assignments(drivers: List[Dict], orders: List, workload_index: WorkloadIndex, custom_task_times: Optional[Dict[int, float]] = None, now: Optional[datetime] = None, capacity_plan: Optional[CapacityPlan] = None) -> Dict[int, Dict]:
+    # Plant alle openstaande orders in één keer: hoogste prioriteit eerst,
+    # en elke toewijzing verbruikt capaciteit op de deadline-dag van de
+    # chauffeur zodat volgende orders daar rekening mee houden. Met een
+    # capacity_plan telt de vrije ruimte van vandaag t.e.m. de deadline.
+    # Een ProjectedWorkload/ProjectedCapacity wordt zelf bijgewerkt (zo kunnen
+    # meerdere plannen na elkaar dezelfde capaciteit delen); een gewone
+    # WorkloadIndex of CapacityPlan blijft ongewijzigd.
+    if not drivers or not orders:
+        return {}
+
+    records = [as_order(order) for order in orders]
+    scores = calculate_priority_scores(*build_priority_columns(records), now=now)
+    ranked = [records[i] for i in argsort_by_priority(scores)]
+    projected = workload_index if isinstance(workload_index, ProjectedWorkload) else ProjectedWorkload(workload_index)
+    capacity = capacity_plan
+    if capacity is not None and not isinstance(capacity, ProjectedCapacity):
+        capacity = ProjectedCapacity(capacity)
+    return _plan_in_order(drivers, ranked, projected, custom_task_times, capacity)
+
+
+def _plan_in_order(drivers: List[Dict], records: List[Order], projected: WorkloadIndex, custom_task_times: Optional[Dict[int, float]], capacity: Optional[ProjectedCapacity] = None) -> Dict[int, Dict]:
+    # Greedy toewijzing van records in de gegeven volgorde; projected (en
+    # capacity) wordt bijgewerkt met elke toewijzing. Zonder capacity moet een
+    # order op haar deadline-dag passen, met capacity mag ze ook vroeger.
+    plan: Dict[int, Dict] = {}
+    driver_ids = [driver['id'] for driver in drivers]
+    drivers_by_id = {driver['id']: driver for driver in drivers}
+
+    for order in records:
+        order_time = _order_time_hours(order, custom_task_times)
+        deadline_date = order.deadline
+
+        best_id = None
+        best_score = -1.0
+        best_load = 0.0
+        best_available = WORKDAY_HOURS
+        if capacity is not None and deadline_date is not None:
+            # De score stijgt met de beschikbare uren: de ruimste chauffeur wint
+            best_id, best_available = capacity.most_available_at(driver_ids, capacity._day_index(deadline_date))
+            if best_available < order_time:
+                best_id = None
+            best_score = _score_for_available_hours(best_available, order_time)
+        else:
+            for driver_id in driver_ids:
+                # load: bij gelijke score gaat de minst belaste chauffeur voor
+                if deadline_date is None:
+                    load, available, score = projected.total_hours(driver_id), WORKDAY_HOURS, 50.0
+                else:
+                    load = projected.hours_on(driver_id, deadline_date)
+                    available = WORKDAY_HOURS - load
+                    if available < order_time:
+                        continue
+                    score = _score_for_available_hours(available, order_time)
+                if score > best_score or (score == best_score and load < best_load):
+                    best_id, best_score, best_load, best_available = driver_id, score, load, available
+
+        if best_id is None:
+            continue
+
+        plan[order.id] = {
+            'driver_id': best_id,
+            'driver_name': drivers_by_id[best_id].get('name', 'Onbekend'),
+            'score': best_score,
+            'available_hours': best_available,
+            'reason': _get_suggestion_reason(best_score, projected.total_hours(best_id), best_available, order_time),
+        }
+        projected.add(best_id, deadline_date, order_time)
+        if capacity is not None:
+            capacity.reserve(best_id, deadline_date, order_time)
+
+    return plan
+
+
 def _get_suggestion_reason(score: float, total_hours: float, available_hours: float, order_time: float) -> str:
     if available_hours >= order_time + 4:
         return f"Veel ruimte beschikbaar ({available_hours:.1f}u beschikbaar, taak: {order_time:.1f}u)"
@@ -186,27 +828,25 @@ def _get_suggestion_reason(score: float, total_hours: float, available_hours: fl
         return f"Beperkt beschikbaar ({available_hours:.1f}u beschikbaar, taak: {order_time:.1f}u)"
 
 
-def sort_orders_by_priority(orders: List[Dict]) -> List[Dict]:
-    orders_with_scores = []
-    for order in orders:
-        score = calculate_priority_score(order)
-        orders_with_scores.append({
-            'order': order,
-            'priority_score': score
-        })
-    
-    orders_with_scores.sort(key=lambda x: x['priority_score'], reverse=True)
+def sort_orders_by_priority(orders: List) -> List:
+    # Dicts worden gekopieerd met 'priority_score'; Order-records krijgen
+    # hun priority_score ingevuld en worden zelf teruggegeven.
+    scores = calculate_priority_scores(*build_priority_columns(orders))
     
     result = []
-    for item in orders_with_scores:
-        order = item['order'].copy()
-        order['priority_score'] = item['priority_score']
+    for i in argsort_by_priority(scores):
+        if isinstance(orders[i], Order):
+            order = orders[i]
+            order.priority_score = scores[i]
+        else:
+            order = orders[i].copy()
+            order['priority_score'] = scores[i]
         result.append(order)
     
     return result
 
 
-def filter_duplicate_orders(orders: List[Dict]) -> List[Dict]:
+def filter_duplicate_orders(orders: List) -> List:
     if not orders:
         return []
     
@@ -230,3 +870,259 @@ def filter_duplicate_orders(orders: List[Dict]) -> List[Dict]:
     
     return list(seen_orders.values())
 
+
+class PlanningState:
+    # Planning van één bedrijf die in het geheugen blijft en per gewijzigde
+    # order bijgewerkt wordt in plaats van per request opnieuw opgebouwd:
+    # - workload: uren van geaccepteerde orders per chauffeur/dag
+    # - capacity: meerdaagse capaciteit (CapacityPlan) van die orders; na een
+    #   wijziging wordt enkel die chauffeur opnieuw ingepland
+    # - een prioriteitsheap (-score, order_id) van de open orders, met lazy delete
+    # - suggesties per deadline-dag, vroegste dag eerst en binnen een dag hoogste
+    #   prioriteit eerst. Een order mag vóór haar deadline-dag ingepland worden,
+    #   dus een dag deelt capaciteit met de dagen vóór haar: een gewijzigde open
+    #   order plant haar eigen en de latere dagen opnieuw (orders zonder deadline
+    #   komen als laatste), een gewijzigde geaccepteerde order de dagen vanaf de
+    #   eerste dag waarop de beschikbare uren van de chauffeur veranderden.
+    # Scores gebruiken één "nu"-snapshot (now) zodat ze niet verlopen tussen updates.
+    def __init__(self, drivers: List[Dict], custom_task_times: Optional[Dict[int, float]] = None, now: Optional[datetime] = None):
+        self.drivers = list(drivers)
+        self.custom_task_times = dict(custom_task_times or {})
+        self.now = now or datetime.now().astimezone()
+        self.lock = threading.RLock()
+        self.workload = WorkloadIndex()
+        self._capacity: Optional[CapacityPlan] = None
+        self._stale_drivers: set = set()
+        self._accepted: Dict[int, Order] = {}
+        self._accepted_by_driver: Dict[int, Dict[int, Order]] = {}
+        self._open: Dict[int, Order] = {}
+        self._scores: Dict[int, float] = {}
+        self._heap: List[Tuple[float, int]] = []
+        self._open_by_day: Dict[Optional[date], set] = {}
+        self._plan_by_day: Dict[Optional[date], Dict[int, Dict]] = {}
+        # Vroegste dag (_day_order) waarvan de suggesties verouderd zijn; None = actueel
+        self._dirty_from: Optional[float] = float('-inf')
+        # Versie van de gedeelde planningteller waarmee deze state in sync is (zie routes)
+        self.version = 0
+
+    @classmethod
+    def build(cls, drivers: List[Dict], orders: List, custom_task_times: Optional[Dict[int, float]] = None, now: Optional[datetime] = None) -> 'PlanningState':
+        state = cls(drivers, custom_task_times, now)
+        records = [as_order(order) for order in orders]
+        # Workload van de geaccepteerde orders in één group-by over een OrderBatch
+        # (die geen eigen taaktijd per order kent); de rest loopt via upsert
+        accepted = {
+            record.id: record
+            for record in records
+            if record.status == 'accepted' and record.driver_id is not None and not record.custom_time_per_1000kg
+        }
+        state.workload = WorkloadIndex.build(OrderBatch.from_orders(list(accepted.values())), state.custom_task_times)
+        state._accepted.update(accepted)
+        for record in accepted.values():
+            state._accepted_by_driver.setdefault(record.driver_id, {})[record.id] = record
+        for record in records:
+            if accepted.get(record.id) is not record:
+                state.upsert(record)
+        return state
+
+    # Voeg een order toe of werk ze bij; voltooide/geannuleerde orders verdwijnen
+    def upsert(self, order) -> None:
+        order = as_order(order)
+        with self.lock:
+            self._discard(order.id)
+            if order.status in ('completed', 'cancelled'):
+                return
+            if order.driver_id is None:
+                self._open[order.id] = order
+                self._open_by_day.setdefault(order.deadline, set()).add(order.id)
+                score = calculate_priority_scores([order.deadline_ordinal], [order.weight], [order.created_at_micros], now=self.now)[0]
+                self._scores[order.id] = score
+                heapq.heappush(self._heap, (-score, order.id))
+                self._mark_dirty(order.deadline)
+            elif order.status == 'accepted':
+                self._accepted[order.id] = order
+                self._accepted_by_driver.setdefault(order.driver_id, {})[order.id] = order
+                self.workload.add(order.driver_id, order.deadline, _order_time_hours(order, self.custom_task_times))
+                self._stale_drivers.add(order.driver_id)
+
+    def remove(self, order_id: int) -> None:
+        with self.lock:
+            self._discard(order_id)
+
+    # Neem records over die afwijken van wat de state kent (bv. geschreven door een ander proces)
+    def sync(self, orders: List) -> int:
+        changed = 0
+        with self.lock:
+            for order in orders:
+                order = as_order(order)
+                known = self._open.get(order.id) or self._accepted.get(order.id)
+                if known is None and order.status == 'completed':
+                    continue
+                if known is None or _planning_key(known) != _planning_key(order):
+                    self.upsert(order)
+                    changed += 1
+        return changed
+
+    def _discard(self, order_id: int) -> None:
+        order = self._open.pop(order_id, None)
+        if order is not None:
+            day_ids = self._open_by_day.get(order.deadline)
+            if day_ids is not None:
+                day_ids.discard(order_id)
+                if not day_ids:
+                    del self._open_by_day[order.deadline]
+            del self._scores[order_id]
+            self._mark_dirty(order.deadline)
+            if len(self._heap) > 2 * len(self._scores) + 64:
+                self._heap = [(-score, oid) for oid, score in self._scores.items()]
+                heapq.heapify(self._heap)
+        order = self._accepted.pop(order_id, None)
+        if order is not None:
+            self._accepted_by_driver.get(order.driver_id, {}).pop(order_id, None)
+            self.workload.add(order.driver_id, order.deadline, -_order_time_hours(order, self.custom_task_times))
+            self._stale_drivers.add(order.driver_id)
+
+    def _mark_dirty(self, day: Optional[date]) -> None:
+        self._mark_dirty_from(_day_order(day))
+
+    def _mark_dirty_from(self, day_order: float) -> None:
+        if self._dirty_from is None or day_order < self._dirty_from:
+            self._dirty_from = day_order
+
+    @property
+    def capacity(self) -> CapacityPlan:
+        with self.lock:
+            if self._capacity is None:
+                self._capacity = CapacityPlan.build(list(self._accepted.values()), self.custom_task_times, start=self.now.date())
+                self._stale_drivers = set()
+                self._mark_dirty_from(float('-inf'))
+            for driver_id in self._stale_drivers:
+                orders = list(self._accepted_by_driver.get(driver_id, {}).values())
+                changed = self._capacity.reschedule(driver_id, orders, self.custom_task_times)
+                if changed is not None:
+                    # Dag-index 0 omvat ook de verlopen deadlines
+                    self._mark_dirty_from(float('-inf') if changed == 0 else (self._capacity.start + timedelta(days=changed)).toordinal())
+            self._stale_drivers = set()
+            return self._capacity
+
+    # Plan de dagen vanaf _dirty_from opnieuw; de toewijzingen van de eerdere dagen
+    # worden eerst opnieuw afgeboekt op de capaciteit
+    def _replan(self) -> None:
+        capacity_plan = self.capacity
+        if self._dirty_from is None:
+            return
+        days = sorted(self._open_by_day, key=_day_order)
+        kept = [day for day in days if _day_order(day) < self._dirty_from]
+        projected = ProjectedWorkload(self.workload)
+        capacity = ProjectedCapacity(capacity_plan)
+        reservations = []
+        for day in kept:
+            for order_id, suggestion in self._plan_by_day.get(day, {}).items():
+                hours = _order_time_hours(self._open[order_id], self.custom_task_times)
+                projected.add(suggestion['driver_id'], day, hours)
+                reservations.append((suggestion['driver_id'], day, hours))
+        capacity.reserve_many(reservations)
+
+        self._plan_by_day = {day: self._plan_by_day[day] for day in kept if day in self._plan_by_day}
+        for day in days[len(kept):]:
+            records = sorted((self._open[oid] for oid in self._open_by_day[day]), key=lambda order: order.id)
+            self._plan_by_day[day] = plan_driver_assignments(
+                self.drivers, records, projected, self.custom_task_times, now=self.now, capacity_plan=capacity
+            )
+        self._dirty_from = None
+
+    def suggestion(self, order_id: int) -> Optional[Dict]:
+        with self.lock:
+            self._replan()
+            order = self._open.get(order_id)
+            if order is None:
+                return None
+            return self._plan_by_day.get(order.deadline, {}).get(order_id)
+
+    def suggestions(self) -> Dict[int, Dict]:
+        with self.lock:
+            self._replan()
+            plan: Dict[int, Dict] = {}
+            for day_plan in self._plan_by_day.values():
+                plan.update(day_plan)
+            return plan
+
+    def priority_score(self, order_id: int) -> Optional[float]:
+        with self.lock:
+            return self._scores.get(order_id)
+
+    # De n open orders met de hoogste prioriteit als (order_id, score)
+    def top(self, n: int) -> List[Tuple[int, float]]:
+        with self.lock:
+            result = []
+            seen = set()
+            for neg_score, order_id in heapq.nsmallest(n + len(self._heap) - len(self._scores), self._heap):
+                if len(result) == n:
+                    break
+                # Verouderde of dubbele heap-items overslaan
+                if order_id in seen or self._scores.get(order_id) != -neg_score:
+                    continue
+                seen.add(order_id)
+                result.append((order_id, -neg_score))
+            return result
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    # Vergelijk met een volledige herberekening; geeft de verschillen terug (leeg = consistent)
+    def check_consistency(self, tolerance: float = 1e-6) -> List[str]:
+        with self.lock:
+            problems = []
+            full_index = WorkloadIndex.build(list(self._accepted.values()), self.custom_task_times)
+            driver_ids = {order.driver_id for order in self._accepted.values()}
+            days = {order.deadline for order in self._accepted.values()} | set(self._open_by_day)
+            for driver_id in driver_ids:
+                if abs(full_index.total_hours(driver_id) - self.workload.total_hours(driver_id)) > tolerance:
+                    problems.append(f"workload driver {driver_id}: {self.workload.total_hours(driver_id)} != {full_index.total_hours(driver_id)}")
+                for day in days:
+                    if day is not None and abs(full_index.hours_on(driver_id, day) - self.workload.hours_on(driver_id, day)) > tolerance:
+                        problems.append(f"workload driver {driver_id} op {day}")
+
+            records = sorted(self._open.values(), key=lambda order: order.id)
+            scores = calculate_priority_scores(*build_priority_columns(records), now=self.now)
+            for order, score in zip(records, scores):
+                if abs(self._scores[order.id] - score) > tolerance:
+                    problems.append(f"prioriteit order {order.id}: {self._scores[order.id]} != {score}")
+            if [oid for oid, _ in self.top(len(records))] != [records[i].id for i in argsort_by_priority(scores)]:
+                problems.append("volgorde van de prioriteitsheap wijkt af")
+
+            full_capacity = CapacityPlan.build(list(self._accepted.values()), self.custom_task_times, start=self.now.date())
+            for driver in self.drivers:
+                for day in days:
+                    expected_hours = full_capacity.available_hours_until(driver['id'], day)
+                    if abs(self.capacity.available_hours_until(driver['id'], day) - expected_hours) > tolerance:
+                        problems.append(f"capaciteit driver {driver['id']} tot {day}")
+
+            # Alle dagen in één keer, vroegste dag eerst, op één gedeelde projectie
+            records_by_day: Dict[Optional[date], List[Order]] = {}
+            for order in records:
+                records_by_day.setdefault(order.deadline, []).append(order)
+            projected = ProjectedWorkload(full_index)
+            capacity = ProjectedCapacity(full_capacity)
+            full_plan: Dict[int, Dict] = {}
+            for day in sorted(records_by_day, key=_day_order):
+                full_plan.update(plan_driver_assignments(
+                    self.drivers, records_by_day[day], projected, self.custom_task_times, now=self.now, capacity_plan=capacity
+                ))
+            plan = self.suggestions()
+            for order_id in set(full_plan) | set(plan):
+                expected = full_plan.get(order_id)
+                actual = plan.get(order_id)
+                if (expected or {}).get('driver_id') != (actual or {}).get('driver_id'):
+                    problems.append(f"suggestie order {order_id}: {actual and actual['driver_id']} != {expected and expected['driver_id']}")
+            return problems
+
+
+# Volgorde van de deadline-dagen in de planning; orders zonder deadline komen als laatste
+def _day_order(day: Optional[date]) -> float:
+    return day.toordinal() if day is not None else float('inf')
+
+
+def _planning_key(order: Order) -> tuple:
+    return (order.driver_id, order.status, order.deadline, order.weight, order.task_type_id, order.custom_time_per_1000kg, order.created_at)
+
@@ -0,0 +1,210 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# TTL per tabel of datagroep (seconden) voor data die zelden wijzigt
+DEFAULT_TABLE_TTLS = {
+    "TaskTypes": 300.0,
+    "Companies": 600.0,
+    "Drivers": 120.0,
+    "CompanyHome": 30.0,
+}
+DEFAULT_TTL = 60.0
+DEFAULT_MAX_ENTRIES = 1024
+
+_MISSING = object()
+
+
+# Proces-brede cache met TTL per tabel, begrensde grootte en LRU-eviction
+class TTLCache:
+    def __init__(
+        self,
+        table_ttls: Optional[Dict[str, float]] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        default_ttl: float = DEFAULT_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.table_ttls = dict(table_ttls if table_ttls is not None else DEFAULT_TABLE_TTLS)
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, table: str, key: Hashable, default: Any = None) -> Any:
+        cache_key = (table, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[cache_key]
+                return default
+            self._entries.move_to_end(cache_key)
+            return value
+
+    def set(self, table: str, key: Hashable, value: Any) -> None:
+        cache_key = (table, key)
+        expires_at = self._clock() + self.table_ttls.get(table, self.default_ttl)
+        with self._lock:
+            self._entries[cache_key] = (expires_at, value)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # Haal uit de cache of laad via loader; None-resultaten worden niet gecachet
+    def get_or_load(self, table: str, key: Hashable, loader: Callable[[], Any]) -> Any:
+        value = self.get(table, key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = loader()
+        if value is not None:
+            self.set(table, key, value)
+        return value
+
+    def invalidate(self, table: str, key: Hashable = _MISSING) -> None:
+        with self._lock:
+            if key is not _MISSING:
+                self._entries.pop((table, key), None)
+                return
+            for cache_key in [k for k in self._entries if k[0] == table]:
+                del self._entries[cache_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Referentiedata (taaktypes, bedrijven, chauffeurs). Elke worker heeft zijn eigen
+# kopie: de sleutels bevatten daarom de gedeelde dataversie (zie data_versions)
+# van de bron, zodat een schrijfactie in een andere worker ze meteen vervangt.
+reference_cache = TTLCache()
+
+
+# Versienummer per (rol, entiteit-id). Schrijfacties verhogen de versie zodat
+# gecachte pagina's van die entiteit niet meer gevonden worden; oude entries
+# verdwijnen vanzelf via TTL/LRU. Standaard per proces; met use_sqlite() staan
+# de tellers in een SQLite-bestand dat alle workers op de host delen, zodat een
+# schrijfactie in de ene worker ook de cache van de andere ongeldig maakt.
+# De epoch onderscheidt tellers die opnieuw bij 0 beginnen (nieuw proces of
+# nieuw bestand), zodat versies buiten de app (ETags) niet toevallig overeenkomen.
+class DataVersions:
+    def __init__(self):
+        self._versions: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+        self._shared: Optional["SQLiteVersionStore"] = None
+        self._epoch = secrets.token_hex(8)
+
+    def use_sqlite(self, path: str) -> None:
+        self._shared = SQLiteVersionStore(path)
+
+    def use_memory(self) -> None:
+        self._shared = None
+
+    @property
+    def shared(self) -> bool:
+        return self._shared is not None
+
+    @property
+    def epoch(self) -> str:
+        if self._shared is not None:
+            return self._shared.epoch
+        return self._epoch
+
+    def get(self, role: str, entity_id: Hashable) -> int:
+        if self._shared is not None:
+            return self._shared.get(role, entity_id)
+        return self._versions.get((role, entity_id), 0)
+
+    # Versies van meerdere entiteiten in één keer (één query met de SQLite-store)
+    def get_many(self, role: str, entity_ids) -> Dict[Hashable, int]:
+        entity_ids = list(entity_ids)
+        if self._shared is not None:
+            return self._shared.get_many(role, entity_ids)
+        return {entity_id: self._versions.get((role, entity_id), 0) for entity_id in entity_ids}
+
+    def bump(self, role: str, *entity_ids: Hashable) -> None:
+        entity_ids = [entity_id for entity_id in entity_ids if entity_id is not None]
+        if not entity_ids:
+            return
+        if self._shared is not None:
+            self._shared.bump(role, entity_ids)
+            return
+        with self._lock:
+            for entity_id in entity_ids:
+                key = (role, entity_id)
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+
+# Versietellers in een SQLite-bestand (WAL), één connectie per thread en proces
+class SQLiteVersionStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS data_versions "
+            "(role TEXT NOT NULL, entity TEXT NOT NULL, version INTEGER NOT NULL, PRIMARY KEY (role, entity))"
+        )
+        # Eenmalig per bestand gekozen; alle workers lezen dezelfde waarde
+        self._connection().execute(
+            "INSERT OR IGNORE INTO data_versions (role, entity, version) VALUES ('epoch', '', ?)",
+            (secrets.randbits(62),),
+        )
+        self.epoch = format(self.get("epoch", ""), "x")
+
+    def _connection(self) -> sqlite3.Connection:
+        # Na een fork (gunicorn --preload) niet de connectie van de ouder hergebruiken
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, role: str, entity_id: Hashable) -> int:
+        row = (
+            self._connection()
+            .execute("SELECT version FROM data_versions WHERE role = ? AND entity = ?", (role, str(entity_id)))
+            .fetchone()
+        )
+        return row[0] if row else 0
+
+    def get_many(self, role: str, entity_ids) -> Dict[Hashable, int]:
+        if not entity_ids:
+            return {}
+        keys = {str(entity_id): entity_id for entity_id in entity_ids}
+        placeholders = ", ".join("?" for _ in keys)
+        rows = self._connection().execute(
+            f"SELECT entity, version FROM data_versions WHERE role = ? AND entity IN ({placeholders})",
+            (role, *keys),
+        )
+        versions = {entity_id: 0 for entity_id in entity_ids}
+        for entity, version in rows:
+            versions[keys[entity]] = version
+        return versions
+
+    def bump(self, role: str, entity_ids) -> None:
+        self._connection().executemany(
+            "INSERT INTO data_versions (role, entity, version) VALUES (?, ?, 1) "
+            "ON CONFLICT (role, entity) DO UPDATE SET version = version + 1",
+            [(role, str(entity_id)) for entity_id in entity_ids],
+        )
+
+
+data_versions = DataVersions()
+
+# Gerenderde dashboards: (html, etag) per rol/entiteit/versie/url
+fragment_cache = TTLCache({"Fragments": 120.0}, max_entries=512)
+
+# Incrementele planning (PlanningState) per bedrijf; na de TTL volledig herbouwd
+planning_cache = TTLCache({"Planning": 300.0}, max_entries=64)
@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
+
+from .storage import create_storage_client
 
 # Load environment variables from a local .env file if present
 load_dotenv()
@@ -8,6 +9,10 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'Agriflowgroup29')
 
+    # "supabase" (standaard) of "sqlite" voor een lokale database (load tests)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").lower()
+    SQLITE_PATH = os.getenv("SQLITE_PATH", "agriflow.db")
+
     SUPABASE_URL = os.getenv("SUPABASE_URL", "https://ikdirrysepokfryqnxre.supabase.co")
     SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
     
@@ -21,9 +26,36 @@ class Config:
     # Set Secure=True automatically when running behind HTTPS in production
     SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "false").lower() == "true"
 
-# Create Supabase client with error handling
+    # Sessies: "cookie" (Flask-standaard), "memory" (LRU, één proces) of "sqlite" (bestand)
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "cookie").lower()
+    SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "sessions.db")
+    SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+    # Sliding expiry: elke request schuift de vervaldatum op (PERMANENT_SESSION_LIFETIME)
+    SESSION_SLIDING = os.getenv("SESSION_SLIDING", "true").lower() == "true"
+
+    # Dataversies van de cache: "memory" (standaard, enkel correct met één proces) of
+    # "sqlite" (bestand, gedeeld tussen de workers op deze host; gunicorn.conf.py zet
+    # dit aan). Zonder pad komt het bestand in de instance-map van de app.
+    DATA_VERSIONS_BACKEND = os.getenv("DATA_VERSIONS_BACKEND", "memory").lower()
+    DATA_VERSIONS_PATH = os.getenv("DATA_VERSIONS_PATH", "")
+
+    # Live updates (SSE): "memory" (standaard) enkel binnen één proces, "sqlite" deelt
+    # de events tussen de workers op deze host (pad zoals bij de dataversies). Streams
+    # die tegelijk open mogen blijven per proces; daarboven (en bij sync-workers)
+    # pollt de browser in plaats van te streamen.
+    EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "memory").lower()
+    EVENTS_SQLITE_PATH = os.getenv("EVENTS_SQLITE_PATH", "")
+    SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", "8"))
+
+    # N+1-detectie: "off", "warn" of "raise"; leeg = raise in tests, warn in debug
+    QUERY_GUARD = os.getenv("QUERY_GUARD", "")
+    QUERY_GUARD_THRESHOLD = int(os.getenv("QUERY_GUARD_THRESHOLD", "5"))
+    # /metrics is enkel bereikbaar met deze token (Authorization: Bearer ...); leeg = uit
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Create the data client (Supabase or local SQLite) with error handling
 try:
-    supabase: Client = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY) if Config.SUPABASE_KEY else None
+    supabase = create_storage_client(Config)
 except Exception as e:
-    print(f"ERROR: Failed to create Supabase client: {e}")
+    print(f"ERROR: Failed to create {Config.STORAGE_BACKEND} client: {e}")
     supabase = None
@@ -0,0 +1,37 @@
+import atexit
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+# Gedeelde threadpool voor onafhankelijke Supabase-queries binnen één request.
+# De synchrone client (httpx) is thread-safe, dus queries kunnen parallel lopen
+# zodat de latency van een pagina die van de traagste query wordt.
+MAX_WORKERS = int(os.getenv("SUPABASE_FANOUT_WORKERS", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="supabase-fanout")
+atexit.register(_executor.shutdown, wait=False)
+
+
+# Voer de loaders gelijktijdig uit en geef een dict met dezelfde sleutels terug.
+# Loaders mogen geen request/sessie gebruiken: lees die waarden vooraf uit.
+# De eerste fout van een loader wordt na afloop opnieuw opgegooid.
+# Elke loader draait in een kopie van de huidige context, zodat per-request
+# instrumentatie (contextvars) ook de queries in de threads ziet.
+def fetch_concurrently(**loaders: Callable[[], Any]) -> Dict[str, Any]:
+    if len(loaders) <= 1:
+        return {name: loader() for name, loader in loaders.items()}
+    futures = {
+        name: _executor.submit(contextvars.copy_context().run, loader) for name, loader in loaders.items()
+    }
+    results = {}
+    first_error = None
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            if first_error is None:
+                first_error = e
+    if first_error is not None:
+        raise first_error
+    return results
@@ -0,0 +1,245 @@
+import itertools
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+# Aantal events per kanaal dat bewaard blijft voor herverbinden (Last-Event-ID)
+DEFAULT_HISTORY = 100
+# Maximaal aantal wachtende events per abonnee; trage abonnees verliezen de oudste
+DEFAULT_SUBSCRIBER_BUFFER = 256
+# Gedeelde (SQLite) publisher: aantal bewaarde events over alle kanalen en pollinterval
+DEFAULT_SHARED_HISTORY = 10_000
+DEFAULT_POLL_INTERVAL = 1.0
+
+ORDER_EVENT_TYPES = ("order.created", "order.assigned", "order.completed", "order.cancelled")
+
+
+# Abonnement op één kanaal; de SSE-stream leest hier met get(timeout) uit
+class Subscription:
+    def __init__(self, bus: "EventBus", channel: Hashable, maxsize: int = DEFAULT_SUBSCRIBER_BUFFER):
+        self.bus = bus
+        self.channel = channel
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=maxsize)
+
+    def put(self, event: Dict[str, Any]) -> None:
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+
+# In-process publisher: events gaan naar alle abonnees van het kanaal in dit proces.
+# Kanalen zijn tuples als ("company", 3) of ("driver", 7). Met meerdere workers is
+# SQLiteEventBus nodig (of een andere broker via set_event_bus() met dezelfde
+# methodes publish/subscribe/unsubscribe/last_event_id).
+class EventBus:
+    def __init__(self, history: int = DEFAULT_HISTORY):
+        self.history = history
+        self._subscribers: Dict[Hashable, Set[Subscription]] = {}
+        self._recent: Dict[Hashable, Deque[Dict[str, Any]]] = {}
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    def publish(self, channel: Hashable, event_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            event = {"id": next(self._ids), "type": event_type, "time": time.time(), "data": data}
+            self._last_id = event["id"]
+            recent = self._recent.get(channel)
+            if recent is None:
+                recent = self._recent[channel] = deque(maxlen=self.history)
+            recent.append(event)
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+        return event
+
+    # Abonneer op een kanaal; met last_event_id worden gemiste events eerst opnieuw geleverd
+    def subscribe(self, channel: Hashable, last_event_id: Optional[int] = None) -> Subscription:
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+            if last_event_id is not None:
+                for event in self._recent.get(channel, ()):
+                    if event["id"] > last_event_id:
+                        subscription.put(event)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def subscriber_count(self, channel: Hashable) -> int:
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+    def last_event_id(self) -> int:
+        return self._last_id
+
+
+# Abonnement op de gedeelde publisher: get() pollt de events-tabel na het laatst geziene id
+class PollingSubscription:
+    def __init__(self, bus: "SQLiteEventBus", channel: Hashable, after_id: int):
+        self.bus = bus
+        self.channel = channel
+        self.after_id = after_id
+        self._pending: Deque[Dict[str, Any]] = deque()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._pending:
+            events = self.bus.fetch(self.channel, self.after_id)
+            if events:
+                self._pending.extend(events)
+                self.after_id = events[-1]["id"]
+                break
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            time.sleep(self.bus.poll_interval if remaining is None else min(self.bus.poll_interval, remaining))
+        return self._pending.popleft()
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+
+# Publisher in een SQLite-bestand dat alle workers op de host delen: publish schrijft
+# een rij, abonnees pollen. De ids zijn over de workers heen oplopend, zodat
+# Last-Event-ID ook werkt als de browser bij een andere worker opnieuw verbindt.
+class SQLiteEventBus:
+    def __init__(
+        self,
+        path: str,
+        history: int = DEFAULT_SHARED_HISTORY,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        self.path = path
+        self.history = history
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._publishes = itertools.count(1)
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "channel TEXT NOT NULL, type TEXT NOT NULL, time REAL NOT NULL, data TEXT NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS events_channel_id ON events (channel, id)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # Eén connectie per thread; na een fork (gunicorn --preload) een nieuwe
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def _channel_key(channel: Hashable) -> str:
+        return ":".join(map(str, channel)) if isinstance(channel, tuple) else str(channel)
+
+    def publish(self, channel: Hashable, event_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        event = {"type": event_type, "time": time.time(), "data": data}
+        connection = self._connection()
+        cursor = connection.execute(
+            "INSERT INTO events (channel, type, time, data) VALUES (?, ?, ?, ?)",
+            (self._channel_key(channel), event_type, event["time"], json.dumps(data, default=str)),
+        )
+        event["id"] = cursor.lastrowid
+        if next(self._publishes) % 100 == 0:
+            connection.execute("DELETE FROM events WHERE id <= ?", (event["id"] - self.history,))
+        return event
+
+    def fetch(self, channel: Hashable, after_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT id, type, time, data FROM events WHERE channel = ? AND id > ? ORDER BY id LIMIT ?",
+            (self._channel_key(channel), after_id, limit),
+        )
+        return [{"id": row[0], "type": row[1], "time": row[2], "data": json.loads(row[3])} for row in rows]
+
+    # Zonder last_event_id enkel events vanaf nu, met last_event_id eerst de gemiste
+    def subscribe(self, channel: Hashable, last_event_id: Optional[int] = None) -> PollingSubscription:
+        after_id = self.last_event_id() if last_event_id is None else last_event_id
+        return PollingSubscription(self, channel, after_id)
+
+    def unsubscribe(self, subscription: PollingSubscription) -> None:
+        pass
+
+    def last_event_id(self) -> int:
+        row = self._connection().execute("SELECT MAX(id) FROM events").fetchone()
+        return row[0] or 0
+
+
+event_bus = EventBus()
+
+
+def get_event_bus() -> EventBus:
+    return event_bus
+
+
+# Vervang de publisher (bv. door SQLiteEventBus of een adapter voor een broker)
+def set_event_bus(bus) -> None:
+    global event_bus
+    event_bus = bus
+
+
+# Kies de publisher uit de config: "sqlite" (gedeeld tussen workers) of "memory" (één proces)
+def configure_event_bus(config) -> None:
+    backend = (config.get("EVENTS_BACKEND") or "memory").lower()
+    if backend == "sqlite":
+        set_event_bus(SQLiteEventBus(config.get("EVENTS_SQLITE_PATH", "events.db")))
+    elif backend == "memory":
+        set_event_bus(EventBus())
+    else:
+        raise ValueError(f"Onbekende EVENTS_BACKEND '{backend}', kies uit memory, sqlite")
+
+
+# Publiceer één order-wijziging naar de kanalen van de betrokken bedrijven en chauffeurs
+def publish_order_event(
+    event_type: str,
+    order: Dict[str, Any],
+    company_ids=(),
+    driver_ids=(),
+) -> List[Tuple[Hashable, Dict[str, Any]]]:
+    data = {
+        "order_id": order.get("id"),
+        "status": order.get("status"),
+        "driver_id": order.get("driver_id"),
+        "deadline": order.get("deadline"),
+    }
+    published = []
+    channels = [("company", company_id) for company_id in dict.fromkeys(company_ids) if company_id is not None]
+    channels += [("driver", driver_id) for driver_id in dict.fromkeys(driver_ids) if driver_id is not None]
+    for channel in channels:
+        published.append((channel, event_bus.publish(channel, event_type, data)))
+    return published
+
+
+# Eén event in het text/event-stream-formaat
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
@@ -0,0 +1,403 @@
+import contextvars
+import hmac
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Response, abort, g, request
+
+logger = logging.getLogger(__name__)
+
+# Querybuilder-methodes die de soort query bepalen
+OPERATIONS = ("select", "insert", "update", "upsert", "delete")
+# Filtermethodes; de kolom (niet de waarde) vormt de "vorm" van een query
+FILTERS = (
+    "eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "is_", "in_",
+    "contains", "contained_by", "match", "filter", "or_",
+)
+QUANTILES = (0.5, 0.95, 0.99)
+# Aantal recente metingen per endpoint/tabel waarover de kwantielen berekend worden
+QUANTILE_WINDOW = 1024
+
+# N+1-detectie: "off", "warn" (loggen) of "raise" (exception, voor tests)
+GUARD_MODES = ("off", "warn", "raise")
+DEFAULT_GUARD_THRESHOLD = 5
+# Maximaal aantal queries per request voor de zwaarste pagina's
+QUERY_BUDGETS = {
+    "routes.company_assign_drivers": 8,
+    "routes.company_dashboard": 8,
+    "routes.company_statistics": 4,
+    "routes.customer_orders": 4,
+    "routes.driver_dashboard": 6,
+    "routes.home": 6,
+    "routes.order": 6,
+    "routes.profile": 4,
+}
+
+_current_stats: contextvars.ContextVar[Optional["RequestQueryStats"]] = contextvars.ContextVar(
+    "agriflow_request_query_stats", default=None
+)
+
+
+# Eén uitgevoerde query: tabel, soort, filtervorm en duur (seconden)
+class QueryRecord:
+    __slots__ = ("table", "operation", "shape", "seconds")
+
+    def __init__(self, table: str, operation: str, shape: Tuple, seconds: float):
+        self.table = table
+        self.operation = operation
+        self.shape = shape
+        self.seconds = seconds
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+# Queries van één request; ook gevuld vanuit de fan-out threads, dus met lock
+class RequestQueryStats:
+    def __init__(self, endpoint: str, guard_mode: str = "off", guard_threshold: int = DEFAULT_GUARD_THRESHOLD):
+        self.endpoint = endpoint
+        self.guard_mode = guard_mode
+        self.guard_threshold = guard_threshold
+        self.records: List[QueryRecord] = []
+        self.shape_counts: Dict[Tuple, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    # Geeft terug hoe vaak deze tabel/filtervorm al uitgevoerd is in dit request
+    def add(self, record: QueryRecord) -> int:
+        key = (record.table, record.operation, record.shape)
+        with self._lock:
+            self.records.append(record)
+            self.shape_counts[key] += 1
+            return self.shape_counts[key]
+
+    def repeated_shapes(self) -> Dict[Tuple, int]:
+        return {key: count for key, count in self.shape_counts.items() if count > self.guard_threshold}
+
+    @property
+    def query_count(self) -> int:
+        return len(self.records)
+
+    @property
+    def query_seconds(self) -> float:
+        return sum(r.seconds for r in self.records)
+
+
+def current_request_stats() -> Optional[RequestQueryStats]:
+    return _current_stats.get()
+
+
+# Proces-brede tellers en recente latencies voor /metrics
+class MetricsRegistry:
+    def __init__(self, window: int = QUANTILE_WINDOW):
+        self._lock = threading.Lock()
+        self._window = window
+        self.request_count: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.request_seconds: Dict[str, float] = defaultdict(float)
+        self.request_samples: Dict[str, deque] = {}
+        self.request_query_samples: Dict[str, deque] = {}
+        self.query_count: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self.query_seconds: Dict[Tuple[str, str, str], float] = defaultdict(float)
+        self.query_samples: Dict[str, deque] = {}
+
+    def _samples(self, store: Dict[str, deque], key: str) -> deque:
+        samples = store.get(key)
+        if samples is None:
+            samples = store[key] = deque(maxlen=self._window)
+        return samples
+
+    def observe_request(self, endpoint: str, status: int, seconds: float, stats: RequestQueryStats) -> None:
+        with self._lock:
+            self.request_count[(endpoint, str(status))] += 1
+            self.request_seconds[endpoint] += seconds
+            self._samples(self.request_samples, endpoint).append(seconds)
+            self._samples(self.request_query_samples, endpoint).append(stats.query_count)
+            for record in stats.records:
+                key = (endpoint, record.table, record.operation)
+                self.query_count[key] += 1
+                self.query_seconds[key] += record.seconds
+                self._samples(self.query_samples, record.table).append(record.seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            for store in (
+                self.request_count, self.request_seconds, self.request_samples,
+                self.request_query_samples, self.query_count, self.query_seconds, self.query_samples,
+            ):
+                store.clear()
+
+    # Prometheus text exposition format (versie 0.0.4)
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP agriflow_requests_total Aantal afgehandelde requests per endpoint en status.",
+                "# TYPE agriflow_requests_total counter",
+            ]
+            for (endpoint, status), count in sorted(self.request_count.items()):
+                lines.append(f'agriflow_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+            lines += [
+                "# HELP agriflow_request_duration_seconds Duur van requests per endpoint.",
+                "# TYPE agriflow_request_duration_seconds summary",
+            ]
+            for endpoint, samples in sorted(self.request_samples.items()):
+                lines += _summary_lines(
+                    "agriflow_request_duration_seconds",
+                    f'endpoint="{endpoint}"',
+                    samples,
+                    self.request_seconds[endpoint],
+                    sum(c for (e, _), c in self.request_count.items() if e == endpoint),
+                )
+
+            lines += [
+                "# HELP agriflow_request_queries Aantal databasequeries per request.",
+                "# TYPE agriflow_request_queries summary",
+            ]
+            for endpoint, samples in sorted(self.request_query_samples.items()):
+                lines += _summary_lines("agriflow_request_queries", f'endpoint="{endpoint}"', samples)
+
+            lines += [
+                "# HELP agriflow_db_queries_total Aantal databasequeries per endpoint, tabel en soort.",
+                "# TYPE agriflow_db_queries_total counter",
+            ]
+            for (endpoint, table, operation), count in sorted(self.query_count.items()):
+                labels = f'endpoint="{endpoint}",table="{table}",operation="{operation}"'
+                lines.append(f"agriflow_db_queries_total{{{labels}}} {count}")
+
+            lines += [
+                "# HELP agriflow_db_query_seconds_total Totale querytijd per endpoint, tabel en soort.",
+                "# TYPE agriflow_db_query_seconds_total counter",
+            ]
+            for (endpoint, table, operation), seconds in sorted(self.query_seconds.items()):
+                labels = f'endpoint="{endpoint}",table="{table}",operation="{operation}"'
+                lines.append(f"agriflow_db_query_seconds_total{{{labels}}} {seconds:.6f}")
+
+            lines += [
+                "# HELP agriflow_db_query_duration_seconds Latency van databasequeries per tabel.",
+                "# TYPE agriflow_db_query_duration_seconds summary",
+            ]
+            for table, samples in sorted(self.query_samples.items()):
+                lines += _summary_lines("agriflow_db_query_duration_seconds", f'table="{table}"', samples)
+        return "\n".join(lines) + "\n"
+
+
+# Kwantielen over het recente venster, plus _sum en _count
+def _summary_lines(name: str, labels: str, samples, total: Optional[float] = None, count: Optional[int] = None):
+    ordered = sorted(samples)
+    lines = []
+    for q in QUANTILES:
+        value = ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0
+        lines.append(f'{name}{{{labels},quantile="{q}"}} {value:.6f}')
+    lines.append(f"{name}_sum{{{labels}}} {(sum(ordered) if total is None else total):.6f}")
+    lines.append(f"{name}_count{{{labels}}} {len(ordered) if count is None else count}")
+    return lines
+
+
+metrics = MetricsRegistry()
+
+
+def _guard_violation(mode: str, message: str) -> None:
+    if mode == "raise":
+        raise QueryBudgetExceeded(message)
+    if mode == "warn":
+        logger.warning(message)
+
+
+def _describe_shape(table: str, operation: str, shape: Tuple) -> str:
+    filters = ", ".join(f"{name}({column})" if column else name for name, column in shape)
+    return f"{operation} {table}" + (f" [{filters}]" if filters else "")
+
+
+# Enkel registreren: een exception hier zou in execute() vallen, waar de routes
+# ze vaak opvangen (except Exception). De controle gebeurt na de request.
+def _record(table: str, operation: str, shape: Tuple, seconds: float) -> None:
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    stats.add(QueryRecord(table, operation, shape, seconds))
+
+
+# Controleer een afgehandelde request: het totaal aantal queries tegen QUERY_BUDGETS
+# en elke tabel/filtervorm die vaker dan de drempel uitgevoerd werd (N+1)
+def check_query_budget(stats: RequestQueryStats, budgets: Optional[Dict[str, int]] = None) -> None:
+    if stats.guard_mode == "off":
+        return
+    problems = [
+        f"Mogelijke N+1 in {stats.endpoint}: {_describe_shape(table, operation, shape)} "
+        f"{count}x uitgevoerd (drempel {stats.guard_threshold})"
+        for (table, operation, shape), count in stats.repeated_shapes().items()
+    ]
+    budget = (QUERY_BUDGETS if budgets is None else budgets).get(stats.endpoint)
+    if budget is not None and stats.query_count > budget:
+        problems.append(f"{stats.endpoint} voerde {stats.query_count} queries uit (budget {budget})")
+    if problems:
+        _guard_violation(stats.guard_mode, "; ".join(problems))
+
+
+_budget_listeners: List[List[RequestQueryStats]] = []
+
+
+# Voor tests: verzamel de requests binnen het blok en faal als één ervan meer
+# dan max_queries queries uitvoerde of een tabel/filtervorm herhaalde boven
+# max_per_shape (standaard de QUERY_GUARD_THRESHOLD van de request).
+#     with query_budget(5):
+#         client.get("/company/dashboard")
+@contextmanager
+def query_budget(max_queries: int, max_per_shape: Optional[int] = None):
+    collected: List[RequestQueryStats] = []
+    _budget_listeners.append(collected)
+    try:
+        yield collected
+    finally:
+        _budget_listeners.remove(collected)
+    for stats in collected:
+        if stats.query_count > max_queries:
+            raise QueryBudgetExceeded(f"{stats.endpoint}: {stats.query_count} queries (budget {max_queries})")
+        if max_per_shape is None:
+            repeated = stats.repeated_shapes()
+        else:
+            repeated = {key: count for key, count in stats.shape_counts.items() if count > max_per_shape}
+        for (table, operation, shape), count in repeated.items():
+            raise QueryBudgetExceeded(
+                f"{stats.endpoint}: {_describe_shape(table, operation, shape)} {count}x uitgevoerd"
+            )
+
+
+# Proxy rond een PostgREST-querybuilder: onthoudt tabel, soort en filters
+# en meet de duur van execute(). Elke builder die terugkomt wordt opnieuw ingepakt.
+class InstrumentedQuery:
+    __slots__ = ("_builder", "_table", "_operation", "_filters")
+
+    def __init__(self, builder: Any, table: str, operation: str = "select", filters: Tuple = ()):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+        self._filters = filters
+
+    def _wrap(self, result: Any, name: str, args: Tuple) -> Any:
+        if not hasattr(result, "execute"):
+            return result
+        operation = name if name in OPERATIONS else self._operation
+        filters = self._filters
+        if name in FILTERS:
+            column = args[0] if args and name != "or_" else None
+            filters = filters + ((name.rstrip("_"), column),)
+        return InstrumentedQuery(result, self._table, operation, filters)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            # bv. .not_ is een property die een builder teruggeeft
+            return self._wrap(attr, name, ())
+
+        def call(*args, **kwargs):
+            return self._wrap(attr(*args, **kwargs), name, args)
+
+        return call
+
+    @property
+    def shape(self) -> Tuple:
+        return (self._table, self._operation, self._filters)
+
+    def execute(self):
+        start = time.perf_counter()
+        try:
+            return self._builder.execute()
+        finally:
+            _record(self._table, self._operation, self._filters, time.perf_counter() - start)
+
+
+# Proxy rond de Supabase-client (of de SQLite-backend); auth e.d. gaan ongewijzigd door
+class InstrumentedClient:
+    def __init__(self, client: Any):
+        self.wrapped = client
+
+    def table(self, name: str) -> InstrumentedQuery:
+        return InstrumentedQuery(self.wrapped.table(name), name)
+
+    def from_(self, name: str) -> InstrumentedQuery:
+        return InstrumentedQuery(self.wrapped.from_(name), name)
+
+    def rpc(self, fn: str, *args, **kwargs) -> InstrumentedQuery:
+        return InstrumentedQuery(self.wrapped.rpc(fn, *args, **kwargs), f"rpc:{fn}", "rpc")
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.wrapped, name)
+
+
+def instrument_client(client: Any) -> Any:
+    if client is None or isinstance(client, InstrumentedClient):
+        return client
+    return InstrumentedClient(client)
+
+
+def unwrap_client(client: Any) -> Any:
+    return client.wrapped if isinstance(client, InstrumentedClient) else client
+
+
+def _server_timing(stats: RequestQueryStats, total_seconds: float) -> str:
+    per_table: Dict[str, float] = defaultdict(float)
+    for record in stats.records:
+        per_table[record.table] += record.seconds
+    parts = [f'db;dur={stats.query_seconds * 1000:.1f};desc="{stats.query_count} queries"']
+    for table, seconds in sorted(per_table.items()):
+        parts.append(f"db-{table.replace(':', '-')};dur={seconds * 1000:.1f}")
+    parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# Installeer de request-hooks en /metrics op de app; de client zelf wordt al
+# ingepakt waar hij gemaakt wordt (create_storage_client)
+def install_instrumentation(app) -> None:
+    # Standaard: exception in tests, waarschuwing in debug, anders uit
+    def guard_mode() -> str:
+        mode = (app.config.get("QUERY_GUARD") or "").lower()
+        if mode in GUARD_MODES:
+            return mode
+        return "raise" if app.testing else "warn" if app.debug else "off"
+
+    @app.before_request
+    def start_request_instrumentation():
+        g.request_started_at = time.perf_counter()
+        stats = RequestQueryStats(
+            request.endpoint or "unknown",
+            guard_mode(),
+            app.config.get("QUERY_GUARD_THRESHOLD", DEFAULT_GUARD_THRESHOLD),
+        )
+        g.query_stats = stats
+        g.query_stats_token = _current_stats.set(stats)
+
+    @app.after_request
+    def finish_request_instrumentation(response):
+        stats = g.get("query_stats")
+        if stats is None or request.endpoint == "metrics":
+            return response
+        total_seconds = time.perf_counter() - g.request_started_at
+        response.headers["Server-Timing"] = _server_timing(stats, total_seconds)
+        metrics.observe_request(stats.endpoint, response.status_code, total_seconds, stats)
+        for collected in _budget_listeners:
+            collected.append(stats)
+        check_query_budget(stats)
+        return response
+
+    @app.teardown_request
+    def reset_request_instrumentation(exc=None):
+        token = g.pop("query_stats_token", None)
+        if token is not None:
+            _current_stats.reset(token)
+
+    # Enkel met een geconfigureerde METRICS_TOKEN, mee te geven als
+    # "Authorization: Bearer <token>" (bearer_token in de Prometheus-scrapeconfig)
+    @app.route("/metrics")
+    def metrics_endpoint():
+        token = app.config.get("METRICS_TOKEN") or ""
+        if not token:
+            abort(404)
+        supplied = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(supplied.encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+            return Response("Unauthorized\n", 401, {"WWW-Authenticate": "Bearer"}, mimetype="text/plain")
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -1,23 +1,46 @@
 from datetime import datetime
 
-from flask import flash, redirect, render_template, request, session, url_for
+from flask import flash, jsonify, redirect, render_template, request, session, url_for
 
 from ..config import supabase
+from ..data_access import fetch_concurrently
+from ..events import publish_order_event
 from .routes import (
+    ALL_TASK_TYPES,
+    apply_keyset,
     bp,
     build_order_info_for_edit,
+    conditional_json,
     format_address_data,
     get_addresses_for_client,
     get_client_id,
     get_company_id,
     get_companies_list,
-    get_previous_orders_for_customer,
+    get_identity,
+    get_page_size,
+    get_task_type_company_id,
     get_task_type_name,
+    get_task_types_etag,
+    get_task_types_for_companies,
+    get_task_types_for_company,
+    invalidate_company_home,
+    invalidate_dashboards,
     is_order_overdue,
+    load_order_page_data,
     login_required,
+    remove_from_planning,
+    render_cached,
+    split_page,
+    task_types_payload,
+    update_planning,
     validate_user_type,
 )
 
+# Browsers mogen taaktypes kort hergebruiken en daarna valideren via de ETag;
+# private: gedeelde caches (proxies) bewaren het antwoord niet
+TASK_TYPES_CACHE_CONTROL = "private, max-age=60"
+MAX_BULK_COMPANIES = 500
+
 
 # Profielpagina (gegevens + adressen/taaktypes)
 @bp.route("/profile", methods=["GET", "POST"])
@@ -30,67 +53,53 @@ def profile():
     sb = supabase
 
     if user_type == "driver":
-        try:
-            driver_result = (
-                sb.table("Drivers")
-                .select("id, name, company_id")
-                .eq("email_address", session.get("email"))
-                .limit(1)
-                .execute()
-            )
-            if driver_result.data:
-                driver_data = driver_result.data[0]
-                if driver_data.get("name"):
-                    user_ctx["display_name"] = driver_data["name"]
-                company_id = driver_data.get("company_id")
-                if company_id:
-                    company_result = (
-                        sb.table("Companies").select("name").eq("id", company_id).limit(1).execute()
-                    )
-                    if company_result.data:
-                        user_ctx["company_name"] = company_result.data[0].get("name", "")
-        except Exception:
-            pass
+        identity = get_identity()
+        if identity.get("driver_id"):
+            user_ctx["display_name"] = identity.get("display_name")
+            if identity.get("company_id") and identity.get("company_name") is not None:
+                user_ctx["company_name"] = identity["company_name"]
 
     elif user_type == "customer":
         first_name = session.get("first_name", "")
         last_name = session.get("last_name", "")
-        if not (first_name or last_name):
-            try:
-                client_id = session.get("client_id") or get_client_id()
-                if client_id:
-                    client_result = (
-                        sb.table("Client").select("Name, Lastname").eq("id", client_id).limit(1).execute()
-                    )
-                    if client_result.data:
-                        client_data = client_result.data[0]
-                        first_name = client_data.get("Name", "")
-                        last_name = client_data.get("Lastname", "")
-                        if first_name or last_name:
-                            session["first_name"] = first_name
-                            session["last_name"] = last_name
-            except Exception:
-                pass
+        client_id = get_client_id()
 
-        if first_name or last_name:
-            user_ctx["first_name"] = first_name
-            user_ctx["last_name"] = last_name
-            user_ctx["display_name"] = f"{first_name} {last_name}".strip()
+        def load_client_name():
+            if first_name or last_name or not client_id:
+                return None
+            client_result = sb.table("Client").select("Name, Lastname").eq("id", client_id).limit(1).execute()
+            return client_result.data[0] if client_result.data else None
+
+        def load_addresses():
+            if not client_id:
+                return []
+            addresses_result = (
+                sb.table("Address")
+                .select("*")
+                .eq("client_id", client_id)
+                .order("created_at", desc=False)
+                .execute()
+            )
+            return addresses_result.data if addresses_result.data else []
 
         try:
-            client_id = get_client_id()
-            if client_id:
-                addresses_result = (
-                    sb.table("Address")
-                    .select("*")
-                    .eq("client_id", client_id)
-                    .order("created_at", desc=False)
-                    .execute()
-                )
-                addresses = addresses_result.data if addresses_result.data else []
+            loaded = fetch_concurrently(client=load_client_name, addresses=load_addresses)
+            addresses = loaded["addresses"]
+            client_data = loaded["client"]
+            if client_data:
+                first_name = client_data.get("Name", "")
+                last_name = client_data.get("Lastname", "")
+                if first_name or last_name:
+                    session["first_name"] = first_name
+                    session["last_name"] = last_name
         except Exception as e:
             flash(f"Kon adressen niet ophalen: {e}", "error")
 
+        if first_name or last_name:
+            user_ctx["first_name"] = first_name
+            user_ctx["last_name"] = last_name
+            user_ctx["display_name"] = f"{first_name} {last_name}".strip()
+
     elif user_type == "company":
         try:
             company_id = get_company_id()
@@ -218,87 +227,60 @@ def customer_orders():
                 user_email=session.get("email", ""),
             )
 
-        addresses_result = supabase.table("Address").select("id").eq("client_id", client_id).execute()
-        address_ids = [addr["id"] for addr in addresses_result.data] if addresses_result.data else []
+        def render():
+            page_size = get_page_size()
+            cursor = request.args.get("cursor")
+            orders_query = (
+                supabase.table("Orders")
+                .select(
+                    "*, Address!orders_address_id_fkey!inner(*), "
+                    "TaskTypes(*, Companies(id, name)), Drivers(name)"
+                )
+                .eq("Address.client_id", client_id)
+            )
+            orders_result = apply_keyset(orders_query, "created_at", cursor, desc=True).limit(page_size + 1).execute()
+            page_orders, next_cursor = split_page(orders_result.data, page_size, "created_at")
+
+            orders = []
+            if page_orders:
+                for order in page_orders:
+                    order_info = {
+                        "id": order.get("id"),
+                        "deadline": order.get("deadline"),
+                        "task_type": get_task_type_name(order.get("task_type_id"), order.get("TaskTypes")),
+                        "product_type": order.get("product_type"),
+                        "created_at": order.get("created_at"),
+                        "address": format_address_data(order.get("Address")),
+                        "company": None,
+                        "driver_id": order.get("driver_id"),
+                        "driver_name": None,
+                        "status": order.get("status"),
+                        "is_overdue": is_order_overdue(order.get("deadline"), order.get("status")),
+                    }
+
+                    company = (order.get("TaskTypes") or {}).get("Companies")
+                    if order.get("task_type_id") and company:
+                        order_info["company"] = {"name": company.get("name"), "id": company.get("id")}
+
+                    if order.get("driver_id"):
+                        order_info["driver_name"] = (order.get("Drivers") or {}).get("name") or "Onbekend"
+
+                    orders.append(order_info)
+
+            active_orders = [o for o in orders if o.get("status") != "completed"]
+            completed_orders = [o for o in orders if o.get("status") == "completed"]
 
-        if not address_ids:
             return render_template(
                 "customer_orders.html",
-                active_orders=[],
-                completed_orders=[],
+                active_orders=active_orders,
+                completed_orders=completed_orders,
                 user_email=session.get("email", ""),
+                cursor=cursor,
+                next_cursor=next_cursor,
+                page_size=page_size,
             )
 
-        orders_result = (
-            supabase.table("Orders")
-            .select("*, Address!orders_address_id_fkey(*), TaskTypes(*)")
-            .in_("address_id", address_ids)
-            .order("created_at", desc=True)
-            .limit(100)
-            .execute()
-        )
-
-        orders = []
-        if orders_result and orders_result.data:
-            for order in orders_result.data:
-                order_info = {
-                    "id": order.get("id"),
-                    "deadline": order.get("deadline"),
-                    "task_type": get_task_type_name(order.get("task_type_id"), order.get("TaskTypes")),
-                    "product_type": order.get("product_type"),
-                    "created_at": order.get("created_at"),
-                    "address": format_address_data(order.get("Address")),
-                    "company": None,
-                    "driver_id": order.get("driver_id"),
-                    "driver_name": None,
-                    "status": order.get("status"),
-                    "is_overdue": is_order_overdue(order.get("deadline"), order.get("status")),
-                }
-
-                task_type_id = order.get("task_type_id")
-                if task_type_id and order.get("TaskTypes"):
-                    company_id_from_task = order["TaskTypes"].get("company_id")
-                    if company_id_from_task:
-                        try:
-                            company_result = (
-                                supabase.table("Companies")
-                                .select("name, id")
-                                .eq("id", company_id_from_task)
-                                .limit(1)
-                                .execute()
-                            )
-                            if company_result.data:
-                                company = company_result.data[0]
-                                order_info["company"] = {"name": company.get("name"), "id": company.get("id")}
-                        except Exception:
-                            pass
-
-                driver_id = order.get("driver_id")
-                if driver_id:
-                    try:
-                        driver_result = (
-                            supabase.table("Drivers")
-                            .select("name")
-                            .eq("id", driver_id)
-                            .limit(1)
-                            .execute()
-                        )
-                        if driver_result.data:
-                            order_info["driver_name"] = driver_result.data[0].get("name", "Onbekend")
-                    except Exception:
-                        pass
-
-                orders.append(order_info)
-
-        active_orders = [o for o in orders if o.get("status") != "completed"]
-        completed_orders = [o for o in orders if o.get("status") == "completed"]
-
-        return render_template(
-            "customer_orders.html",
-            active_orders=active_orders,
-            completed_orders=completed_orders,
-            user_email=session.get("email", ""),
-        )
+        return render_cached("customer", client_id, render, depends_on=[("task_types", ALL_TASK_TYPES)])
     except Exception as e:
         flash(f"Fout bij het ophalen van bestellingen: {str(e)}", "error")
         return render_template(
@@ -327,7 +309,7 @@ def cancel_order(order_id):
         order_result = (
             sb.table("Orders")
             .select(
-                "id, driver_id, status, address_id, Address!orders_address_id_fkey!inner(client_id)"
+                "id, driver_id, status, address_id, Address!orders_address_id_fkey!inner(client_id), TaskTypes(company_id)"
             )
             .eq("id", order_id)
             .eq("Address.client_id", client_id)
@@ -355,6 +337,11 @@ def cancel_order(order_id):
         delete_result = sb.table("Orders").delete().eq("id", order_id).execute()
 
         if delete_result.data:
+            company_id = (order.get("TaskTypes") or {}).get("company_id")
+            invalidate_company_home(company_id)
+            invalidate_dashboards(company_ids=[company_id], client_ids=[client_id])
+            remove_from_planning([company_id], order_id)
+            publish_order_event("order.cancelled", {**order, "status": "cancelled"}, company_ids=[company_id])
             flash("Bestelling succesvol geannuleerd.", "success")
         else:
             flash("Bestelling kon niet worden geannuleerd.", "error")
@@ -469,6 +456,11 @@ def edit_order(order_id):
                         flash("Ongeldig gewicht. Voer een geldig getal in.", "error")
                         return render_template("edit_order.html", **template_vars)
 
+                order_company_id = get_task_type_company_id(task_type_id)
+                if task_type_id and order_company_id != company_id:
+                    flash("Ongeldig taaktype geselecteerd.", "error")
+                    return render_template("edit_order.html", **template_vars)
+
                 order_update_data = {
                     "deadline": request.form.get("deadline"),
                     "task_type_id": task_type_id if task_type_id else None,
@@ -480,6 +472,11 @@ def edit_order(order_id):
                 order_update_result = sb.table("Orders").update(order_update_data).eq("id", order_id).execute()
 
                 if order_update_result.data:
+                    previous_company_id = (order_data.get("TaskTypes") or {}).get("company_id")
+                    invalidate_dashboards(company_ids=[previous_company_id, order_company_id], client_ids=[client_id])
+                    if previous_company_id != order_company_id:
+                        remove_from_planning([previous_company_id], order_id)
+                    update_planning([order_company_id], order_update_result.data[0])
                     flash("Bestelling bijgewerkt!", "success")
                     return redirect(url_for("routes.customer_orders"))
                 else:
@@ -509,10 +506,10 @@ def order():
 
     sb = supabase
     client_id = get_client_id()
-    companies = get_companies_list()
-    addresses = get_addresses_for_client(client_id)
-    previous_orders = get_previous_orders_for_customer(client_id)
-    previous_orders.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+    page_data = load_order_page_data(client_id)
+    companies = page_data["companies"]
+    addresses = page_data["addresses"]
+    previous_orders = page_data["previous_orders"]
 
     if request.method == "POST":
         try:
@@ -521,18 +518,10 @@ def order():
             if address_id_str:
                 try:
                     address_id = int(address_id_str)
-                    client_id = get_client_id()
 
+                    # Valideer tegen de reeds geladen adressen van deze klant
                     if client_id:
-                        address_check = (
-                            sb.table("Address")
-                            .select("id")
-                            .eq("id", address_id)
-                            .eq("client_id", client_id)
-                            .limit(1)
-                            .execute()
-                        )
-                        if not address_check.data or len(address_check.data) == 0:
+                        if not any(addr.get("id") == address_id for addr in addresses):
                             flash("Ongeldig adres geselecteerd.", "error")
                             return render_template(
                                 "order.html",
@@ -623,6 +612,15 @@ def order():
                 except (ValueError, TypeError):
                     pass
 
+            # Het bedrijf van de order volgt uit het taaktype (TaskTypes.company_id);
+            # zonder taaktype hoort ze bij geen enkel bedrijf
+            order_company_id = get_task_type_company_id(task_type_id)
+            if task_type_id and order_company_id != company_id:
+                flash("Ongeldig taaktype geselecteerd.", "error")
+                return render_template(
+                    "order.html", companies=companies, addresses=addresses, previous_orders=previous_orders
+                )
+
             order_data = {
                 "deadline": request.form.get("deadline"),
                 "task_type_id": task_type_id if task_type_id else None,
@@ -635,6 +633,10 @@ def order():
             order_result = sb.table("Orders").insert(order_data).execute()
 
             if order_result.data:
+                invalidate_company_home(order_company_id)
+                invalidate_dashboards(company_ids=[order_company_id], client_ids=[client_id])
+                update_planning([order_company_id], order_result.data[0])
+                publish_order_event("order.created", order_result.data[0], company_ids=[order_company_id])
                 flash("Bestelling geplaatst!", "success")
                 return redirect(url_for("routes.home"))
             else:
@@ -646,24 +648,48 @@ def order():
     return render_template("order.html", companies=companies, addresses=addresses, previous_orders=previous_orders)
 
 
-# API: taaktypes per bedrijf ophalen
+# API: taaktypes per bedrijf ophalen. Sterke ETag uit de taaktype-versie;
+# een overeenkomende If-None-Match geeft 304 zonder body en zonder de taaktypes te laden.
 @bp.route("/api/company/<int:company_id>/task-types", methods=["GET"])
 def get_company_task_types(company_id):
     try:
-        sb = supabase
-        task_types_result = (
-            sb.table("TaskTypes").select("id, task_type").eq("company_id", company_id).order("task_type").execute()
-        )
 
-        task_types = []
-        if task_types_result.data:
-            task_types = [{"id": tt["id"], "name": tt["task_type"]} for tt in task_types_result.data]
+        def load():
+            task_types = task_types_payload(get_task_types_for_company(company_id))
+            return {"task_types": task_types, "has_task_types": len(task_types) > 0}
 
-        from flask import jsonify
-
-        return jsonify({"task_types": task_types, "has_task_types": len(task_types) > 0})
+        return conditional_json(get_task_types_etag([company_id]), load, TASK_TYPES_CACHE_CONTROL)
     except Exception as e:
-        from flask import jsonify
+        return jsonify({"error": str(e)}), 500
+
+
+# API: taaktypes van meerdere bedrijven in één keer (?company_ids=1,2,3),
+# zodat het orderformulier alles vooraf kan ophalen
+@bp.route("/api/task-types", methods=["GET"])
+def get_task_types_bulk():
+    try:
+        company_ids = []
+        for value in request.args.get("company_ids", "").split(","):
+            value = value.strip()
+            if value:
+                company_ids.append(int(value))
+    except ValueError:
+        return jsonify({"error": "Ongeldige company_ids."}), 400
+    company_ids = sorted(set(company_ids))
+    if len(company_ids) > MAX_BULK_COMPANIES:
+        return jsonify({"error": f"Maximaal {MAX_BULK_COMPANIES} bedrijven per request."}), 400
 
+    try:
+
+        def load():
+            task_types_by_company = get_task_types_for_companies(company_ids)
+            companies = {}
+            for company_id in company_ids:
+                task_types = task_types_payload(task_types_by_company.get(company_id, []))
+                companies[str(company_id)] = {"task_types": task_types, "has_task_types": len(task_types) > 0}
+            return {"companies": companies}
+
+        return conditional_json(get_task_types_etag(company_ids), load, TASK_TYPES_CACHE_CONTROL)
+    except Exception as e:
         return jsonify({"error": str(e)}), 500
 
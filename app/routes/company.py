@@ -1,25 +1,40 @@
 from datetime import datetime, timezone
 
-from flask import flash, redirect, render_template, request, session, url_for
+from flask import flash, jsonify, redirect, render_template, request, session, url_for
 
-from ..algorithms import (
-    calculate_driver_workload_hours,
-    sort_orders_by_priority,
-    suggest_best_driver,
-)
+from ..algorithms import sort_orders_by_priority
 from ..config import supabase
+from ..data_access import fetch_concurrently
+from ..events import publish_order_event
 from .routes import (
+    MAX_BULK_ASSIGNMENTS,
+    apply_keyset,
     bp,
     build_order_info,
     calculate_driver_availability,
     calculate_statistics_by_task_type,
     convert_orders_for_algorithm,
-    generate_available_months,
+    generate_months_since,
     get_company_id,
     get_custom_task_times,
+    get_customer_names_for_orders,
+    get_drivers_for_company,
+    get_identity,
+    get_order_stats_for_company,
+    get_page_size,
+    get_planning_state,
+    get_task_types_for_company,
+    invalidate_company_home,
+    invalidate_dashboards,
+    invalidate_task_types,
     kg_to_tons,
     login_required,
     parse_date_utc,
+    render_cached,
+    split_page,
+    stream_events,
+    suggest_assignments_for_company,
+    update_planning,
     validate_user_type,
 )
 
@@ -82,6 +97,7 @@ def company_add_task_type():
             )
 
             if insert_result.data:
+                invalidate_task_types(company_id)
                 flash(f"Taaktype '{task_type_name}' succesvol toegevoegd!", "success")
             else:
                 flash("Taaktype kon niet worden toegevoegd. Controleer de database instellingen.", "error")
@@ -124,6 +140,7 @@ def company_delete_task_type(task_type_id):
             sb.table("TaskTypes").delete().eq("id", task_type_id).eq("company_id", company_id).execute()
         )
         if delete_result.data:
+            invalidate_task_types(company_id, task_type_id)
             flash("Taaktype succesvol verwijderd!", "success")
         else:
             flash("Taaktype niet gevonden of je hebt geen toegang.", "error")
@@ -151,71 +168,83 @@ def company_dashboard():
                 user_email=session.get("email", ""),
             )
 
-        drivers_result = (
-            supabase.table("Drivers")
-            .select("id, name, email_address")
-            .eq("company_id", company_id)
-            .order("name")
-            .execute()
-        )
-        drivers = drivers_result.data if drivers_result.data else []
-        custom_task_times = get_custom_task_times(company_id)
-
-        orders_result = (
-            supabase.table("Orders")
-            .select("*, Address!orders_address_id_fkey(*), TaskTypes!inner(*)")
-            .eq("TaskTypes.company_id", company_id)
-            .order("created_at", desc=True)
-            .limit(100)
-            .execute()
-        )
-        all_orders_raw = orders_result.data if orders_result.data else []
-
-        driver_workload_hours = {}
-        if drivers and all_orders_raw:
-            orders_for_algo = convert_orders_for_algorithm(all_orders_raw)
-            for driver in drivers:
-                driver_workload_hours[driver["id"]] = calculate_driver_workload_hours(
-                    driver["id"], orders_for_algo, None, custom_task_times
-                )
-
-        orders = []
-        orders_for_algo = convert_orders_for_algorithm(all_orders_raw) if all_orders_raw else []
-
-        for order in all_orders_raw:
-            order_info = build_order_info(order, custom_task_times)
-
-            if not order_info.get("driver_id") and drivers:
-                suggestion = suggest_best_driver(
-                    drivers, order_info, driver_workload_hours, orders_for_algo, custom_task_times
-                )
-                if suggestion:
-                    order_info["suggested_driver"] = suggestion
-
-                order_deadline_date = None
-                if order_info.get("deadline"):
-                    try:
-                        order_deadline_date = datetime.strptime(order_info["deadline"], "%Y-%m-%d").date()
-                    except (ValueError, TypeError):
-                        pass
-
-                order_info["driver_availability"] = calculate_driver_availability(
-                    drivers, orders_for_algo, order_deadline_date, driver_workload_hours, custom_task_times
-                )
+        def render():
+            page_size = get_page_size()
+            cursor = request.args.get("cursor")
+            orders_query = (
+                supabase.table("Orders")
+                .select("*, Address!orders_address_id_fkey(*), TaskTypes!inner(*)")
+                .eq("TaskTypes.company_id", company_id)
+            )
+            orders_query = apply_keyset(orders_query, "created_at", cursor, desc=True).limit(page_size + 1)
 
-            orders.append(order_info)
+            loaded = fetch_concurrently(
+                drivers=lambda: get_drivers_for_company(company_id),
+                custom_task_times=lambda: get_custom_task_times(company_id),
+                orders_result=orders_query.execute,
+            )
+            drivers = loaded["drivers"]
+            custom_task_times = loaded["custom_task_times"]
+            page_orders_raw, next_cursor = split_page(loaded["orders_result"].data, page_size, "created_at")
+
+            # Elke rij één keer parsen; de records worden hieronder overal hergebruikt
+            records = convert_orders_for_algorithm(page_orders_raw)
+
+            unassigned_records = [r for r in records if not r.driver_id]
+            customer_names = get_customer_names_for_orders(page_orders_raw)
+
+            order_infos = {
+                record.id: build_order_info(order, custom_task_times, customer_names, record)
+                for order, record in zip(page_orders_raw, records)
+            }
+
+            if drivers and unassigned_records:
+                # Suggesties en capaciteit uit de incrementele planning van het bedrijf;
+                # rijen van deze pagina die ze nog niet kent worden eerst overgenomen
+                planning = get_planning_state(company_id, drivers, custom_task_times)
+                planning.sync(records)
+                with planning.lock:
+                    workload_index = planning.workload
+                    capacity_plan = planning.capacity
+                    driver_workload_hours = {driver["id"]: workload_index.total_hours(driver["id"]) for driver in drivers}
+
+                    for record in unassigned_records:
+                        order_info = order_infos[record.id]
+                        suggestion = planning.suggestion(record.id)
+                        if suggestion:
+                            order_info["suggested_driver"] = suggestion
+
+                        order_info["driver_availability"] = calculate_driver_availability(
+                            drivers,
+                            None,
+                            record.deadline,
+                            driver_workload_hours,
+                            custom_task_times,
+                            workload_index,
+                            capacity_plan,
+                        )
+
+            # Prioriteit op de records berekenen en op de order-info overnemen
+            orders = []
+            for record in sort_orders_by_priority(records):
+                order_info = order_infos[record.id]
+                order_info["priority_score"] = record.priority_score
+                orders.append(order_info)
+            active_orders = [o for o in orders if o.get("status") != "completed"]
+            completed_orders = [o for o in orders if o.get("status") == "completed"]
 
-        orders = sort_orders_by_priority(orders)
-        active_orders = [o for o in orders if o.get("status") != "completed"]
-        completed_orders = [o for o in orders if o.get("status") == "completed"]
+            return render_template(
+                "company_dashboard.html",
+                active_orders=active_orders,
+                completed_orders=completed_orders,
+                drivers=drivers,
+                user_email=session.get("email", ""),
+                cursor=cursor,
+                next_cursor=next_cursor,
+                page_size=page_size,
+            )
 
-        return render_template(
-            "company_dashboard.html",
-            active_orders=active_orders,
-            completed_orders=completed_orders,
-            drivers=drivers,
-            user_email=session.get("email", ""),
-        )
+        return render_cached("company", company_id, render, depends_on=[("task_types", company_id)])
     except Exception as e:
         flash(f"Fout bij het ophalen van bestellingen: {str(e)}", "error")
         return render_template(
@@ -235,28 +264,15 @@ def company_statistics():
         return redirect(url_for("routes.profile"))
 
     try:
-        sb = supabase
-        company_email = session.get("email")
-        company_id = None
-        company_name = None
-
-        company_result = sb.table("Companies").select("id, name").eq("emailaddress", company_email).limit(1).execute()
-        if company_result.data:
-            company_id = company_result.data[0]["id"]
-            company_name = company_result.data[0].get("name", "Bedrijf")
+        identity = get_identity()
+        company_id = identity.get("company_id")
+        company_name = identity.get("company_name")
 
         if not company_id:
             flash("Bedrijf niet gevonden. Neem contact op met de beheerder.", "error")
             return redirect(url_for("routes.home"))
 
-        orders_result = (
-            sb.table("Orders")
-            .select("*, TaskTypes!inner(*)")
-            .eq("TaskTypes.company_id", company_id)
-            .eq("status", "completed")
-            .execute()
-        )
-        all_orders = orders_result.data if orders_result.data else []
+        month_stats = get_order_stats_for_company(company_id)
 
         selected_month = request.args.get("month")
         if not selected_month:
@@ -274,40 +290,30 @@ def company_statistics():
             selected_month = f"{selected_year}-{selected_month_num:02d}"
 
         now = datetime.now(timezone.utc)
-        current_year_start = datetime(now.year, 1, 1, tzinfo=timezone.utc)
+        current_year_start = f"{now.year}-01"
 
-        selected_month_start = datetime(selected_year, selected_month_num, 1, tzinfo=timezone.utc)
-        if selected_month_num == 12:
-            selected_month_end = datetime(selected_year + 1, 1, 1, tzinfo=timezone.utc)
-        else:
-            selected_month_end = datetime(selected_year, selected_month_num + 1, 1, tzinfo=timezone.utc)
+        selected_month_key = f"{selected_year}-{selected_month_num:02d}"
 
+        # Rollup-rijen per (taaktype, maand) in hetzelfde formaat als orders
         orders_selected_month = []
         orders_this_year = []
-        for order in all_orders:
-            order_date_str = order.get("created_at") or order.get("deadline")
-            order_date = parse_date_utc(order_date_str)
-            if order_date:
-                if selected_month_start <= order_date < selected_month_end:
-                    orders_selected_month.append(order)
-                if order_date >= current_year_start:
-                    orders_this_year.append(order)
-
-        custom_task_types_result = (
-            sb.table("TaskTypes").select("id, task_type").eq("company_id", company_id).order("task_type").execute()
-        )
-        custom_task_types = {}
-        if custom_task_types_result.data:
-            for tt in custom_task_types_result.data:
-                custom_task_types[tt["id"]] = tt["task_type"]
+        for row in month_stats:
+            stats_row = {"task_type_id": row.get("task_type_id"), "Weight": row.get("weight_kg")}
+            if row.get("month") == selected_month_key:
+                orders_selected_month.append(stats_row)
+            if (row.get("month") or "") >= current_year_start:
+                orders_this_year.append(stats_row)
+
+        custom_task_types = {tt["id"]: tt["task_type"] for tt in get_task_types_for_company(company_id)}
 
         stats_by_task_selected_month = calculate_statistics_by_task_type(orders_selected_month, custom_task_types)
         year_stats_by_task = calculate_statistics_by_task_type(orders_this_year, custom_task_types)
-        total_year_tons = sum(kg_to_tons(order.get("Weight") or order.get("weight")) for order in orders_this_year)
+        total_year_tons = sum(kg_to_tons(order.get("Weight")) for order in orders_this_year)
 
         total_selected_month = sum(d["tons"] for d in stats_by_task_selected_month.values())
 
-        available_months = generate_available_months(all_orders)
+        first_month = min((row["month"] for row in month_stats if row.get("month")), default=None)
+        available_months = generate_months_since(parse_date_utc(f"{first_month}-01") if first_month else None)
 
         month_names = {
             1: "januari",
@@ -385,7 +391,7 @@ def company_assign_driver(order_id):
 
         order_check = (
             sb.table("Orders")
-            .select("task_type_id, TaskTypes!inner(company_id)")
+            .select("task_type_id, driver_id, Address!orders_address_id_fkey(client_id), TaskTypes!inner(company_id)")
             .eq("id", order_id)
             .eq("TaskTypes.company_id", company_id)
             .limit(1)
@@ -405,6 +411,20 @@ def company_assign_driver(order_id):
         if not update_result.data:
             flash("Bestelling niet gevonden of kon niet worden bijgewerkt.", "error")
         else:
+            invalidate_company_home(company_id)
+            previous = order_check.data[0]
+            invalidate_dashboards(
+                company_ids=[company_id],
+                driver_ids=[driver_id_int, previous.get("driver_id")],
+                client_ids=[(previous.get("Address") or {}).get("client_id")],
+            )
+            update_planning([company_id], update_result.data[0])
+            publish_order_event(
+                "order.assigned",
+                update_result.data[0],
+                company_ids=[company_id],
+                driver_ids=[driver_id_int, previous.get("driver_id")],
+            )
             flash("Chauffeur succesvol aan bestelling toegewezen.", "success")
 
     except Exception as e:
@@ -412,3 +432,196 @@ def company_assign_driver(order_id):
 
     return redirect(url_for("routes.company_dashboard"))
 
+
+# Live order-wijzigingen voor het bedrijfsdashboard (Server-Sent Events)
+@bp.route("/company/events")
+@login_required
+def company_events():
+    company_id = get_company_id() if session.get("user_type") == "company" else None
+    if not company_id:
+        return "", 403
+    return stream_events(("company", company_id))
+
+
+# Lees de gevraagde toewijzingen uit JSON ({"assignments": [{"order_id", "driver_id"}]})
+# of uit het formulier (herhaald veld "assignment" als "order_id:driver_id").
+# Ongeldige paren blijven behouden zodat ze een eigen resultaat krijgen.
+def parse_bulk_assignments(payload):
+    if payload is not None:
+        pairs = [
+            (item.get("order_id"), item.get("driver_id")) if isinstance(item, dict) else (None, None)
+            for item in payload.get("assignments") or []
+        ]
+    else:
+        pairs = [tuple(value.partition(":")[::2]) for value in request.form.getlist("assignment")]
+
+    parsed = []
+    for order_id, driver_id in pairs:
+        try:
+            parsed.append((int(order_id), int(driver_id)))
+        except (ValueError, TypeError):
+            parsed.append((order_id, driver_id))
+    return parsed
+
+
+# Meerdere chauffeurs in één keer toewijzen: expliciete paren of "alle aanbevelingen".
+# Eigendom wordt met twee set-gebaseerde queries gecontroleerd (chauffeurs en orders
+# van dit bedrijf) voor de foutmeldingen per paar; de toewijzing zelf gebeurt in één
+# voorwaardelijke update (databasefunctie assign_orders) die enkel driver_id en status
+# wijzigt. Orders die intussen geannuleerd, voltooid of (bij aanbevelingen) al
+# toegewezen zijn, worden overgeslagen en als zodanig gerapporteerd.
+# JSON-aanvragen krijgen per paar een resultaat terug, het formulier een samenvatting.
+@bp.route("/company/assign-drivers", methods=["POST"])
+@login_required
+def company_assign_drivers():
+    if not validate_user_type("company"):
+        return redirect(url_for("routes.profile"))
+
+    payload = request.get_json(silent=True) if request.is_json else None
+    wants_json = payload is not None
+
+    def respond(results, error=None, status=200):
+        assigned = sum(1 for r in results if r["ok"])
+        skipped = sum(1 for r in results if r.get("skipped"))
+        if wants_json:
+            body = {
+                "results": results,
+                "assigned": assigned,
+                "skipped": skipped,
+                "failed": len(results) - assigned - skipped,
+            }
+            if error:
+                body["error"] = error
+            return jsonify(body), status
+        if error:
+            flash(error, "error")
+        elif not results:
+            flash("Geen toewijzingen om uit te voeren.", "error")
+        else:
+            if assigned:
+                flash(f"{assigned} bestelling(en) succesvol toegewezen.", "success")
+            if skipped:
+                skipped_ids = ", ".join(str(r["order_id"]) for r in results if r.get("skipped"))
+                flash(f"Overgeslagen omdat ze intussen gewijzigd zijn: bestelling(en) {skipped_ids}.", "info")
+            for r in results:
+                if not r["ok"] and not r.get("skipped"):
+                    flash(f"Bestelling {r['order_id']}: {r['error']}", "error")
+        return redirect(url_for("routes.company_dashboard"))
+
+    try:
+        company_id = get_company_id()
+        if not company_id:
+            return respond([], "Bedrijf niet gevonden. Neem contact op met de beheerder.", 404)
+
+        source = payload if wants_json else request.form
+        only_unassigned = str(source.get("accept_suggestions", "")).lower() in ("1", "true", "on")
+        if only_unassigned:
+            pairs = suggest_assignments_for_company(company_id)
+        else:
+            pairs = parse_bulk_assignments(payload)
+        if len(pairs) > MAX_BULK_ASSIGNMENTS:
+            return respond([], f"Maximaal {MAX_BULK_ASSIGNMENTS} toewijzingen per keer.", 400)
+
+        results = []
+        requested = {}
+        for order_id, driver_id in pairs:
+            result = {"order_id": order_id, "driver_id": driver_id, "ok": False}
+            results.append(result)
+            if not isinstance(order_id, int) or not isinstance(driver_id, int):
+                result["error"] = "Ongeldige bestelling of chauffeur."
+            elif order_id in requested:
+                result["error"] = "Bestelling komt meerdere keren voor."
+            else:
+                requested[order_id] = result
+        if not requested:
+            return respond(results, status=400 if wants_json and results else 200)
+
+        driver_ids = sorted({r["driver_id"] for r in requested.values()})
+        loaded = fetch_concurrently(
+            drivers=supabase.table("Drivers")
+            .select("id")
+            .in_("id", driver_ids)
+            .eq("company_id", company_id)
+            .execute,
+            orders=supabase.table("Orders")
+            .select(
+                "id, deadline, task_type_id, Weight, driver_id, status, created_at, "
+                "Address!orders_address_id_fkey(client_id), TaskTypes!inner(company_id)"
+            )
+            .in_("id", sorted(requested))
+            .eq("TaskTypes.company_id", company_id)
+            .execute,
+        )
+        own_drivers = {row["id"] for row in loaded["drivers"].data or []}
+        own_orders = {row["id"]: row for row in loaded["orders"].data or []}
+
+        assignments = []
+        for order_id, result in requested.items():
+            order = own_orders.get(order_id)
+            if result["driver_id"] not in own_drivers:
+                result["error"] = "Deze chauffeur hoort niet bij jouw bedrijf."
+            elif order is None:
+                result["error"] = "Bestelling niet gevonden of je hebt geen toegang."
+            elif order.get("status") == "completed":
+                result["error"] = "Bestelling is al uitgevoerd."
+            elif only_unassigned and (order.get("driver_id") or order.get("status") != "pending"):
+                result["error"] = "Bestelling is al toegewezen."
+            else:
+                assignments.append({"order_id": order_id, "driver_id": result["driver_id"]})
+
+        if assignments:
+            assigned = (
+                supabase.rpc(
+                    "assign_orders",
+                    {
+                        "p_company_id": company_id,
+                        "p_assignments": assignments,
+                        "p_only_unassigned": only_unassigned,
+                    },
+                )
+                .execute()
+                .data
+                or []
+            )
+            assigned_by_order = {row["order_id"]: row for row in assigned}
+            touched_drivers = set()
+            touched_clients = set()
+            assigned_orders = []
+            for assignment in assignments:
+                result = requested[assignment["order_id"]]
+                row = assigned_by_order.get(assignment["order_id"])
+                if row is None:
+                    result["skipped"] = True
+                    result["error"] = "Bestelling is intussen gewijzigd (geannuleerd, uitgevoerd of al toegewezen)."
+                    continue
+                result["ok"] = True
+                previous = own_orders[row["order_id"]]
+                order = {
+                    **{k: v for k, v in previous.items() if k not in ("Address", "TaskTypes")},
+                    "driver_id": row["driver_id"],
+                    "status": "accepted",
+                }
+                touched_drivers.update((row["driver_id"], row.get("previous_driver_id")))
+                touched_clients.add((previous.get("Address") or {}).get("client_id"))
+                assigned_orders.append((order, row.get("previous_driver_id")))
+            if assigned_orders:
+                update_planning([company_id], *[order for order, _ in assigned_orders])
+            for order, previous_driver_id in assigned_orders:
+                publish_order_event(
+                    "order.assigned",
+                    order,
+                    company_ids=[company_id],
+                    driver_ids=[order["driver_id"], previous_driver_id],
+                )
+            if touched_drivers:
+                invalidate_company_home(company_id)
+                invalidate_dashboards(
+                    company_ids=[company_id],
+                    driver_ids=touched_drivers,
+                    client_ids=touched_clients,
+                )
+
+        return respond(results)
+    except Exception as e:
+        return respond([], f"Fout bij het toewijzen van chauffeurs: {e}", 500)
+
@@ -1,15 +1,35 @@
+import logging
+
 from flask import flash, redirect, render_template, request, session, url_for
 
+from ..algorithms import TRAVEL_TIME_HOURS, Order, calculate_order_time_hours
 from ..config import supabase
+from ..events import publish_order_event
 from .routes import (
+    apply_keyset,
     bp,
     build_order_info,
-    calculate_order_time_hours,
+    get_companies_list,
+    get_company_by_id,
     get_custom_task_times,
+    get_customer_names_for_orders,
+    get_identity,
+    get_page_size,
+    invalidate_company_drivers,
+    invalidate_company_home,
+    invalidate_dashboards,
     login_required,
+    record_completed_order_stats,
+    render_cached,
+    split_page,
+    stream_events,
+    update_identity,
+    update_planning,
     validate_user_type,
 )
 
+logger = logging.getLogger(__name__)
+
 
 # Laat chauffeur een bedrijf kiezen of wijzigen
 @bp.route("/driver/select-company", methods=["GET", "POST"])
@@ -28,21 +48,31 @@ def driver_select_company():
 
         try:
             sb = supabase
-            driver_result = (
-                sb.table("Drivers").select("id").eq("email_address", user_email).limit(1).execute()
-            )
+            identity = get_identity()
+            driver_id = identity.get("driver_id")
 
-            if driver_result.data:
-                driver_id = driver_result.data[0]["id"]
+            if driver_id:
+                previous_company_id = identity.get("company_id")
                 sb.table("Drivers").update({"company_id": int(company_id)}).eq("id", driver_id).execute()
+                invalidate_company_drivers(previous_company_id, int(company_id))
             else:
-                sb.table("Drivers").insert(
+                inserted = sb.table("Drivers").insert(
                     {
                         "email_address": user_email,
                         "company_id": int(company_id),
                         "name": user_email.split("@")[0],
                     }
                 ).execute()
+                invalidate_company_drivers(int(company_id))
+                if inserted.data:
+                    driver_id = inserted.data[0]["id"]
+
+            company = get_company_by_id(int(company_id))
+            update_identity(
+                driver_id=driver_id,
+                company_id=int(company_id),
+                company_name=company.get("name") if company else None,
+            )
 
             flash("Bedrijf succesvol geselecteerd!", "success")
             return redirect(url_for("routes.home"))
@@ -50,13 +80,9 @@ def driver_select_company():
             flash(f"Fout bij het selecteren van bedrijf: {str(e)}", "error")
 
     try:
-        sb = supabase
-        companies_result = sb.table("Companies").select("id, name").order("name").execute()
-        companies = companies_result.data if companies_result.data else []
-
-        driver_result = sb.table("Drivers").select("company_id").eq("email_address", user_email).limit(1).execute()
-        if driver_result.data and driver_result.data[0].get("company_id"):
+        if get_identity().get("company_id"):
             return redirect(url_for("routes.home"))
+        companies = get_companies_list()
 
         return render_template("driver_select_company.html", companies=companies)
     except Exception as e:
@@ -74,62 +100,58 @@ def driver_dashboard():
     try:
         user_email = session.get("email")
 
-        driver_result = (
-            supabase.table("Drivers").select("id, company_id").eq("email_address", user_email).limit(1).execute()
-        )
-        if not driver_result.data:
-            return redirect(url_for("routes.driver_select_company"))
-
-        driver_id = driver_result.data[0]["id"]
-        company_id = driver_result.data[0].get("company_id")
+        identity = get_identity()
+        driver_id = identity.get("driver_id")
+        company_id = identity.get("company_id")
 
-        if not company_id:
+        if not driver_id or not company_id:
             return redirect(url_for("routes.driver_select_company"))
 
-        custom_task_times = get_custom_task_times(company_id)
-
-        orders_result = (
-            supabase.table("Orders")
-            .select("*, Address!orders_address_id_fkey(*), TaskTypes(*)")
-            .eq("driver_id", driver_id)
-            .in_("status", ["accepted", "completed"])
-            .order("deadline", desc=False)
-            .limit(100)
-            .execute()
-        )
-
-        orders = []
-        if orders_result.data:
-            for order in orders_result.data:
-                order_info = build_order_info(order, custom_task_times)
-                order_info["weight"] = order.get("Weight") or order.get("weight")
-
-                order_for_time = {
-                    "task_type_id": order.get("task_type_id"),
-                    "Weight": order_info["weight"],
-                    "weight": order_info["weight"],
-                }
-                if order.get("task_type_id") and order.get("task_type_id") in custom_task_times:
-                    order_for_time["_custom_time_per_1000kg"] = custom_task_times[order.get("task_type_id")]
-
-                order_info["work_time_hours"] = max(
-                    0.0, calculate_order_time_hours(order_for_time, custom_task_times) - 0.75
-                )
-
-                if order.get("Companies"):
-                    order_info["company"] = {"name": order["Companies"].get("name")}
-
-                orders.append(order_info)
+        def render():
+            custom_task_times = get_custom_task_times(company_id)
 
-        active_orders = [o for o in orders if o.get("status") != "completed"]
-        completed_orders = [o for o in orders if o.get("status") == "completed"]
+            page_size = get_page_size()
+            cursor = request.args.get("cursor")
+            orders_query = (
+                supabase.table("Orders")
+                .select("*, Address!orders_address_id_fkey(*), TaskTypes(*)")
+                .eq("driver_id", driver_id)
+                .in_("status", ["accepted", "completed"])
+            )
+            orders_result = apply_keyset(orders_query, "deadline", cursor).limit(page_size + 1).execute()
+            page_orders, next_cursor = split_page(orders_result.data, page_size, "deadline")
+
+            orders = []
+            if page_orders:
+                customer_names = get_customer_names_for_orders(page_orders)
+                for order in page_orders:
+                    record = Order.from_dict(order)
+                    order_info = build_order_info(order, custom_task_times, customer_names, record)
+                    order_info["weight"] = order.get("Weight") or order.get("weight")
+
+                    order_info["work_time_hours"] = max(
+                        0.0, calculate_order_time_hours(record, custom_task_times) - TRAVEL_TIME_HOURS
+                    )
+
+                    if order.get("Companies"):
+                        order_info["company"] = {"name": order["Companies"].get("name")}
+
+                    orders.append(order_info)
+
+            active_orders = [o for o in orders if o.get("status") != "completed"]
+            completed_orders = [o for o in orders if o.get("status") == "completed"]
+
+            return render_template(
+                "driver_dashboard.html",
+                active_orders=active_orders,
+                completed_orders=completed_orders,
+                user_email=user_email,
+                cursor=cursor,
+                next_cursor=next_cursor,
+                page_size=page_size,
+            )
 
-        return render_template(
-            "driver_dashboard.html",
-            active_orders=active_orders,
-            completed_orders=completed_orders,
-            user_email=user_email,
-        )
+        return render_cached("driver", driver_id, render, depends_on=[("task_types", company_id)])
     except Exception as e:
         flash(f"Fout bij het ophalen van ritten: {str(e)}", "error")
         return render_template(
@@ -140,6 +162,16 @@ def driver_dashboard():
         )
 
 
+# Live order-wijzigingen voor het chauffeursdashboard (Server-Sent Events)
+@bp.route("/driver/events")
+@login_required
+def driver_events():
+    driver_id = get_identity().get("driver_id") if session.get("user_type") == "driver" else None
+    if not driver_id:
+        return "", 403
+    return stream_events(("driver", driver_id))
+
+
 # Markeer een order als voltooid door de chauffeur
 @bp.route("/driver/complete-order/<int:order_id>", methods=["POST"])
 @login_required
@@ -149,28 +181,64 @@ def driver_complete_order(order_id):
 
     try:
         sb = supabase
-        driver_email = session.get("email")
 
-        driver_result = sb.table("Drivers").select("id").eq("email_address", driver_email).limit(1).execute()
-        if not driver_result.data or len(driver_result.data) == 0:
+        driver_id = get_identity().get("driver_id")
+        if not driver_id:
             flash("Chauffeur niet gevonden.", "error")
             return redirect(url_for("routes.driver_dashboard"))
 
-        driver_id = driver_result.data[0]["id"]
-
         order_result = (
-            sb.table("Orders").select("id, driver_id").eq("id", order_id).eq("driver_id", driver_id).limit(1).execute()
+            sb.table("Orders")
+            .select(
+                "id, driver_id, status, task_type_id, Weight, created_at, deadline, "
+                "Address!orders_address_id_fkey(client_id), TaskTypes(company_id)"
+            )
+            .eq("id", order_id)
+            .eq("driver_id", driver_id)
+            .limit(1)
+            .execute()
         )
         if not order_result.data or len(order_result.data) == 0:
             flash("Bestelling niet gevonden of niet aan jou toegewezen.", "error")
             return redirect(url_for("routes.driver_dashboard"))
 
+        order = order_result.data[0]
+        # Enkel de request die de status effectief wijzigt telt de order mee in de rollup
+        # (dubbele submit of twee tabbladen geven hier geen rijen terug)
         update_result = (
-            sb.table("Orders").update({"status": "completed"}).eq("id", order_id).eq("driver_id", driver_id).execute()
+            sb.table("Orders")
+            .update({"status": "completed"})
+            .eq("id", order_id)
+            .eq("driver_id", driver_id)
+            .neq("status", "completed")
+            .execute()
         )
 
         if update_result.data:
+            try:
+                record_completed_order_stats(order)
+            except Exception:
+                logger.exception(
+                    "Rollup niet bijgewerkt voor voltooide order %s; herbouw met 'flask --app run rebuild-stats'",
+                    order_id,
+                )
+            company_id = (order.get("TaskTypes") or {}).get("company_id")
+            invalidate_company_home(company_id)
+            invalidate_dashboards(
+                company_ids=[company_id],
+                driver_ids=[driver_id],
+                client_ids=[(order.get("Address") or {}).get("client_id")],
+            )
+            update_planning([company_id], {**order, "status": "completed"})
+            publish_order_event(
+                "order.completed",
+                {**order, "status": "completed"},
+                company_ids=[company_id],
+                driver_ids=[driver_id],
+            )
             flash("Taak gemarkeerd als uitgevoerd!", "success")
+        elif order.get("status") == "completed":
+            flash("Taak was al gemarkeerd als uitgevoerd.", "info")
         else:
             flash("Taak kon niet worden bijgewerkt.", "error")
 
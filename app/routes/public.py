@@ -2,8 +2,9 @@ from datetime import datetime
 
 from flask import flash, g, redirect, render_template, request, session, url_for
 
+from ..cache import data_versions
 from ..config import supabase
-from .routes import bp
+from .routes import bp, get_company_home_stats, get_identity, resolve_identity, store_identity
 
 
 # Voor elke request: zet current user info in g-context
@@ -12,15 +13,11 @@ def load_current_user():
     g.current_user_id = session.get("email")
     g.current_user_email = session.get("email")
     g.current_user_type = session.get("user_type", "customer")
+    g.current_user_display_name = g.current_user_email
 
-    if g.current_user_type == "customer":
-        first_name = session.get("first_name", "")
-        last_name = session.get("last_name", "")
-        g.current_user_display_name = (
-            f"{first_name} {last_name}" if first_name and last_name else g.current_user_email
-        )
-    else:
-        g.current_user_display_name = g.current_user_email
+    if g.current_user_email:
+        identity = get_identity()
+        g.current_user_display_name = identity.get("display_name") or g.current_user_email
 
 
 # Landing: toon home afhankelijk van user-type
@@ -31,20 +28,9 @@ def home():
 
     if user_type == "company" and user_email:
         try:
-            sb = supabase
-            company_result = (
-                sb.table("Companies")
-                .select("id, name")
-                .eq("emailaddress", user_email)
-                .limit(1)
-                .execute()
-            )
-            company_id = None
-            company_name = None
-
-            if company_result.data:
-                company_id = company_result.data[0]["id"]
-                company_name = company_result.data[0].get("name", "Bedrijf")
+            identity = get_identity()
+            company_id = identity.get("company_id")
+            company_name = identity.get("company_name")
 
             stats = {
                 "total_orders": 0,
@@ -54,23 +40,7 @@ def home():
             }
 
             if company_id:
-                orders_result = (
-                    sb.table("Orders")
-                    .select("id, deadline, created_at, status, TaskTypes!inner(company_id)")
-                    .eq("TaskTypes.company_id", company_id)
-                    .execute()
-                )
-                if orders_result.data:
-                    stats["total_orders"] = len(orders_result.data)
-                    stats["completed_orders"] = sum(
-                        1 for o in orders_result.data if o.get("status") == "completed"
-                    )
-                    stats["pending_orders"] = stats["total_orders"] - stats["completed_orders"]
-                    stats["recent_orders"] = sorted(
-                        orders_result.data,
-                        key=lambda x: x.get("created_at", ""),
-                        reverse=True,
-                    )[:5]
+                stats = get_company_home_stats(company_id)
 
             return render_template(
                 "home.html",
@@ -116,71 +86,15 @@ def login():
                 )
                 return render_template("login.html")
 
-            sb = supabase
-
-            client_id = None
-            company_id = None
-            driver_id = None
-            first_name = None
-            last_name = None
-            user_type = None
-
-            result = (
-                sb.table("Client")
-                .select("id, Name, Lastname")
-                .eq("emailaddress", username)
-                .limit(1)
-                .execute()
-            )
-            if result.data:
-                row = result.data[0]
-                client_id = row["id"]
-                first_name = row.get("Name")
-                last_name = row.get("Lastname")
-                user_type = "customer"
-            else:
-                result = (
-                    sb.table("Companies")
-                    .select("id, name")
-                    .eq("emailaddress", username)
-                    .limit(1)
-                    .execute()
-                )
-                if result.data:
-                    company_id = result.data[0]["id"]
-                    user_type = "company"
-                else:
-                    result = (
-                        sb.table("Drivers")
-                        .select("id, name")
-                        .eq("email_address", username)
-                        .limit(1)
-                        .execute()
-                    )
-                    if result.data:
-                        driver_id = result.data[0]["id"]
-                        user_type = "driver"
-
-            if not user_type:
+            identity = resolve_identity(username)
+            if not identity:
                 flash("Geen gebruiker gevonden met deze gebruikersnaam.", "error")
                 return render_template("login.html")
 
             session.clear()
             session["email"] = username
-            session["user_type"] = user_type
-
-            if client_id is not None:
-                session["client_id"] = client_id
-            if company_id is not None:
-                session["company_id"] = company_id
-            if driver_id is not None:
-                session["driver_id"] = driver_id
-            if first_name:
-                session["first_name"] = first_name
-            if last_name:
-                session["last_name"] = last_name
-
-            session.modified = True
+            session["user_type"] = identity["user_type"]
+            store_identity(identity)
 
             flash("Succesvol ingelogd.", "success")
             return redirect(url_for("routes.home"))
@@ -271,6 +185,7 @@ def signup():
                         "created_at": datetime.utcnow().isoformat(),
                     }
                 ).execute()
+                data_versions.bump("companies", "list")
 
             elif user_type == "driver":
                 existing = (
@@ -1,16 +1,49 @@
-from datetime import datetime, timezone
+import base64
+import hashlib
+import json
+import sys
+import threading
+import time
+from datetime import date, datetime, timezone
 
-from flask import Blueprint, flash, redirect, session, url_for
+from flask import Blueprint, Response, current_app, flash, jsonify, make_response, redirect, request, session, url_for
 
 from ..algorithms import (
-    calculate_driver_workload_hours,
+    Order,
+    PlanningState,
+    WorkloadIndex,
     calculate_order_time_hours,
     filter_duplicate_orders,
 )
+from ..cache import data_versions, fragment_cache, planning_cache, reference_cache
 from ..config import supabase
+from ..data_access import fetch_concurrently
+from ..events import format_sse, get_event_bus
 
 bp = Blueprint("routes", __name__)
 
+ORDER_STATUSES = ("pending", "accepted", "completed")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_BULK_ASSIGNMENTS = 500
+# Entiteit van de "task_types"-versie die bij elke taaktypewijziging (van eender welk
+# bedrijf) verhoogd wordt: een klant kan bij elk bedrijf bestellen
+ALL_TASK_TYPES = "all"
+# Server-Sent Events: keepalive-interval, maximale streamduur en herverbindingstijd
+SSE_KEEPALIVE_SECONDS = 15.0
+SSE_MAX_STREAM_SECONDS = 300.0
+SSE_RETRY_MS = 3000
+# Zonder open stream: herverbindingstijd (polling) en maximaal aantal events per antwoord
+SSE_POLL_RETRY_MS = 5000
+SSE_POLL_MAX_EVENTS = 100
+DEFAULT_SSE_MAX_STREAMS = 8
+# Versie van de identiteit in de sessie; ophogen als de velden wijzigen
+IDENTITY_VERSION = 1
+
+# Aantal open SSE-streams in dit proces (begrensd door SSE_MAX_STREAMS)
+_open_streams = 0
+_open_streams_lock = threading.Lock()
+
 
 # Decorator die een login afdwingt vóór de view wordt uitgevoerd
 def login_required(view_func):
@@ -24,47 +57,119 @@ def login_required(view_func):
     return wrapped
 
 
+# Zoek de gebruiker bij een emailadres op (klant, dan bedrijf, dan chauffeur) en
+# geef rol, ids, bedrijf en weergavenaam terug. None als er niemand gevonden wordt.
+def resolve_identity(email):
+    if not email:
+        return None
+
+    result = supabase.table("Client").select("id, Name, Lastname").eq("emailaddress", email).limit(1).execute()
+    if result.data:
+        row = result.data[0]
+        first_name = row.get("Name") or ""
+        last_name = row.get("Lastname") or ""
+        return {
+            "version": IDENTITY_VERSION,
+            "user_type": "customer",
+            "client_id": row["id"],
+            "first_name": first_name,
+            "last_name": last_name,
+            "display_name": f"{first_name} {last_name}" if first_name and last_name else email,
+        }
+
+    result = supabase.table("Companies").select("id, name").eq("emailaddress", email).limit(1).execute()
+    if result.data:
+        row = result.data[0]
+        return {
+            "version": IDENTITY_VERSION,
+            "user_type": "company",
+            "company_id": row["id"],
+            "company_name": row.get("name", "Bedrijf"),
+            "display_name": row.get("name") or email,
+        }
+
+    result = (
+        supabase.table("Drivers")
+        .select("id, name, company_id, Companies(name)")
+        .eq("email_address", email)
+        .limit(1)
+        .execute()
+    )
+    if result.data:
+        row = result.data[0]
+        return {
+            "version": IDENTITY_VERSION,
+            "user_type": "driver",
+            "driver_id": row["id"],
+            "company_id": row.get("company_id"),
+            "company_name": (row.get("Companies") or {}).get("name") if row.get("company_id") else None,
+            "display_name": row.get("name") or email,
+        }
+    return None
+
+
+# Bewaar de identiteit in de sessie, samen met de losse sleutels die de routes al gebruiken
+def store_identity(identity):
+    session.pop("identity_missing", None)
+    session["identity"] = identity
+    user_type = identity["user_type"]
+    if user_type == "customer":
+        session["client_id"] = identity["client_id"]
+        if identity.get("first_name"):
+            session["first_name"] = identity["first_name"]
+        if identity.get("last_name"):
+            session["last_name"] = identity["last_name"]
+    elif user_type == "company":
+        session["company_id"] = identity["company_id"]
+    elif user_type == "driver":
+        session["driver_id"] = identity["driver_id"]
+    session.modified = True
+
+
+# Pas velden van de opgeslagen identiteit aan (bv. nadat een chauffeur van bedrijf wisselt).
+# Een eerder onthouden "niet gevonden" wordt gewist zodat de identiteit opnieuw opgelost wordt.
+def update_identity(**changes):
+    session.pop("identity_missing", None)
+    identity = dict(get_identity())
+    if identity:
+        identity.update(changes)
+        store_identity(identity)
+
+
+# Identiteit van de huidige sessie. Wordt bij login opgelost; sessies zonder
+# (of met een verouderde) identiteit worden hier één keer opnieuw opgelost.
+# Vindt die niemand, dan wordt dat in de sessie onthouden (per versie), zodat de
+# drie opzoekqueries niet bij elke request opnieuw lopen.
+def get_identity():
+    identity = session.get("identity")
+    if identity and identity.get("version") == IDENTITY_VERSION:
+        return identity
+    email = session.get("email")
+    if not email or session.get("identity_missing") == IDENTITY_VERSION:
+        return {}
+    try:
+        identity = resolve_identity(email)
+    except Exception:
+        return {}
+    if not identity or identity["user_type"] != session.get("user_type"):
+        session["identity_missing"] = IDENTITY_VERSION
+        return {}
+    store_identity(identity)
+    return identity
+
+
 # Haal of cache de client_id voor de huidige sessie
 def get_client_id():
-    client_id = session.get("client_id")
-    if not client_id:
-        customer_email = session.get("email")
-        if customer_email:
-            try:
-                client_result = (
-                    supabase.table("Client")
-                    .select("id")
-                    .eq("emailaddress", customer_email)
-                    .limit(1)
-                    .execute()
-                )
-                if client_result.data:
-                    client_id = client_result.data[0]["id"]
-                    session["client_id"] = client_id
-            except Exception:
-                pass
-    return client_id
+    return session.get("client_id") or get_identity().get("client_id")
 
 
 # Haal of cache de company_id voor de huidige sessie
 def get_company_id():
     company_id = session.get("company_id")
     if not company_id:
-        company_email = session.get("email")
-        if company_email:
-            try:
-                company_result = (
-                    supabase.table("Companies")
-                    .select("id")
-                    .eq("emailaddress", company_email)
-                    .limit(1)
-                    .execute()
-                )
-                if company_result.data:
-                    company_id = company_result.data[0]["id"]
-                    session["company_id"] = company_id
-            except Exception:
-                pass
+        identity = get_identity()
+        if identity.get("user_type") == "company":
+            company_id = identity.get("company_id")
     return company_id
 
 
@@ -73,7 +178,8 @@ def get_task_type_name(task_type_id, task_types_data=None):
     if task_types_data:
         return task_types_data.get("task_type")
     if task_type_id:
-        try:
+
+        def load():
             result = (
                 supabase.table("TaskTypes")
                 .select("task_type")
@@ -81,13 +187,153 @@ def get_task_type_name(task_type_id, task_types_data=None):
                 .limit(1)
                 .execute()
             )
-            if result.data:
-                return result.data[0].get("task_type")
+            return result.data[0].get("task_type") if result.data else None
+
+        try:
+            key = ("name", task_type_id, data_versions.get("task_type", task_type_id))
+            return reference_cache.get_or_load("TaskTypes", key, load)
         except Exception:
             pass
     return None
 
 
+# Bedrijf waartoe een taaktype behoort (TaskTypes.company_id, gecachet)
+def get_task_type_company_id(task_type_id):
+    if not task_type_id:
+        return None
+
+    def load():
+        result = supabase.table("TaskTypes").select("company_id").eq("id", task_type_id).limit(1).execute()
+        return result.data[0].get("company_id") if result.data else None
+
+    key = ("company_of", task_type_id, data_versions.get("task_type", task_type_id))
+    return reference_cache.get_or_load("TaskTypes", key, load)
+
+
+# Taaktypes van een bedrijf (gecachet), gesorteerd op naam
+def get_task_types_for_company(company_id):
+    def load():
+        result = (
+            supabase.table("TaskTypes")
+            .select("id, task_type, time_per_1000kg")
+            .eq("company_id", company_id)
+            .order("task_type")
+            .execute()
+        )
+        return result.data or []
+
+    key = ("company", company_id, data_versions.get("task_types", company_id))
+    return reference_cache.get_or_load("TaskTypes", key, load)
+
+
+# Taaktypes van meerdere bedrijven: cache-missers worden samen in één query geladen
+def get_task_types_for_companies(company_ids):
+    task_types = {}
+    missing = []
+    versions = data_versions.get_many("task_types", company_ids)
+    for company_id in company_ids:
+        cached = reference_cache.get("TaskTypes", ("company", company_id, versions[company_id]))
+        if cached is None:
+            missing.append(company_id)
+        else:
+            task_types[company_id] = cached
+    if missing:
+        result = (
+            supabase.table("TaskTypes")
+            .select("id, task_type, time_per_1000kg, company_id")
+            .in_("company_id", missing)
+            .order("task_type")
+            .execute()
+        )
+        loaded = {company_id: [] for company_id in missing}
+        for tt in result.data or []:
+            loaded[tt["company_id"]].append(
+                {"id": tt["id"], "task_type": tt["task_type"], "time_per_1000kg": tt.get("time_per_1000kg")}
+            )
+        for company_id, rows in loaded.items():
+            reference_cache.set("TaskTypes", ("company", company_id, versions[company_id]), rows)
+        task_types.update(loaded)
+    return task_types
+
+
+# JSON-vorm van taaktypes zoals de API ze teruggeeft
+def task_types_payload(task_types):
+    return [{"id": tt["id"], "name": tt["task_type"]} for tt in task_types]
+
+
+# ETag van de taaktypes van één of meer bedrijven, uit de gedeelde taaktypeversies
+# (verhoogd door invalidate_task_types): gelijk in alle workers en zonder rijen te laden
+def get_task_types_etag(company_ids):
+    versions = data_versions.get_many("task_types", company_ids)
+    parts = [data_versions.epoch] + [f"{company_id}:{versions[company_id]}" for company_id in company_ids]
+    return hashlib.sha1(",".join(parts).encode("utf-8")).hexdigest()
+
+
+# JSON-antwoord met ETag; bij een overeenkomende If-None-Match een 304 zonder load() aan te roepen
+def conditional_json(etag, load, cache_control):
+    if request.if_none_match.contains_weak(etag):
+        response = make_response("", 304)
+    else:
+        response = jsonify(load())
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+# Maak gecachte taaktypes van een bedrijf ongeldig na toevoegen/wijzigen/verwijderen.
+# Via de gedeelde versies, dus ook in de cache van de andere workers. De dashboards
+# tonen werktijden en namen van de taaktypes en hangen van deze versies af
+# (zie render_cached): "task_types" per bedrijf en ALL_TASK_TYPES voor klanten.
+def invalidate_task_types(company_id, task_type_id=None):
+    data_versions.bump("task_types", company_id, ALL_TASK_TYPES)
+    data_versions.bump("task_type", task_type_id)
+    # Taaktijden bepalen de uren in de planning (ook die van andere workers)
+    planning_cache.invalidate("Planning", company_id)
+    data_versions.bump("planning", company_id)
+
+
+# Bedrijf (id, name) op basis van id (gecachet)
+def get_company_by_id(company_id):
+    if not company_id:
+        return None
+
+    def load():
+        result = supabase.table("Companies").select("id, name").eq("id", company_id).limit(1).execute()
+        return result.data[0] if result.data else None
+
+    try:
+        return reference_cache.get_or_load("Companies", ("id", company_id), load)
+    except Exception:
+        return None
+
+
+# Chauffeurs van een bedrijf (gecachet), gesorteerd op naam
+def get_drivers_for_company(company_id):
+    def load():
+        result = (
+            supabase.table("Drivers")
+            .select("id, name, email_address")
+            .eq("company_id", company_id)
+            .order("name")
+            .execute()
+        )
+        return result.data or []
+
+    key = ("company", company_id, data_versions.get("drivers", company_id))
+    return reference_cache.get_or_load("Drivers", key, load)
+
+
+# Maak gecachte chauffeurslijsten ongeldig (bv. na wisselen van bedrijf), ook in andere workers
+def invalidate_company_drivers(*company_ids):
+    data_versions.bump("drivers", *company_ids)
+    for company_id in company_ids:
+        if company_id:
+            planning_cache.invalidate("Planning", company_id)
+    # Het bedrijfsdashboard toont de chauffeurslijst
+    data_versions.bump("company", *company_ids)
+    data_versions.bump("planning", *company_ids)
+
+
 # Zoek de klantnaam bij een adres-id
 def get_customer_info_from_address(address_id):
     if not address_id:
@@ -120,6 +366,106 @@ def get_customer_info_from_address(address_id):
     return None, None
 
 
+# Haal klantnamen voor een hele lijst orders in één keer op (adres-id -> naam)
+def get_customer_names_for_orders(orders):
+    customer_names = {}
+    address_clients = {}
+    missing_address_ids = set()
+    for order in orders:
+        address_id = order.get("address_id")
+        if not address_id:
+            continue
+        address = order.get("Address") or {}
+        if address.get("client_id"):
+            address_clients[address_id] = address["client_id"]
+        else:
+            missing_address_ids.add(address_id)
+    try:
+        if missing_address_ids:
+            address_result = (
+                supabase.table("Address")
+                .select("id, client_id")
+                .in_("id", list(missing_address_ids))
+                .execute()
+            )
+            for addr in address_result.data or []:
+                if addr.get("client_id"):
+                    address_clients[addr["id"]] = addr["client_id"]
+        client_ids = set(address_clients.values())
+        if client_ids:
+            client_result = (
+                supabase.table("Client")
+                .select("id, Name, Lastname")
+                .in_("id", list(client_ids))
+                .execute()
+            )
+            clients = {c["id"]: c for c in client_result.data or []}
+            for address_id, client_id in address_clients.items():
+                client = clients.get(client_id)
+                if client:
+                    customer_names[address_id] = (client.get("Name", ""), client.get("Lastname", ""))
+    except Exception:
+        pass
+    return customer_names
+
+
+# Lees de paginagrootte uit de querystring (begrensd)
+def get_page_size():
+    try:
+        page_size = int(request.args.get("page_size", DEFAULT_PAGE_SIZE))
+    except (ValueError, TypeError):
+        page_size = DEFAULT_PAGE_SIZE
+    return max(1, min(MAX_PAGE_SIZE, page_size))
+
+
+# Codeer een keyset-cursor (sorteerwaarde + id) als url-veilige string
+def encode_cursor(value, row_id):
+    raw = json.dumps([value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+# Decodeer een cursor uit de querystring; None bij ontbrekend of ongeldig
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return value, int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+# Sorteer een query op (kolom, id) en filter op rijen na de cursor.
+# Postgres zet NULL-waarden achteraan bij oplopend en vooraan bij aflopend.
+def apply_keyset(query, column, cursor, desc=False):
+    query = query.order(column, desc=desc).order("id", desc=desc)
+    position = decode_cursor(cursor)
+    if position is None:
+        return query
+    value, row_id = position
+    op = "lt" if desc else "gt"
+    if value is None:
+        if desc:
+            return query.or_(f"{column}.not.is.null,and({column}.is.null,id.{op}.{row_id})")
+        return query.or_(f"and({column}.is.null,id.{op}.{row_id})")
+    quoted = '"' + str(value).replace('"', '\\"') + '"'
+    conditions = [f"{column}.{op}.{quoted}", f"and({column}.eq.{quoted},id.{op}.{row_id})"]
+    if not desc:
+        conditions.insert(1, f"{column}.is.null")
+    return query.or_(",".join(conditions))
+
+
+# Knip de extra rij af en bepaal de cursor voor de volgende pagina
+def split_page(rows, page_size, column):
+    rows = rows or []
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(last.get(column), last.get("id"))
+
+
 # Normaliseer adresdata naar een eenvoudig dict
 def format_address_data(address_data):
     if not address_data:
@@ -132,32 +478,30 @@ def format_address_data(address_data):
     }
 
 
-# Zet orders om naar het formaat dat de planning-algoritmes gebruiken
+# Zet ruwe orderrijen eenmalig om naar Order-records voor de algoritmes
 def convert_orders_for_algorithm(orders_raw):
-    return [
-        {
-            "driver_id": o.get("driver_id"),
-            "status": o.get("status"),
-            "deadline": o.get("deadline"),
-            "task_type_id": o.get("task_type_id"),
-            "task_type": o.get("task_type"),
-            "Weight": o.get("Weight") or o.get("weight"),
-            "weight": o.get("Weight") or o.get("weight"),
-        }
-        for o in orders_raw
-    ]
+    return [Order.from_dict(o) for o in orders_raw]
 
 
+# Met een capacity_plan (CapacityPlan) telt de vrije tijd van vandaag t.e.m. de deadline
 def calculate_driver_availability(
-    drivers, orders_for_algo, order_deadline, driver_workload_hours, custom_task_times
+    drivers,
+    orders_for_algo,
+    order_deadline,
+    driver_workload_hours,
+    custom_task_times,
+    workload_index=None,
+    capacity_plan=None,
 ):
+    if workload_index is None:
+        workload_index = WorkloadIndex.build(orders_for_algo, custom_task_times)
     driver_availability = []
     for driver in drivers:
         driver_id = driver["id"]
-        if order_deadline:
-            hours_on_deadline = calculate_driver_workload_hours(
-                driver_id, orders_for_algo, order_deadline, custom_task_times
-            )
+        if order_deadline and capacity_plan is not None:
+            available_hours = capacity_plan.available_hours_until(driver_id, order_deadline)
+        elif order_deadline:
+            hours_on_deadline = workload_index.hours_on(driver_id, order_deadline)
             available_hours = 12.0 - hours_on_deadline
         else:
             total_hours = driver_workload_hours.get(driver_id, 0.0)
@@ -173,7 +517,10 @@ def calculate_driver_availability(
     return driver_availability
 
 
-def build_order_info(order, custom_task_times=None):
+# record: het al geparste Order-record van deze rij (anders wordt het hier gemaakt)
+def build_order_info(order, custom_task_times=None, customer_names=None, record=None):
+    if record is None:
+        record = Order.from_dict(order)
     task_type_id = order.get("task_type_id")
     task_type_name = get_task_type_name(task_type_id, order.get("TaskTypes"))
 
@@ -191,24 +538,286 @@ def build_order_info(order, custom_task_times=None):
     }
 
     address_id = order.get("address_id")
-    customer_name, customer_lastname = get_customer_info_from_address(address_id)
+    if customer_names is not None:
+        customer_name, customer_lastname = customer_names.get(address_id, (None, None))
+    else:
+        customer_name, customer_lastname = get_customer_info_from_address(address_id)
     order_info["customer_name"] = customer_name
     order_info["customer_lastname"] = customer_lastname
 
-    if custom_task_times and task_type_id:
-        order_for_time = order_info.copy()
-        if task_type_id in custom_task_times:
-            order_for_time["_custom_time_per_1000kg"] = custom_task_times[task_type_id]
-        order_info["estimated_time_hours"] = calculate_order_time_hours(
-            order_for_time,
-            custom_task_times if task_type_id in custom_task_times else None,
-        )
+    if custom_task_times and record.task_type_id:
+        order_info["estimated_time_hours"] = calculate_order_time_hours(record, custom_task_times)
 
-    order_info["is_overdue"] = is_order_overdue(order.get("deadline"), order.get("status"))
+    order_info["is_overdue"] = is_order_overdue(record.deadline, record.status)
 
     return order_info
 
 
+# Geaccepteerde orders van de chauffeurs die nodig zijn voor capaciteitsberekening.
+# Met deadlines worden enkel die dagen (plus orders zonder deadline) opgehaald.
+def get_accepted_orders_for_capacity(driver_ids, deadlines=None):
+    if not driver_ids:
+        return []
+    query = (
+        supabase.table("Orders")
+        .select("id, driver_id, status, deadline, task_type_id, Weight")
+        .in_("driver_id", list(driver_ids))
+        .eq("status", "accepted")
+    )
+    if deadlines is not None:
+        if not deadlines:
+            query = query.is_("deadline", "null")
+        else:
+            days = ",".join(sorted(deadlines))
+            query = query.or_(f"deadline.in.({days}),deadline.is.null")
+    result = query.execute()
+    return result.data or []
+
+
+# Planning van een bedrijf die in het geheugen blijft (zie PlanningState): eenmalig
+# geladen uit de open orders en de capaciteit van de chauffeurs, daarna bijgewerkt
+# door de schrijfroutes via update_planning/remove_from_planning. Na de TTL van
+# planning_cache, op een nieuwe dag (prioriteiten hangen van de datum af) of als
+# een andere worker intussen schreef (planningversie in data_versions) wordt ze
+# opnieuw opgebouwd.
+def get_planning_state(company_id, drivers=None, custom_task_times=None):
+    version = data_versions.get("planning", company_id)
+    state = planning_cache.get("Planning", company_id)
+    if state is not None and state.now.date() == date.today() and state.version == version:
+        return state
+
+    if drivers is None:
+        drivers = get_drivers_for_company(company_id)
+    if custom_task_times is None:
+        custom_task_times = get_custom_task_times(company_id)
+    open_orders_query = (
+        supabase.table("Orders")
+        .select("id, driver_id, status, deadline, task_type_id, Weight, created_at, TaskTypes!inner(company_id)")
+        .eq("TaskTypes.company_id", company_id)
+        .is_("driver_id", "null")
+        .neq("status", "completed")
+    )
+    loaded = fetch_concurrently(
+        open_orders=open_orders_query.execute,
+        capacity_orders=lambda: get_accepted_orders_for_capacity([driver["id"] for driver in drivers]),
+    )
+    orders = convert_orders_for_algorithm((loaded["open_orders"].data or []) + loaded["capacity_orders"])
+    state = PlanningState.build(drivers, orders, custom_task_times)
+    # De versie van vóór het laden: schrijfacties tijdens het laden geven later een herbouw
+    state.version = version
+    planning_cache.set("Planning", company_id, state)
+    return state
+
+
+# Werk gewijzigde orders bij in de planning van de bedrijven die er al één in het
+# geheugen hebben (andere bedrijven laden hun planning later volledig) en verhoog de
+# planningversie, zodat andere workers hun kopie herbouwen. Een kopie die zelf al
+# achterliep wordt weggegooid in plaats van bijgewerkt.
+def update_planning(company_ids, *orders):
+    _apply_to_planning(company_ids, lambda state: [state.upsert(order) for order in orders])
+
+
+def remove_from_planning(company_ids, order_id):
+    _apply_to_planning(company_ids, lambda state: state.remove(order_id))
+
+
+def _apply_to_planning(company_ids, apply):
+    for company_id in dict.fromkeys(company_ids):
+        if company_id is None:
+            continue
+        version = data_versions.get("planning", company_id)
+        data_versions.bump("planning", company_id)
+        state = planning_cache.get("Planning", company_id)
+        if state is None:
+            continue
+        if state.version != version:
+            planning_cache.invalidate("Planning", company_id)
+            continue
+        apply(state)
+        # Schreef een andere worker tussen get en bump, dan verschilt de versie later alsnog
+        state.version = version + 1
+
+
+# Aanbevolen chauffeur per openstaande order van het bedrijf uit de planning,
+# hoogste prioriteit eerst. Geeft een lijst (order_id, driver_id) terug.
+def suggest_assignments_for_company(company_id, limit=MAX_BULK_ASSIGNMENTS):
+    state = get_planning_state(company_id)
+    suggestions = state.suggestions()
+    return [
+        (order_id, suggestions[order_id]["driver_id"])
+        for order_id, _ in state.top(len(state))
+        if order_id in suggestions
+    ][:limit]
+
+
+# Tellers en recente orders voor de bedrijfshomepage (kort gecachet)
+def get_company_home_stats(company_id):
+    def count_loader(status):
+        def load_count():
+            count_result = (
+                supabase.table("Orders")
+                .select("id, TaskTypes!inner(company_id)", count="exact", head=True)
+                .eq("TaskTypes.company_id", company_id)
+                .eq("status", status)
+                .execute()
+            )
+            return count_result.count or 0
+
+        return load_count
+
+    def load_recent():
+        recent_result = (
+            supabase.table("Orders")
+            .select("id, deadline, created_at, status, TaskTypes!inner(company_id)")
+            .eq("TaskTypes.company_id", company_id)
+            .order("created_at", desc=True)
+            .limit(5)
+            .execute()
+        )
+        return recent_result.data or []
+
+    # De tellers per status en de recente orders zijn onafhankelijk: gelijktijdig ophalen
+    def load():
+        results = fetch_concurrently(
+            recent_orders=load_recent,
+            **{status: count_loader(status) for status in ORDER_STATUSES},
+        )
+        total_orders = sum(results[status] for status in ORDER_STATUSES)
+        return {
+            "total_orders": total_orders,
+            "pending_orders": total_orders - results["completed"],
+            "completed_orders": results["completed"],
+            "recent_orders": results["recent_orders"],
+        }
+
+    return reference_cache.get_or_load("CompanyHome", company_id, load)
+
+
+# Maak de gecachte homepage-tellers van een bedrijf ongeldig na een orderwijziging
+def invalidate_company_home(company_id):
+    if company_id:
+        reference_cache.invalidate("CompanyHome", company_id)
+
+
+# Verhoog de dataversie van de dashboards die door een schrijfactie veranderen
+def invalidate_dashboards(company_ids=(), driver_ids=(), client_ids=()):
+    data_versions.bump("company", *company_ids)
+    data_versions.bump("driver", *driver_ids)
+    data_versions.bump("customer", *client_ids)
+
+
+# Geef een dashboard uit de fragmentcache terug of render het via render().
+# De sleutel bevat rol, entiteit, dataversie, de versies van depends_on (andere
+# (rol, entiteit)-paren waarvan de pagina afhangt), de dag (achterstallig/prioriteit
+# hangen van de datum af) en de volledige URL (paginering). Bij openstaande
+# flash-berichten wordt live gerenderd en niets gecachet; een exception in
+# render() wordt niet gecachet. Ondersteunt ETag/If-None-Match (304).
+def render_cached(role, entity_id, render, depends_on=()):
+    if session.get("_flashes"):
+        return render()
+
+    versions = tuple(data_versions.get(*dependency) for dependency in ((role, entity_id), *depends_on))
+    key = (role, entity_id, versions, date.today().isoformat(), request.full_path)
+    entry = fragment_cache.get("Fragments", key)
+    if entry is None:
+        html = render()
+        if not isinstance(html, str):
+            return html
+        entry = (html, hashlib.sha1(html.encode("utf-8")).hexdigest())
+        fragment_cache.set("Fragments", key, entry)
+
+    html, etag = entry
+    response = make_response(html)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
+
+
+# Kan deze worker een stream minutenlang openhouden zonder de app te blokkeren?
+# Enkel met threads (gunicorn gthread, de dev-server) of gevent; een sync-worker
+# zou door één open tabblad volledig bezet zijn.
+def can_hold_event_stream():
+    if request.environ.get("wsgi.multithread"):
+        return True
+    gevent_monkey = sys.modules.get("gevent.monkey")
+    return gevent_monkey is not None and gevent_monkey.is_module_patched("socket")
+
+
+def _acquire_stream_slot():
+    global _open_streams
+    with _open_streams_lock:
+        if _open_streams >= current_app.config.get("SSE_MAX_STREAMS", DEFAULT_SSE_MAX_STREAMS):
+            return False
+        _open_streams += 1
+        return True
+
+
+def _release_stream_slot():
+    global _open_streams
+    with _open_streams_lock:
+        _open_streams -= 1
+
+
+# Stream de events van één kanaal als text/event-stream. Keepalive-commentaar houdt
+# proxies open; na SSE_MAX_STREAM_SECONDS sluit de stream en verbindt de browser
+# opnieuw met Last-Event-ID, waarna gemiste events opnieuw geleverd worden.
+# Kan de worker geen stream openhouden (sync-worker of al SSE_MAX_STREAMS open),
+# dan krijgt de browser meteen de gemiste events en een langere retry: EventSource
+# pollt dan zonder een worker bezet te houden.
+def stream_events(channel):
+    last_event_id = request.headers.get("Last-Event-ID")
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    bus = get_event_bus()
+    # Zonder Last-Event-ID vanaf het huidige event; het id gaat mee naar de browser
+    # zodat een herverbinding niets mist
+    cursor = bus.last_event_id() if last_event_id is None else last_event_id
+    subscription = bus.subscribe(channel, cursor)
+
+    if not can_hold_event_stream() or not _acquire_stream_slot():
+        try:
+            events = []
+            while len(events) < SSE_POLL_MAX_EVENTS:
+                event = subscription.get(timeout=0)
+                if event is None:
+                    break
+                events.append(event)
+        finally:
+            subscription.close()
+        body = f"retry: {SSE_POLL_RETRY_MS}\n"
+        body += "".join(format_sse(event) for event in events) if events else f"id: {cursor}\n\n"
+        response = Response(body, mimetype="text/event-stream")
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    def generate():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\nid: {cursor}\n\n"
+            deadline = time.monotonic() + SSE_MAX_STREAM_SECONDS
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                event = subscription.get(timeout=min(SSE_KEEPALIVE_SECONDS, remaining))
+                yield format_sse(event) if event is not None else ": keepalive\n\n"
+        finally:
+            subscription.close()
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    # Ook als de generator nooit gestart wordt (browser meteen weg)
+    def close():
+        subscription.close()
+        _release_stream_slot()
+
+    response.call_on_close(close)
+    return response
+
+
 def validate_user_type(required_type):
     user_type = session.get("user_type", "customer")
     if user_type != required_type:
@@ -219,99 +828,57 @@ def validate_user_type(required_type):
 
 def get_custom_task_times(company_id):
     try:
-        result = (
-            supabase.table("TaskTypes")
-            .select("id, task_type, time_per_1000kg")
-            .eq("company_id", company_id)
-            .execute()
-        )
-        if result.data:
-            return {tt["id"]: float(tt.get("time_per_1000kg", 1.0)) for tt in result.data}
+        task_types = get_task_types_for_company(company_id)
+        if task_types:
+            return {tt["id"]: float(tt.get("time_per_1000kg", 1.0)) for tt in task_types}
     except Exception:
         pass
     return {}
 
 
-def get_previous_orders_for_customer(client_id):
+def get_previous_orders_for_customer(client_id, limit=10):
     previous_orders = []
     if not client_id:
         return previous_orders
     try:
-        addresses_result = (
-            supabase.table("Address").select("id").eq("client_id", client_id).execute()
-        )
-        address_ids = [addr["id"] for addr in addresses_result.data] if addresses_result.data else []
-        if not address_ids:
-            return previous_orders
         orders_result = (
             supabase.table("Orders")
-            .select("*, Address!orders_address_id_fkey(*), TaskTypes(*)")
-            .in_("address_id", address_ids)
+            .select(
+                "*, Address!orders_address_id_fkey!inner(*), "
+                "TaskTypes(task_type, company_id, Companies(name))"
+            )
+            .eq("Address.client_id", client_id)
             .eq("status", "completed")
             .order("created_at", desc=True)
-            .limit(10)
+            .limit(limit)
             .execute()
         )
-        if orders_result and orders_result.data:
-            for order in orders_result.data:
-                task_type_name = None
-                task_type_id = order.get("task_type_id")
-                company_id_from_task = None
-                if order.get("TaskTypes"):
-                    task_type_name = order["TaskTypes"].get("task_type")
-                    company_id_from_task = order["TaskTypes"].get("company_id")
-                elif task_type_id:
-                    try:
-                        task_type_result = (
-                            supabase.table("TaskTypes")
-                            .select("task_type, company_id")
-                            .eq("id", task_type_id)
-                            .limit(1)
-                            .execute()
-                        )
-                        if task_type_result.data:
-                            task_type_name = task_type_result.data[0].get("task_type")
-                            company_id_from_task = task_type_result.data[0].get(
-                                "company_id"
-                            )
-                    except Exception:
-                        pass
-                order_info = {
-                    "id": order.get("id"),
-                    "task_type": task_type_name,
-                    "task_type_id": task_type_id,
-                    "product_type": order.get("product_type"),
-                    "weight": order.get("Weight") or order.get("weight"),
-                    "company_id": company_id_from_task,
-                    "company_name": None,
-                    "address_id": order.get("address_id"),
-                    "address": None,
-                    "deadline": order.get("deadline"),
-                    "created_at": order.get("created_at"),
+        for order in orders_result.data or []:
+            task_types = order.get("TaskTypes") or {}
+            company = task_types.get("Companies") or {}
+            order_info = {
+                "id": order.get("id"),
+                "task_type": task_types.get("task_type"),
+                "task_type_id": order.get("task_type_id"),
+                "product_type": order.get("product_type"),
+                "weight": order.get("Weight") or order.get("weight"),
+                "company_id": task_types.get("company_id"),
+                "company_name": company.get("name"),
+                "address_id": order.get("address_id"),
+                "address": None,
+                "deadline": order.get("deadline"),
+                "created_at": order.get("created_at"),
+            }
+            if order.get("Address"):
+                addr = order["Address"]
+                order_info["address"] = {
+                    "id": addr.get("id"),
+                    "street_name": addr.get("street_name"),
+                    "house_number": addr.get("house_number"),
+                    "city": addr.get("city"),
+                    "phone_number": addr.get("phone_number"),
                 }
-                if company_id_from_task:
-                    try:
-                        company_result = (
-                            supabase.table("Companies")
-                            .select("name")
-                            .eq("id", company_id_from_task)
-                            .limit(1)
-                            .execute()
-                        )
-                        if company_result.data:
-                            order_info["company_name"] = company_result.data[0].get("name")
-                    except Exception:
-                        pass
-                if order.get("Address"):
-                    addr = order["Address"]
-                    order_info["address"] = {
-                        "id": addr.get("id"),
-                        "street_name": addr.get("street_name"),
-                        "house_number": addr.get("house_number"),
-                        "city": addr.get("city"),
-                        "phone_number": addr.get("phone_number"),
-                    }
-                previous_orders.append(order_info)
+            previous_orders.append(order_info)
     except Exception:
         pass
     return filter_duplicate_orders(previous_orders)
@@ -319,12 +886,15 @@ def get_previous_orders_for_customer(client_id):
 
 def get_companies_list():
     companies = []
+
+    def load():
+        result = supabase.table("Companies").select("id, name").order("name").execute()
+        return result.data or []
+
     try:
-        companies_result = (
-            supabase.table("Companies").select("id, name, emailaddress").order("name").execute()
-        )
-        if companies_result.data:
-            companies = [{"id": c["id"], "name": c["name"]} for c in companies_result.data]
+        key = ("list", data_versions.get("companies", "list"))
+        companies_data = reference_cache.get_or_load("Companies", key, load)
+        companies = [{"id": c["id"], "name": c["name"]} for c in companies_data]
     except Exception:
         pass
     return companies
@@ -349,6 +919,18 @@ def get_addresses_for_client(client_id):
     return addresses
 
 
+# Alle data voor de orderpagina: adressen en eerdere orders (elk één query,
+# parallel) plus de gecachte bedrijvenlijst
+def load_order_page_data(client_id, previous_limit=10):
+    loaded = fetch_concurrently(
+        companies=get_companies_list,
+        addresses=lambda: get_addresses_for_client(client_id),
+        previous_orders=lambda: get_previous_orders_for_customer(client_id, previous_limit),
+    )
+    loaded["previous_orders"].sort(key=lambda x: x.get("created_at") or "", reverse=True)
+    return loaded
+
+
 def build_order_info_for_edit(order_data):
     task_type_name = None
     task_type_id = order_data.get("task_type_id")
@@ -390,23 +972,12 @@ def build_order_info_for_edit(order_data):
         }
     if task_type_id and order_data.get("TaskTypes"):
         company_id = order_data["TaskTypes"].get("company_id")
-        if company_id:
-            try:
-                company_result = (
-                    supabase.table("Companies")
-                    .select("id, name")
-                    .eq("id", company_id)
-                    .limit(1)
-                    .execute()
-                )
-                if company_result.data:
-                    company = company_result.data[0]
-                    order_info["company"] = {
-                        "name": company.get("name"),
-                        "id": company.get("id"),
-                    }
-            except Exception:
-                pass
+        company = get_company_by_id(company_id)
+        if company:
+            order_info["company"] = {
+                "name": company.get("name"),
+                "id": company.get("id"),
+            }
     return order_info
 
 
@@ -428,15 +999,20 @@ def parse_date_utc(date_str):
         return None
 
 
-# Bepaal of een deadline verstreken is (behalve bij completed)
+# Bepaal of een deadline verstreken is (behalve bij completed).
+# De deadline mag een string of een al geparste date zijn.
 def is_order_overdue(deadline_str, status=None):
     if not deadline_str or (status and status == "completed"):
         return False
-    deadline_dt = parse_date_utc(deadline_str)
-    if not deadline_dt:
-        return False
+    if isinstance(deadline_str, date) and not isinstance(deadline_str, datetime):
+        deadline_date = deadline_str
+    else:
+        deadline_dt = parse_date_utc(deadline_str)
+        if not deadline_dt:
+            return False
+        deadline_date = deadline_dt.date()
     today = datetime.now(timezone.utc).date()
-    return deadline_dt.date() < today
+    return deadline_date < today
 
 
 # Converteer gewicht in kg naar tonnen
@@ -464,18 +1040,9 @@ def calculate_statistics_by_task_type(orders, custom_task_types):
     return stats
 
 
-# Genereer beschikbare maanden op basis van orderdata
-def generate_available_months(all_orders):
+# Maanden (nieuwste eerst) van de maand van first_date tot en met nu
+def generate_months_since(first_date):
     available_months = []
-    if not all_orders:
-        return available_months
-    first_date = None
-    for order in all_orders:
-        order_date_str = order.get("created_at") or order.get("deadline")
-        order_date = parse_date_utc(order_date_str)
-        if order_date:
-            if first_date is None or order_date < first_date:
-                first_date = order_date
     if first_date:
         month_names = {
             1: "januari",
@@ -505,3 +1072,49 @@ def generate_available_months(all_orders):
         available_months.reverse()
     return available_months
 
+
+# Maand-sleutel (YYYY-MM, UTC) waaronder een voltooide order geteld wordt
+def get_order_stats_month(order):
+    order_date = parse_date_utc(order.get("created_at") or order.get("deadline"))
+    if not order_date:
+        return None
+    return f"{order_date.year}-{order_date.month:02d}"
+
+
+# Tel een net voltooide order op bij de maandelijkse tonnage-rollup
+def record_completed_order_stats(order):
+    task_types = order.get("TaskTypes") or {}
+    company_id = task_types.get("company_id")
+    task_type_id = order.get("task_type_id")
+    month = get_order_stats_month(order)
+    if not (company_id and task_type_id and month):
+        return
+    weight = order.get("Weight") or order.get("weight") or 0
+    supabase.rpc(
+        "increment_order_stats_monthly",
+        {
+            "p_company_id": company_id,
+            "p_task_type_id": task_type_id,
+            "p_month": month,
+            "p_weight_kg": float(weight),
+        },
+    ).execute()
+
+
+# Bouw de maandelijkse tonnage-rollup opnieuw op uit alle voltooide orders.
+# Gebeurt in één databasefunctie (transactie), zodat gelijktijdige ophogingen
+# niet verloren gaan tussen het wissen en opnieuw schrijven.
+def rebuild_order_stats(company_id=None):
+    result = supabase.rpc("rebuild_order_stats_monthly", {"p_company_id": company_id}).execute()
+    return result.data or 0
+
+
+# Lees de maandelijkse tonnage-rollup van een bedrijf
+def get_order_stats_for_company(company_id):
+    result = (
+        supabase.table("OrderStatsMonthly")
+        .select("task_type_id, month, weight_kg, order_count")
+        .eq("company_id", company_id)
+        .execute()
+    )
+    return result.data or []
@@ -0,0 +1,285 @@
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Optional, Tuple
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+SESSION_BACKENDS = ("cookie", "memory", "sqlite")
+DEFAULT_MAX_SESSIONS = 10_000
+DEFAULT_POOL_SIZE = 4
+# Bij sliding expiry de vervaldatum hoogstens zo vaak (seconden) verlengen
+DEFAULT_REFRESH_INTERVAL = 60.0
+SID_BYTES = 32
+
+_serializer = TaggedJSONSerializer()
+
+
+# Sessie-inhoud die server-side bewaard wordt; de cookie bevat enkel het (ondertekende) id.
+# clear() (bv. bij login/logout) laat het id roteren zodat een oud id niet herbruikbaar is.
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = sid is None
+        self.expires_at = expires_at
+        self.rotate = False
+        self.modified = False
+        self.accessed = False
+
+    def clear(self):
+        super().clear()
+        self.rotate = True
+
+
+# In-memory store met LRU-eviction en vervaltijd; enkel voor één proces (lokaal/tests)
+class MemorySessionStore:
+    def __init__(self, max_entries: int = DEFAULT_MAX_SESSIONS, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, sid: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at <= self._clock():
+                del self._entries[sid]
+                return None
+            self._entries.move_to_end(sid)
+            return data, expires_at
+
+    def save(self, sid: str, data: str, expires_at: float) -> None:
+        with self._lock:
+            self._entries[sid] = (expires_at, data)
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def touch(self, sid: str, expires_at: float) -> None:
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is not None:
+                self._entries[sid] = (expires_at, entry[1])
+
+    def delete(self, sid: str) -> None:
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# SQLite-store (bestand, gedeeld tussen workers) met een kleine pool van connecties.
+# De pool hoort bij één proces: na een fork (gunicorn --preload) opent de worker
+# een eigen pool in plaats van de connecties van de ouder te delen.
+# Verlopen sessies worden bij het laden genegeerd en af en toe opgeruimd.
+class SQLiteSessionStore:
+    def __init__(
+        self,
+        path: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        clock: Callable[[], float] = time.time,
+        purge_every: int = 1000,
+    ):
+        self.path = path
+        self._clock = clock
+        self._purge_every = purge_every
+        self._pool_size = pool_size
+        self._writes = 0
+        self._lock = threading.Lock()
+        # Een :memory:-database bestaat per connectie; deel ze via shared cache
+        self._uri = path == ":memory:"
+        if self._uri:
+            path = f"file:agriflow_sessions_{id(self)}?mode=memory&cache=shared"
+        self._connect_path = path
+        self._pool: Optional["queue.LifoQueue[sqlite3.Connection]"] = None
+        self._pool_pid: Optional[int] = None
+        self._process_pool()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self._connect_path, uri=self._uri, check_same_thread=False, isolation_level=None, timeout=5.0
+        )
+        if not self._uri:
+            connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    # Pool van dit proces; (opnieuw) opgebouwd bij de eerste connectie na een fork
+    def _process_pool(self) -> "queue.LifoQueue[sqlite3.Connection]":
+        pid = os.getpid()
+        if self._pool_pid != pid:
+            with self._lock:
+                if self._pool_pid != pid:
+                    pool = queue.LifoQueue(maxsize=self._pool_size)
+                    for _ in range(self._pool_size):
+                        pool.put(self._connect())
+                    connection = pool.queue[-1]
+                    connection.execute(
+                        "CREATE TABLE IF NOT EXISTS sessions "
+                        "(sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+                    )
+                    connection.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+                    self._pool = pool
+                    self._pool_pid = pid
+        return self._pool
+
+    @contextmanager
+    def _connection(self):
+        pool = self._process_pool()
+        connection = pool.get()
+        try:
+            yield connection
+        finally:
+            pool.put(connection)
+
+    def load(self, sid: str) -> Optional[Tuple[str, float]]:
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT data, expires_at FROM sessions WHERE sid = ? AND expires_at > ?", (sid, self._clock())
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def save(self, sid: str, data: str, expires_at: float) -> None:
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT INTO sessions (sid, data, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (sid) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at",
+                (sid, data, expires_at),
+            )
+            with self._lock:
+                self._writes += 1
+                purge = self._writes % self._purge_every == 0
+            if purge:
+                connection.execute("DELETE FROM sessions WHERE expires_at <= ?", (self._clock(),))
+
+    def touch(self, sid: str, expires_at: float) -> None:
+        with self._connection() as connection:
+            connection.execute("UPDATE sessions SET expires_at = ? WHERE sid = ?", (expires_at, sid))
+
+    def delete(self, sid: str) -> None:
+        with self._connection() as connection:
+            connection.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def __len__(self) -> int:
+        with self._connection() as connection:
+            row = connection.execute("SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (self._clock(),)).fetchone()
+        return row[0]
+
+
+# Flask-sessie-interface bovenop een store: de cookie bevat een ondertekend sessie-id
+# (constante grootte). Met sliding expiry schuift de vervaldatum bij elk bezoek op,
+# maar wordt de store hoogstens eens per refresh_interval aangesproken als de
+# sessie niet gewijzigd is.
+class ServerSessionInterface(SessionInterface):
+    session_class = ServerSession
+
+    def __init__(
+        self,
+        store,
+        sliding: bool = True,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store
+        self.sliding = sliding
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+
+    def _signer(self, app) -> Optional[Signer]:
+        if not app.secret_key:
+            return None
+        return Signer(app.secret_key, salt="agriflow-session")
+
+    def _lifetime(self, app) -> float:
+        return app.permanent_session_lifetime.total_seconds()
+
+    def open_session(self, app, request):
+        signer = self._signer(app)
+        if signer is None:
+            return None
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = signer.unsign(cookie).decode("ascii")
+            except BadSignature:
+                sid = None
+            if sid:
+                entry = self.store.load(sid)
+                if entry is not None:
+                    data, expires_at = entry
+                    return self.session_class(_serializer.loads(data), sid=sid, expires_at=expires_at)
+        return self.session_class()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if not session:
+            if session.sid is not None:
+                self.store.delete(session.sid)
+            if session.modified or session.sid is not None:
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        expires_at = self._clock() + self._lifetime(app)
+        if not self.sliding and session.expires_at is not None:
+            expires_at = session.expires_at
+        if session.rotate and session.sid is not None:
+            self.store.delete(session.sid)
+            session.sid = None
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(SID_BYTES)
+            session.new = True
+
+        if session.new or session.modified:
+            self.store.save(session.sid, _serializer.dumps(dict(session)), expires_at)
+        elif self.sliding and session.expires_at is not None and expires_at - session.expires_at >= self.refresh_interval:
+            self.store.touch(session.sid, expires_at)
+        else:
+            return
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid.encode("ascii")).decode("ascii"),
+            expires=expires_at,
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+# Kies de sessie-backend uit de config: "cookie" laat Flask's ondertekende cookie staan
+def create_session_interface(config) -> Optional[ServerSessionInterface]:
+    backend = (config.get("SESSION_BACKEND") or "cookie").lower()
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f"Onbekende SESSION_BACKEND '{backend}', kies uit {', '.join(SESSION_BACKENDS)}")
+    if backend == "cookie":
+        return None
+    if backend == "memory":
+        store = MemorySessionStore(config.get("SESSION_MAX_ENTRIES", DEFAULT_MAX_SESSIONS))
+    else:
+        store = SQLiteSessionStore(config.get("SESSION_SQLITE_PATH", "sessions.db"))
+    return ServerSessionInterface(store, sliding=config.get("SESSION_SLIDING", True))
@@ -0,0 +1,31 @@
+import os
+
+from ..instrumentation import instrument_client
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "database_schema.sql")
+
+
+# Maak de data-client voor de geconfigureerde backend.
+# "supabase" (standaard) gebruikt de PostgREST-client, "sqlite" een lokale
+# database opgebouwd uit database_schema.sql met dezelfde query-interface.
+# De client wordt meteen ingepakt voor de query-instrumentatie, zodat elke
+# module die hem importeert (from ..config import supabase) de ingepakte krijgt.
+def create_storage_client(config):
+    return instrument_client(_create_backend_client(config))
+
+
+def _create_backend_client(config):
+    backend = getattr(config, "STORAGE_BACKEND", "supabase")
+    if backend == "sqlite":
+        from .sqlite_backend import SQLiteClient
+
+        return SQLiteClient(getattr(config, "SQLITE_PATH", ":memory:"), SCHEMA_PATH)
+
+    if backend != "supabase":
+        raise ValueError(f"Onbekende STORAGE_BACKEND: {backend}")
+    if not config.SUPABASE_KEY:
+        return None
+
+    from supabase import create_client
+
+    return create_client(config.SUPABASE_URL, config.SUPABASE_KEY)
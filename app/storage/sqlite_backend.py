@@ -0,0 +1,673 @@
+import random
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+# Lokale SQLite-backend met dezelfde query-interface als de Supabase-client
+# (table().select().eq()...execute()), zodat de routes ongewijzigd tegen een
+# lokale database draaien, bv. voor load tests zonder netwerk.
+#
+# Ondersteund: kolommen en geneste many-to-one/one-to-many embeds in select
+# (met !inner en een genegeerde !fkey-hint), filters op eigen en ingebedde
+# kolommen (eq, neq, gt, gte, lt, lte, like, ilike, in_, is_, or_), order,
+# limit, range, count="exact"/head, insert, update, delete, upsert en rpc.
+
+_TIMESTAMP_DEFAULT = "(strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))"
+_MAX_SQL_PARAMS = 900
+_OPERATORS = {
+    "eq": "=",
+    "neq": "<>",
+    "gt": ">",
+    "gte": ">=",
+    "lt": "<",
+    "lte": "<=",
+    "like": "LIKE",
+    "ilike": "LIKE",
+}
+
+
+class StorageError(Exception):
+    pass
+
+
+# Zet de PostgreSQL DDL uit database_schema.sql om naar SQLite
+def translate_schema(schema_sql):
+    sql = re.sub(r"CREATE OR REPLACE FUNCTION.*?\$\$\s*LANGUAGE\s+\w+\s*;", "", schema_sql, flags=re.S | re.I)
+    sql = re.sub(r"^\s*COMMENT ON [^\n]*;\s*$", "", sql, flags=re.M | re.I)
+    sql = re.sub(r"--[^\n]*", "", sql)
+    sql = re.sub(r"\bSERIAL PRIMARY KEY\b", "INTEGER PRIMARY KEY AUTOINCREMENT", sql, flags=re.I)
+    sql = re.sub(
+        r"\bTIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP\b",
+        f"TEXT DEFAULT {_TIMESTAMP_DEFAULT}",
+        sql,
+        flags=re.I,
+    )
+    return sql
+
+
+# Splits op een scheidingsteken buiten haakjes en aanhalingstekens
+def _split_top_level(text, sep=","):
+    parts = []
+    depth = 0
+    quoted = False
+    current = []
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == sep and depth == 0 and not quoted:
+            parts.append("".join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+    if "".join(current).strip():
+        parts.append("".join(current).strip())
+    return parts
+
+
+_EMBED_RE = re.compile(r"^(\w+)((?:!\w+)*)\((.*)\)$", re.S)
+
+
+# Parse een PostgREST select-string naar kolommen en embeds
+def parse_select(text):
+    columns = []
+    embeds = []
+    for item in _split_top_level(text or "*"):
+        match = _EMBED_RE.match(item)
+        if not match:
+            columns.append(item)
+            continue
+        name, modifiers, inner_text = match.groups()
+        sub_columns, sub_embeds = parse_select(inner_text)
+        embeds.append(
+            {
+                "name": name,
+                "inner": "!inner" in modifiers,
+                "columns": sub_columns,
+                "embeds": sub_embeds,
+            }
+        )
+    return columns, embeds
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return value[1:-1].replace('\\"', '"')
+    return value
+
+
+class Response:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class QueryBuilder:
+    def __init__(self, client, table):
+        self._client = client
+        self._table = table
+        self._mode = "select"
+        self._columns = ["*"]
+        self._embeds = []
+        self._filters = []
+        self._order = []
+        self._limit = None
+        self._offset = None
+        self._count = None
+        self._head = False
+        self._values = None
+        self._on_conflict = None
+        self._ignore_duplicates = False
+
+    # -- bouwstenen ------------------------------------------------------
+
+    def select(self, columns="*", count=None, head=False):
+        self._mode = "select"
+        self._columns, self._embeds = parse_select(columns)
+        self._count = count
+        self._head = head
+        return self
+
+    def insert(self, values, **kwargs):
+        self._mode = "insert"
+        self._values = values if isinstance(values, list) else [values]
+        return self
+
+    # Zoals PostgREST: bij een conflict (standaard op de primary key) worden enkel
+    # de meegegeven kolommen bijgewerkt, de overige kolommen blijven staan
+    def upsert(self, values, on_conflict="", ignore_duplicates=False, **kwargs):
+        self._mode = "upsert"
+        self._values = values if isinstance(values, list) else [values]
+        self._on_conflict = [c.strip() for c in on_conflict.split(",") if c.strip()] if on_conflict else None
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values, **kwargs):
+        self._mode = "update"
+        self._values = values
+        return self
+
+    def delete(self, **kwargs):
+        self._mode = "delete"
+        return self
+
+    def _filter(self, column, op, value, negate=False):
+        self._filters.append(("cond", column, op, value, negate))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", value)
+
+    def like(self, column, value):
+        return self._filter(column, "like", value)
+
+    def ilike(self, column, value):
+        return self._filter(column, "ilike", value)
+
+    def in_(self, column, values):
+        return self._filter(column, "in", list(values))
+
+    def is_(self, column, value):
+        return self._filter(column, "is", value)
+
+    def or_(self, filters, **kwargs):
+        self._filters.append(("or", filters))
+        return self
+
+    def order(self, column, desc=False, nullsfirst=None, **kwargs):
+        self._order.append((column, desc, nullsfirst))
+        return self
+
+    def limit(self, size, **kwargs):
+        self._limit = size
+        return self
+
+    def range(self, start, end, **kwargs):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def execute(self):
+        with self._client.lock:
+            if self._mode == "select":
+                return self._execute_select()
+            if self._mode in ("insert", "upsert"):
+                return self._execute_insert()
+            if self._mode == "update":
+                return self._execute_update()
+            return self._execute_delete()
+
+    # -- SQL-opbouw ------------------------------------------------------
+
+    def _embed_by_name(self, name):
+        for embed in self._embeds:
+            if embed["name"] == name:
+                return embed
+        raise StorageError(f"Onbekende embed '{name}' in filter op {self._table}")
+
+    def _column_sql(self, column, joins):
+        if "." in column:
+            embed_name, embed_column = column.split(".", 1)
+            self._embed_by_name(embed_name)
+            joins.add(embed_name)
+            return f'"j_{embed_name}"."{embed_column}"'
+        return f'base."{column}"'
+
+    def _condition_sql(self, column, op, value, negate, joins):
+        column_sql = self._column_sql(column, joins)
+        if op == "in":
+            if not value:
+                sql, params = "0", []
+            else:
+                sql = f"{column_sql} IN ({','.join('?' * len(value))})"
+                params = list(value)
+        elif op == "is":
+            keyword = {"null": "NULL", "true": "1", "false": "0"}.get(str(value).lower(), "NULL")
+            return (f"{column_sql} IS NOT {keyword}" if negate else f"{column_sql} IS {keyword}"), []
+        elif op in _OPERATORS:
+            if op == "ilike":
+                sql = f"LOWER({column_sql}) LIKE LOWER(?)"
+            else:
+                sql = f"{column_sql} {_OPERATORS[op]} ?"
+            params = [value.replace("*", "%") if op in ("like", "ilike") else value]
+        else:
+            raise StorageError(f"Niet-ondersteunde operator '{op}'")
+        return (f"NOT ({sql})" if negate else sql), params
+
+    # Vertaal een PostgREST logische boom (or_/and) naar SQL
+    def _logic_sql(self, expression, joiner, joins):
+        fragments = []
+        params = []
+        for item in _split_top_level(expression):
+            lowered = item.lower()
+            if lowered.startswith("and(") or lowered.startswith("or("):
+                inner_joiner = "AND" if lowered.startswith("and(") else "OR"
+                sql, sub_params = self._logic_sql(item[item.index("(") + 1 : -1], inner_joiner, joins)
+            else:
+                column, rest = item.split(".", 1)
+                negate = False
+                if rest.startswith("not."):
+                    negate = True
+                    rest = rest[4:]
+                op, raw_value = rest.split(".", 1)
+                if op == "in":
+                    value = [_unquote(v) for v in _split_top_level(raw_value.strip("()"))]
+                else:
+                    value = _unquote(raw_value)
+                sql, sub_params = self._condition_sql(column, op, value, negate, joins)
+            fragments.append(f"({sql})")
+            params.extend(sub_params)
+        return f" {joiner} ".join(fragments) or "1", params
+
+    def _where_sql(self, joins):
+        fragments = []
+        params = []
+        for entry in self._filters:
+            if entry[0] == "or":
+                sql, sub_params = self._logic_sql(entry[1], "OR", joins)
+            else:
+                _, column, op, value, negate = entry
+                sql, sub_params = self._condition_sql(column, op, value, negate, joins)
+            fragments.append(f"({sql})")
+            params.extend(sub_params)
+        return (" WHERE " + " AND ".join(fragments)) if fragments else "", params
+
+    def _from_sql(self, joins):
+        for embed in self._embeds:
+            if embed["inner"]:
+                joins.add(embed["name"])
+        parts = [f'"{self._table}" AS base']
+        for embed_name in sorted(joins):
+            embed = self._embed_by_name(embed_name)
+            relation = self._client.relation(self._table, embed_name)
+            if relation is None or relation[0] != "many_to_one":
+                raise StorageError(f"Geen many-to-one relatie {self._table} -> {embed_name}")
+            _, local_col, remote_col = relation
+            join_type = "INNER JOIN" if embed["inner"] else "LEFT JOIN"
+            parts.append(
+                f'{join_type} "{embed_name}" AS "j_{embed_name}" '
+                f'ON "j_{embed_name}"."{remote_col}" = base."{local_col}"'
+            )
+        return " ".join(parts)
+
+    def _order_sql(self, joins):
+        if not self._order:
+            return ""
+        clauses = []
+        for column, desc, nullsfirst in self._order:
+            # Zelfde standaard als PostgreSQL: NULL achteraan bij ASC, vooraan bij DESC
+            nulls_first = desc if nullsfirst is None else nullsfirst
+            clauses.append(
+                f"{self._column_sql(column, joins)} {'DESC' if desc else 'ASC'} "
+                f"NULLS {'FIRST' if nulls_first else 'LAST'}"
+            )
+        return " ORDER BY " + ", ".join(clauses)
+
+    def _matching_rowids(self):
+        joins = set()
+        where_sql, params = self._where_sql(joins)
+        sql = f"SELECT base.rowid FROM {self._from_sql(joins)}{where_sql}"
+        return [row[0] for row in self._client.connection.execute(sql, params)]
+
+    # -- uitvoering ------------------------------------------------------
+
+    def _execute_select(self):
+        joins = set()
+        where_sql, params = self._where_sql(joins)
+        order_sql = self._order_sql(joins)
+        from_sql = self._from_sql(joins)
+        connection = self._client.connection
+
+        count = None
+        if self._count:
+            count = connection.execute(f"SELECT COUNT(*) FROM {from_sql}{where_sql}", params).fetchone()[0]
+            if self._head:
+                return Response([], count)
+
+        sql = f"SELECT base.* FROM {from_sql}{where_sql}{order_sql}"
+        if self._limit is not None:
+            sql += f" LIMIT {int(self._limit)}"
+            if self._offset:
+                sql += f" OFFSET {int(self._offset)}"
+        rows = [dict(row) for row in connection.execute(sql, params)]
+        self._client.attach_embeds(self._table, rows, self._embeds)
+        return Response([self._client.project(row, self._columns, self._embeds) for row in rows], count)
+
+    def _conflict_sql(self, columns):
+        if self._mode != "upsert":
+            return ""
+        target = self._on_conflict or self._client.primary_key(self._table)
+        target_sql = ", ".join(f'"{c}"' for c in target)
+        updates = [c for c in columns if c not in target]
+        if self._ignore_duplicates or not updates:
+            return f" ON CONFLICT ({target_sql}) DO NOTHING"
+        assignments = ", ".join(f'"{c}" = excluded."{c}"' for c in updates)
+        return f" ON CONFLICT ({target_sql}) DO UPDATE SET {assignments}"
+
+    def _execute_insert(self):
+        connection = self._client.connection
+        rowids = []
+        try:
+            for values in self._values:
+                columns = list(values.keys())
+                column_list = ", ".join(f'"{c}"' for c in columns)
+                sql = (
+                    f'INSERT INTO "{self._table}" ({column_list}) VALUES ({", ".join("?" * len(columns))})'
+                    f"{self._conflict_sql(columns)} RETURNING rowid"
+                )
+                row = connection.execute(sql, [values[c] for c in columns]).fetchone()
+                if row is not None:
+                    rowids.append(row[0])
+        except sqlite3.Error:
+            connection.rollback()
+            raise
+        connection.commit()
+        return Response(self._client.rows_by_rowid(self._table, rowids))
+
+    def _execute_update(self):
+        connection = self._client.connection
+        rowids = self._matching_rowids()
+        if rowids:
+            columns = list(self._values.keys())
+            assignments = ", ".join(f'"{c}" = ?' for c in columns)
+            for start in range(0, len(rowids), _MAX_SQL_PARAMS):
+                chunk = rowids[start : start + _MAX_SQL_PARAMS]
+                connection.execute(
+                    f'UPDATE "{self._table}" SET {assignments} WHERE rowid IN ({",".join("?" * len(chunk))})',
+                    [self._values[c] for c in columns] + chunk,
+                )
+            connection.commit()
+        return Response(self._client.rows_by_rowid(self._table, rowids))
+
+    def _execute_delete(self):
+        connection = self._client.connection
+        rowids = self._matching_rowids()
+        rows = self._client.rows_by_rowid(self._table, rowids)
+        for start in range(0, len(rowids), _MAX_SQL_PARAMS):
+            chunk = rowids[start : start + _MAX_SQL_PARAMS]
+            connection.execute(f'DELETE FROM "{self._table}" WHERE rowid IN ({",".join("?" * len(chunk))})', chunk)
+        connection.commit()
+        return Response(rows)
+
+
+class RpcCall:
+    def __init__(self, function, params):
+        self._function = function
+        self._params = params or {}
+
+    def execute(self):
+        return Response(self._function(**self._params))
+
+
+class SQLiteClient:
+    def __init__(self, path=":memory:", schema_path=None):
+        self.path = path
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            self.connection.execute("PRAGMA journal_mode = WAL")
+        if schema_path:
+            with open(schema_path, encoding="utf-8") as f:
+                self.connection.executescript(translate_schema(f.read()))
+        self._relations = self._load_relations()
+        self._functions = {
+            "assign_orders": self._assign_orders,
+            "increment_order_stats_monthly": self._increment_order_stats_monthly,
+            "rebuild_order_stats_monthly": self._rebuild_order_stats_monthly,
+        }
+
+    def table(self, name):
+        return QueryBuilder(self, name)
+
+    def from_(self, name):
+        return self.table(name)
+
+    def rpc(self, name, params=None):
+        if name not in self._functions:
+            raise StorageError(f"Onbekende functie '{name}'")
+        return RpcCall(self._functions[name], params)
+
+    # Foreign keys per tabel: {tabel: [(kolom, doeltabel, doelkolom)]}
+    def _load_relations(self):
+        relations = {}
+        tables = [
+            row[0]
+            for row in self.connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+            )
+        ]
+        for table in tables:
+            relations[table] = [
+                (fk["from"], fk["table"], fk["to"] or "id")
+                for fk in self.connection.execute(f'PRAGMA foreign_key_list("{table}")')
+            ]
+        return relations
+
+    def primary_key(self, table):
+        columns = [
+            (row["pk"], row["name"]) for row in self.connection.execute(f'PRAGMA table_info("{table}")') if row["pk"]
+        ]
+        return [name for _, name in sorted(columns)]
+
+    # Relatie van table naar embed: ("many_to_one", lokale kolom, doelkolom)
+    # of ("one_to_many", lokale kolom, kolom in de ingebedde tabel)
+    def relation(self, table, embed):
+        for local_col, target, remote_col in self._relations.get(table, []):
+            if target == embed:
+                return "many_to_one", local_col, remote_col
+        for local_col, target, remote_col in self._relations.get(embed, []):
+            if target == table:
+                return "one_to_many", remote_col, local_col
+        return None
+
+    def rows_by_rowid(self, table, rowids):
+        rows = []
+        for start in range(0, len(rowids), _MAX_SQL_PARAMS):
+            chunk = rowids[start : start + _MAX_SQL_PARAMS]
+            rows.extend(
+                dict(row)
+                for row in self.connection.execute(
+                    f'SELECT * FROM "{table}" WHERE rowid IN ({",".join("?" * len(chunk))})', chunk
+                )
+            )
+        return rows
+
+    def _rows_where_in(self, table, column, values):
+        rows = []
+        values = list(values)
+        for start in range(0, len(values), _MAX_SQL_PARAMS):
+            chunk = values[start : start + _MAX_SQL_PARAMS]
+            rows.extend(
+                dict(row)
+                for row in self.connection.execute(
+                    f'SELECT * FROM "{table}" WHERE "{column}" IN ({",".join("?" * len(chunk))})', chunk
+                )
+            )
+        return rows
+
+    # Vul embeds in met één IN-query per embed (ook genest)
+    def attach_embeds(self, table, rows, embeds):
+        for embed in embeds:
+            name = embed["name"]
+            relation = self.relation(table, name)
+            if relation is None:
+                raise StorageError(f"Geen relatie tussen {table} en {name}")
+            kind, local_col, remote_col = relation
+            keys = {row[local_col] for row in rows if row.get(local_col) is not None}
+            related = self._rows_where_in(name, remote_col, keys) if keys else []
+            self.attach_embeds(name, related, embed["embeds"])
+            projected = [(r[remote_col], self.project(r, embed["columns"], embed["embeds"])) for r in related]
+            if kind == "many_to_one":
+                by_key = dict(projected)
+                for row in rows:
+                    row[name] = by_key.get(row.get(local_col))
+            else:
+                grouped = {}
+                for key, value in projected:
+                    grouped.setdefault(key, []).append(value)
+                for row in rows:
+                    row[name] = grouped.get(row.get(local_col), [])
+
+    def project(self, row, columns, embeds):
+        embed_names = {embed["name"] for embed in embeds}
+        if "*" in columns:
+            result = {k: v for k, v in row.items() if k not in embed_names}
+        else:
+            result = {c: row.get(c) for c in columns}
+        for name in embed_names:
+            result[name] = row.get(name)
+        return result
+
+    # Zelfde voorwaarden als de SQL-functie assign_orders, in één transactie
+    def _assign_orders(self, p_company_id, p_assignments, p_only_unassigned=False):
+        assigned = []
+        with self.lock:
+            try:
+                for assignment in p_assignments or []:
+                    order_id, driver_id = assignment.get("order_id"), assignment.get("driver_id")
+                    row = self.connection.execute(
+                        'SELECT o.driver_id FROM "Orders" o '
+                        'JOIN "TaskTypes" t ON t.id = o.task_type_id AND t.company_id = ? '
+                        'JOIN "Drivers" d ON d.id = ? AND d.company_id = ? '
+                        "WHERE o.id = ? AND o.status <> 'completed' "
+                        "AND (NOT ? OR (o.driver_id IS NULL AND o.status = 'pending'))",
+                        (p_company_id, driver_id, p_company_id, order_id, bool(p_only_unassigned)),
+                    ).fetchone()
+                    if row is None:
+                        continue
+                    self.connection.execute(
+                        'UPDATE "Orders" SET driver_id = ?, status = ? WHERE id = ?', (driver_id, "accepted", order_id)
+                    )
+                    assigned.append({"order_id": order_id, "driver_id": driver_id, "previous_driver_id": row[0]})
+            except sqlite3.Error:
+                self.connection.rollback()
+                raise
+            self.connection.commit()
+        return assigned
+
+    def _increment_order_stats_monthly(self, p_company_id, p_task_type_id, p_month, p_weight_kg):
+        with self.lock:
+            self.connection.execute(
+                'INSERT INTO "OrderStatsMonthly" (company_id, task_type_id, month, weight_kg, order_count) '
+                "VALUES (?, ?, ?, COALESCE(?, 0), 1) "
+                "ON CONFLICT (company_id, task_type_id, month) DO UPDATE SET "
+                "weight_kg = weight_kg + excluded.weight_kg, order_count = order_count + 1",
+                (p_company_id, p_task_type_id, p_month, p_weight_kg),
+            )
+            self.connection.commit()
+        return None
+
+    # Zelfde herbouw als de SQL-functie: DELETE en INSERT in één transactie
+    def _rebuild_order_stats_monthly(self, p_company_id=None):
+        with self.lock:
+            try:
+                self.connection.execute(
+                    'DELETE FROM "OrderStatsMonthly" WHERE ? IS NULL OR company_id = ?', (p_company_id, p_company_id)
+                )
+                cursor = self.connection.execute(
+                    'INSERT INTO "OrderStatsMonthly" (company_id, task_type_id, month, weight_kg, order_count) '
+                    "SELECT t.company_id, o.task_type_id, "
+                    "COALESCE(strftime('%Y-%m', o.created_at), substr(o.deadline, 1, 7)) AS month, "
+                    'COALESCE(SUM(o."Weight"), 0), COUNT(*) '
+                    'FROM "Orders" o JOIN "TaskTypes" t ON t.id = o.task_type_id '
+                    "WHERE o.status = 'completed' AND (o.created_at IS NOT NULL OR o.deadline IS NOT NULL) "
+                    "AND (? IS NULL OR t.company_id = ?) "
+                    "GROUP BY 1, 2, 3",
+                    (p_company_id, p_company_id),
+                )
+            except sqlite3.Error:
+                self.connection.rollback()
+                raise
+            self.connection.commit()
+        return cursor.rowcount
+
+
+# Vul een lokale database met synthetische data voor load tests
+def seed_demo_data(client, companies=5, drivers_per_company=20, clients=1000, orders=100_000, seed=29):
+    rng = random.Random(seed)
+    connection = client.connection
+    now = datetime.now(timezone.utc)
+    today = now.date()
+    task_names = ["ploegen", "zaaien", "oogsten", "pletten", "maaien"]
+
+    with client.lock:
+        company_rows = []
+        for c in range(companies):
+            cursor = connection.execute(
+                'INSERT INTO "Companies" (name, emailaddress) VALUES (?, ?)',
+                (f"Bedrijf {c + 1}", f"bedrijf{c + 1}-{seed}@agriflow.local"),
+            )
+            company_id = cursor.lastrowid
+            task_type_ids = [
+                connection.execute(
+                    'INSERT INTO "TaskTypes" (task_type, company_id, time_per_1000kg) VALUES (?, ?, ?)',
+                    (name, company_id, round(rng.uniform(0.2, 2.0), 2)),
+                ).lastrowid
+                for name in task_names
+            ]
+            driver_ids = [
+                connection.execute(
+                    'INSERT INTO "Drivers" (email_address, name, company_id) VALUES (?, ?, ?)',
+                    (f"chauffeur{c + 1}-{d + 1}-{seed}@agriflow.local", f"Chauffeur {c + 1}.{d + 1}", company_id),
+                ).lastrowid
+                for d in range(drivers_per_company)
+            ]
+            company_rows.append((task_type_ids, driver_ids))
+
+        address_ids = []
+        for k in range(clients):
+            client_id = connection.execute(
+                'INSERT INTO "Client" (emailaddress, "Name", "Lastname") VALUES (?, ?, ?)',
+                (f"klant{k + 1}-{seed}@agriflow.local", f"Klant{k + 1}", "Test"),
+            ).lastrowid
+            address_ids.append(
+                connection.execute(
+                    'INSERT INTO "Address" (client_id, street_name, house_number, city) VALUES (?, ?, ?, ?)',
+                    (client_id, "Veldstraat", str(k + 1), "Gent"),
+                ).lastrowid
+            )
+
+        def order_rows():
+            for _ in range(orders):
+                task_type_ids, driver_ids = rng.choice(company_rows)
+                status = rng.choices(["pending", "accepted", "completed"], weights=[2, 3, 5])[0]
+                created_at = now - timedelta(days=rng.uniform(0, 365))
+                deadline = today + timedelta(days=rng.randint(-30, 60))
+                yield (
+                    deadline.isoformat(),
+                    rng.choice(task_type_ids),
+                    rng.choice(["graan", "maïs", "gras", "aardappelen"]),
+                    round(rng.uniform(100, 8000), 2),
+                    rng.choice(address_ids),
+                    rng.choice(driver_ids) if status != "pending" and driver_ids else None,
+                    status,
+                    created_at.isoformat(),
+                )
+
+        connection.executemany(
+            'INSERT INTO "Orders" (deadline, task_type_id, product_type, "Weight", address_id, driver_id, status, created_at) '
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            order_rows(),
+        )
+        connection.commit()
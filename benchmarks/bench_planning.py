@@ -0,0 +1,284 @@
+"""Benchmarks voor de planningsalgoritmes en dashboard-builders.
+
+Gebruik (vanuit de projectmap):
+    python -m benchmarks.bench_planning                    # vergelijk met baseline
+    python -m benchmarks.bench_planning --update-baseline  # schrijf nieuwe baseline
+    python -m benchmarks.bench_planning --quick            # tot 10k orders
+
+Meet per (functie, #orders, #chauffeurs) de beste tijd over een aantal
+herhalingen en het piekgeheugen (tracemalloc). De resultaten worden
+vergeleken met benchmarks/baselines.json; een case die trager of groter is
+dan baseline * (1 + tolerantie) laat het script falen (exit code 1). Zonder
+baseline-bestand faalt het script ook (exit code 2): er valt niets te vergelijken.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+
+# De benchmarks hebben geen database nodig; vermijd een Supabase-client
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", ":memory:")
+
+from app.algorithms import (  # noqa: E402
+    CapacityPlan,
+    OrderBatch,
+    PlanningState,
+    WorkloadIndex,
+    calculate_driver_workload_hours,
+    calculate_priority_score,
+    filter_duplicate_orders,
+    plan_driver_assignments,
+    sort_orders_by_priority,
+    suggest_best_driver,
+)
+from app.routes.routes import convert_orders_for_algorithm  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+ORDER_SIZES = [100, 1_000, 10_000, 100_000]
+QUICK_ORDER_SIZES = [100, 1_000, 10_000]
+DRIVER_COUNTS = [5, 50, 200]
+SUGGESTION_SAMPLE = 200
+PLANNING_SAMPLE = 25
+# Tijdsverschillen onder deze drempel (seconden) tellen nooit als regressie
+NOISE_FLOOR_SECONDS = 0.005
+NOISE_FLOOR_BYTES = 64 * 1024
+
+
+# Synthetische chauffeurs
+def make_drivers(count):
+    return [{"id": i + 1, "name": f"Chauffeur {i + 1}", "email_address": f"c{i + 1}@agriflow.local"} for i in range(count)]
+
+
+# Synthetische orders in het formaat van de Supabase-rijen
+def make_orders(count, drivers, task_type_ids=(1, 2, 3, 4, 5), seed=29):
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.now(timezone.utc)
+    orders = []
+    for i in range(count):
+        status = rng.choices(["pending", "accepted", "completed"], weights=[3, 4, 3])[0]
+        orders.append(
+            {
+                "id": i + 1,
+                "deadline": (today + timedelta(days=rng.randint(-10, 30))).isoformat(),
+                "task_type_id": rng.choice(task_type_ids),
+                "product_type": rng.choice(["graan", "maïs", "gras"]),
+                "Weight": round(rng.uniform(100, 8000), 2),
+                "address_id": rng.randint(1, max(1, count // 10)),
+                "company_id": 1,
+                "driver_id": rng.choice(drivers)["id"] if status != "pending" and drivers else None,
+                "status": status,
+                "created_at": (now - timedelta(days=rng.uniform(0, 60))).isoformat(),
+            }
+        )
+    return orders
+
+
+def _custom_task_times():
+    return {1: 0.5, 2: 1.0, 3: 1.5, 4: 0.25}
+
+
+# Elke case krijgt (orders, drivers) en geeft een functie zonder argumenten terug
+# De algoritmes krijgen Order-records, zoals de routes ze na het laden doorgeven
+def case_priority_score(orders, drivers):
+    records = convert_orders_for_algorithm(orders)
+    return lambda: [calculate_priority_score(r) for r in records]
+
+
+def case_sort_by_priority(orders, drivers):
+    records = convert_orders_for_algorithm(orders)
+    return lambda: sort_orders_by_priority(records)
+
+
+def case_convert_for_algorithm(orders, drivers):
+    return lambda: convert_orders_for_algorithm(orders)
+
+
+def case_filter_duplicates(orders, drivers):
+    return lambda: filter_duplicate_orders(orders)
+
+
+def case_workload_hours(orders, drivers):
+    orders_for_algo = convert_orders_for_algorithm(orders)
+    custom_task_times = _custom_task_times()
+    return lambda: [
+        calculate_driver_workload_hours(d["id"], orders_for_algo, None, custom_task_times) for d in drivers
+    ]
+
+
+def case_workload_index(orders, drivers):
+    orders_for_algo = convert_orders_for_algorithm(orders)
+    custom_task_times = _custom_task_times()
+    return lambda: WorkloadIndex.build(orders_for_algo, custom_task_times)
+
+
+def case_order_batch(orders, drivers):
+    return lambda: OrderBatch.from_orders(orders)
+
+
+def case_workload_index_batch(orders, drivers):
+    batch = OrderBatch.from_orders(orders)
+    custom_task_times = _custom_task_times()
+    return lambda: WorkloadIndex.build(batch, custom_task_times)
+
+
+def case_suggest_best_driver(orders, drivers):
+    orders_for_algo = convert_orders_for_algorithm(orders)
+    custom_task_times = _custom_task_times()
+    workload_index = WorkloadIndex.build(orders_for_algo, custom_task_times)
+    driver_workload_hours = {d["id"]: workload_index.total_hours(d["id"]) for d in drivers}
+    pending = [o for o in orders_for_algo if not o.driver_id][:SUGGESTION_SAMPLE]
+    return lambda: [
+        suggest_best_driver(drivers, o, driver_workload_hours, orders_for_algo, custom_task_times, workload_index)
+        for o in pending
+    ]
+
+
+def case_plan_assignments(orders, drivers):
+    orders_for_algo = convert_orders_for_algorithm(orders)
+    custom_task_times = _custom_task_times()
+    workload_index = WorkloadIndex.build(orders_for_algo, custom_task_times)
+    pending = [o for o in orders_for_algo if not o.driver_id]
+    return lambda: plan_driver_assignments(drivers, pending, workload_index, custom_task_times)
+
+
+def case_capacity_plan(orders, drivers):
+    batch = OrderBatch.from_orders(orders)
+    custom_task_times = _custom_task_times()
+    return lambda: CapacityPlan.build(batch, custom_task_times)
+
+
+# Toewijzen en terugdraaien van een steekproef open orders, met suggesties na elke wijziging
+def case_planning_state_update(orders, drivers):
+    orders_for_algo = convert_orders_for_algorithm(orders)
+    custom_task_times = _custom_task_times()
+    state = PlanningState.build(drivers, orders_for_algo, custom_task_times)
+    state.suggestions()
+    pending = [o for o in orders if not o["driver_id"] and o["status"] != "completed"][:PLANNING_SAMPLE]
+    assigned = [dict(o, driver_id=drivers[i % len(drivers)]["id"], status="accepted") for i, o in enumerate(pending)]
+
+    def run():
+        for before, after in zip(pending, assigned):
+            state.upsert(after)
+            state.suggestions()
+            state.upsert(before)
+            state.suggestions()
+
+    return run
+
+
+# (naam, functie, hangt af van #chauffeurs)
+CASES = [
+    ("calculate_priority_score", case_priority_score, False),
+    ("sort_orders_by_priority", case_sort_by_priority, False),
+    ("convert_orders_for_algorithm", case_convert_for_algorithm, False),
+    ("filter_duplicate_orders", case_filter_duplicates, False),
+    ("calculate_driver_workload_hours", case_workload_hours, True),
+    ("WorkloadIndex.build", case_workload_index, False),
+    ("OrderBatch.from_orders", case_order_batch, False),
+    ("WorkloadIndex.build[batch]", case_workload_index_batch, False),
+    ("suggest_best_driver", case_suggest_best_driver, True),
+    ("plan_driver_assignments", case_plan_assignments, True),
+    ("PlanningState.upsert", case_planning_state_update, True),
+    ("CapacityPlan.build", case_capacity_plan, True),
+]
+
+
+def measure(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def run(order_sizes, driver_counts, repeat, only=None):
+    results = {}
+    for order_count in order_sizes:
+        for driver_count in driver_counts:
+            drivers = make_drivers(driver_count)
+            orders = make_orders(order_count, drivers)
+            for name, factory, uses_drivers in CASES:
+                if only and name not in only:
+                    continue
+                # Cases zonder chauffeurs-afhankelijkheid één keer per ordergrootte
+                if not uses_drivers and driver_count != driver_counts[0]:
+                    continue
+                key = f"{name}[orders={order_count},drivers={driver_count if uses_drivers else '-'}]"
+                seconds, peak_bytes = measure(factory(orders, drivers), repeat)
+                results[key] = {"seconds": seconds, "peak_bytes": peak_bytes}
+                print(f"{key:<75} {seconds * 1000:>10.2f} ms {peak_bytes / 1024:>10.0f} KiB", flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            print(f"Geen baseline voor {key}; draai met --update-baseline om ze toe te voegen.")
+            continue
+        slower = result["seconds"] - base["seconds"]
+        if result["seconds"] > base["seconds"] * (1 + tolerance) and slower > NOISE_FLOOR_SECONDS:
+            regressions.append(f"{key}: {base['seconds'] * 1000:.2f} ms -> {result['seconds'] * 1000:.2f} ms")
+        grown = result["peak_bytes"] - base["peak_bytes"]
+        if result["peak_bytes"] > base["peak_bytes"] * (1 + tolerance) and grown > NOISE_FLOOR_BYTES:
+            regressions.append(
+                f"{key}: {base['peak_bytes'] / 1024:.0f} KiB -> {result['peak_bytes'] / 1024:.0f} KiB"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks voor de AgriFlow planningsalgoritmes.")
+    parser.add_argument("--quick", action="store_true", help="Sla de 100k-orders cases over.")
+    parser.add_argument("--repeat", type=int, default=3, help="Herhalingen per case (beste tijd telt).")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Toegestane vertraging t.o.v. baseline.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Pad naar het baseline JSON-bestand.")
+    parser.add_argument("--update-baseline", action="store_true", help="Schrijf de resultaten als nieuwe baseline.")
+    parser.add_argument("--only", nargs="*", help="Enkel deze functies benchmarken.")
+    args = parser.parse_args(argv)
+
+    order_sizes = QUICK_ORDER_SIZES if args.quick else ORDER_SIZES
+    results = run(order_sizes, DRIVER_COUNTS, args.repeat, args.only)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline geschreven naar {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Geen baseline gevonden ({args.baseline}); draai eerst met --update-baseline.")
+        return 2
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nRegressies:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nGeen regressies t.o.v. baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
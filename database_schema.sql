@@ -57,6 +57,85 @@ CREATE TABLE IF NOT EXISTS "TaskTypes" (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE TABLE IF NOT EXISTS "OrderStatsMonthly" (
+    company_id INTEGER NOT NULL REFERENCES "Companies"(id) ON DELETE CASCADE,
+    task_type_id INTEGER NOT NULL REFERENCES "TaskTypes"(id) ON DELETE CASCADE,
+    month CHAR(7) NOT NULL,
+    weight_kg DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    order_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (company_id, task_type_id, month)
+);
+
+CREATE OR REPLACE FUNCTION increment_order_stats_monthly(
+    p_company_id INTEGER,
+    p_task_type_id INTEGER,
+    p_month TEXT,
+    p_weight_kg NUMERIC
+) RETURNS VOID AS $$
+    INSERT INTO "OrderStatsMonthly" (company_id, task_type_id, month, weight_kg, order_count)
+    VALUES (p_company_id, p_task_type_id, p_month, COALESCE(p_weight_kg, 0), 1)
+    ON CONFLICT (company_id, task_type_id, month) DO UPDATE
+    SET weight_kg = "OrderStatsMonthly".weight_kg + EXCLUDED.weight_kg,
+        order_count = "OrderStatsMonthly".order_count + 1;
+$$ LANGUAGE sql;
+
+-- Herbouw de rollup (voor één bedrijf of alles) in één transactie. De tabel-lock laat
+-- gelijktijdige increment_order_stats_monthly-aanroepen wachten tot de herbouw klaar is,
+-- zodat hun ophoging niet tussen DELETE en INSERT verloren gaat.
+CREATE OR REPLACE FUNCTION rebuild_order_stats_monthly(
+    p_company_id INTEGER DEFAULT NULL
+) RETURNS INTEGER AS $$
+DECLARE
+    row_count INTEGER;
+BEGIN
+    LOCK TABLE "OrderStatsMonthly" IN EXCLUSIVE MODE;
+    DELETE FROM "OrderStatsMonthly" WHERE p_company_id IS NULL OR company_id = p_company_id;
+    INSERT INTO "OrderStatsMonthly" (company_id, task_type_id, month, weight_kg, order_count)
+    SELECT t.company_id,
+           o.task_type_id,
+           COALESCE(to_char(o.created_at AT TIME ZONE 'UTC', 'YYYY-MM'), to_char(o.deadline, 'YYYY-MM')) AS month,
+           COALESCE(SUM(o."Weight"), 0),
+           COUNT(*)
+    FROM "Orders" o
+    JOIN "TaskTypes" t ON t.id = o.task_type_id
+    WHERE o.status = 'completed'
+      AND (o.created_at IS NOT NULL OR o.deadline IS NOT NULL)
+      AND (p_company_id IS NULL OR t.company_id = p_company_id)
+    GROUP BY 1, 2, 3;
+    GET DIAGNOSTICS row_count = ROW_COUNT;
+    RETURN row_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Wijs orders in bulk toe ([{"order_id", "driver_id"}]) in één statement. Enkel orders en
+-- chauffeurs van p_company_id, nooit voltooide orders, en met p_only_unassigned enkel
+-- orders die nog pending zijn zonder chauffeur. Geeft de effectief gewijzigde orders terug.
+CREATE OR REPLACE FUNCTION assign_orders(
+    p_company_id INTEGER,
+    p_assignments JSONB,
+    p_only_unassigned BOOLEAN DEFAULT FALSE
+) RETURNS TABLE (order_id INTEGER, driver_id INTEGER, previous_driver_id INTEGER) AS $$
+    WITH requested AS (
+        SELECT r.order_id AS requested_order_id, r.driver_id AS requested_driver_id
+        FROM jsonb_to_recordset(p_assignments) AS r(order_id INTEGER, driver_id INTEGER)
+    ),
+    target AS (
+        SELECT o.id AS target_id, requested.requested_driver_id, o.driver_id AS old_driver_id
+        FROM "Orders" o
+        JOIN requested ON requested.requested_order_id = o.id
+        JOIN "TaskTypes" t ON t.id = o.task_type_id AND t.company_id = p_company_id
+        JOIN "Drivers" d ON d.id = requested.requested_driver_id AND d.company_id = p_company_id
+        WHERE o.status <> 'completed'
+          AND (NOT p_only_unassigned OR (o.driver_id IS NULL AND o.status = 'pending'))
+        FOR UPDATE OF o
+    )
+    UPDATE "Orders" o
+    SET driver_id = target.requested_driver_id, status = 'accepted'
+    FROM target
+    WHERE o.id = target.target_id
+    RETURNING o.id, o.driver_id, target.old_driver_id;
+$$ LANGUAGE sql;
+
 CREATE INDEX IF NOT EXISTS idx_client_emailaddress ON "Client"(emailaddress);
 CREATE INDEX IF NOT EXISTS idx_companies_emailaddress ON "Companies"(emailaddress);
 CREATE INDEX IF NOT EXISTS idx_drivers_email_address ON "Drivers"(email_address);
@@ -67,6 +146,7 @@ CREATE INDEX IF NOT EXISTS idx_orders_task_type_id ON "Orders"(task_type_id);
 CREATE INDEX IF NOT EXISTS idx_orders_driver_id ON "Orders"(driver_id);
 CREATE INDEX IF NOT EXISTS idx_orders_status ON "Orders"(status);
 CREATE INDEX IF NOT EXISTS idx_orders_deadline ON "Orders"(deadline);
+CREATE INDEX IF NOT EXISTS idx_orders_created_at ON "Orders"(created_at);
 CREATE INDEX IF NOT EXISTS idx_tasktypes_company_id ON "TaskTypes"(company_id);
 
 
@@ -76,6 +156,7 @@ COMMENT ON TABLE "Drivers" IS 'Stores driver (chauffeur) information linked to c
 COMMENT ON TABLE "Address" IS 'Stores customer addresses';
 COMMENT ON TABLE "Orders" IS 'Stores customer orders/bookings with status tracking';
 COMMENT ON TABLE "TaskTypes" IS 'Stores task types per company with time per 1000kg';
+COMMENT ON TABLE "OrderStatsMonthly" IS 'Rollup of completed order tonnage per company, task type and month';
 
 
 COMMENT ON COLUMN "Orders".status IS 'Order status: pending, accepted, or completed';
@@ -86,4 +167,6 @@ COMMENT ON COLUMN "Drivers".company_id IS 'Foreign key to Companies table, nulla
 COMMENT ON COLUMN "TaskTypes".task_type IS 'Name of the task type (e.g., ploegen, pletten)';
 COMMENT ON COLUMN "TaskTypes".company_id IS 'Foreign key to Companies table';
 COMMENT ON COLUMN "TaskTypes".time_per_1000kg IS 'Time in hours needed per 1000kg for this task type';
+COMMENT ON COLUMN "OrderStatsMonthly".month IS 'Month (YYYY-MM, UTC) of the order created_at, or deadline when missing';
+COMMENT ON COLUMN "OrderStatsMonthly".weight_kg IS 'Summed weight in kg of completed orders';
 
@@ -0,0 +1,16 @@
+# Gunicorn laadt dit bestand automatisch (gunicorn run:app).
+# De live updates (Server-Sent Events) houden een verbinding open: met sync-workers
+# zou elk open dashboard een volledige worker bezetten. Met gthread houdt een stream
+# één thread bezet; boven SSE_MAX_STREAMS per proces valt de app terug op polling.
+import os
+
+# Meerdere workers: dataversies van de cache en live events delen via SQLite-bestanden
+# in de instance-map (zie app/config.py); wordt gelezen vóór de app geladen wordt
+os.environ.setdefault("DATA_VERSIONS_BACKEND", "sqlite")
+os.environ.setdefault("EVENTS_BACKEND", "sqlite")
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5001')}")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+timeout = 120
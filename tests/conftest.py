@@ -0,0 +1,125 @@
+import os
+from datetime import date, timedelta
+
+import pytest
+
+# De app leest de backend bij import uit de omgeving: lokale SQLite in het geheugen
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = ":memory:"
+os.environ.setdefault("SESSION_BACKEND", "cookie")
+os.environ.setdefault("DATA_VERSIONS_BACKEND", "memory")
+os.environ.setdefault("EVENTS_BACKEND", "memory")
+
+from app import create_app  # noqa: E402
+from app.cache import fragment_cache, planning_cache, reference_cache  # noqa: E402
+from app.instrumentation import query_budget as _query_budget, unwrap_client  # noqa: E402
+
+# Tabellen in de volgorde waarin ze leeggemaakt kunnen worden (foreign keys)
+TABLES = ("OrderStatsMonthly", "Orders", "Address", "TaskTypes", "Drivers", "Client", "Companies")
+
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+    app.config.update(TESTING=True, QUERY_GUARD="raise")
+    return app
+
+
+# De SQLite-client achter de (geïnstrumenteerde) supabase-client, leeg per test
+@pytest.fixture
+def db(app):
+    from app import config
+
+    client = unwrap_client(config.supabase)
+    with client.lock:
+        for table in TABLES:
+            client.connection.execute(f'DELETE FROM "{table}"')
+        client.connection.commit()
+    for cache in (reference_cache, fragment_cache, planning_cache):
+        cache.clear()
+    return client
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
+
+
+# Querybudget per request, bv.:
+#     with query_budget("routes.company_dashboard"):
+#         client.get("/company/dashboard")
+# Zonder getal geldt het budget uit QUERY_BUDGETS; herhaalde filtervormen
+# boven QUERY_GUARD_THRESHOLD laten de test ook falen.
+@pytest.fixture
+def query_budget(app):
+    from app.instrumentation import QUERY_BUDGETS
+
+    def budget(endpoint_or_max, max_per_shape=None):
+        if isinstance(endpoint_or_max, str):
+            endpoint_or_max = QUERY_BUDGETS[endpoint_or_max]
+        return _query_budget(endpoint_or_max, max_per_shape)
+
+    return budget
+
+
+def insert(db, table, values):
+    return db.table(table).insert(values).execute().data[0]
+
+
+# Log in en volg de redirect, zodat de flash-melding al getoond is (anders rendert
+# de volgende pagina live in plaats van uit de dashboardcache)
+def login(client, email):
+    response = client.post("/login", data={"username": email}, follow_redirects=True)
+    assert response.status_code == 200
+    assert "Succesvol ingelogd." in response.get_data(as_text=True)
+
+
+# Eén bedrijf met taaktypes en chauffeurs, één klant met adres en een reeks orders
+@pytest.fixture
+def farm(db):
+    company = insert(db, "Companies", {"name": "Loonwerk Test", "emailaddress": "bedrijf@test.local"})
+    task_types = [
+        insert(db, "TaskTypes", {"task_type": name, "company_id": company["id"], "time_per_1000kg": hours})
+        for name, hours in (("oogsten", 1.5), ("ploegen", 0.5), ("zaaien", 1.0))
+    ]
+    drivers = [
+        insert(
+            db,
+            "Drivers",
+            {"email_address": f"chauffeur{i}@test.local", "name": f"Chauffeur {i}", "company_id": company["id"]},
+        )
+        for i in range(3)
+    ]
+    customer = insert(db, "Client", {"emailaddress": "klant@test.local", "Name": "Jan", "Lastname": "Boer"})
+    address = insert(
+        db,
+        "Address",
+        {"client_id": customer["id"], "street_name": "Veldstraat", "house_number": "1", "city": "Gent"},
+    )
+    today = date.today()
+    orders = []
+    for i in range(30):
+        status = ("pending", "accepted", "completed")[i % 3]
+        orders.append(
+            insert(
+                db,
+                "Orders",
+                {
+                    "deadline": (today + timedelta(days=i % 10)).isoformat(),
+                    "task_type_id": task_types[i % len(task_types)]["id"],
+                    "product_type": "graan",
+                    "Weight": 1000 + 100 * i,
+                    "address_id": address["id"],
+                    "driver_id": drivers[i % len(drivers)]["id"] if status != "pending" else None,
+                    "status": status,
+                },
+            )
+        )
+    return {
+        "company": company,
+        "task_types": task_types,
+        "drivers": drivers,
+        "customer": customer,
+        "address": address,
+        "orders": orders,
+    }
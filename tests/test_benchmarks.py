@@ -0,0 +1,19 @@
+from benchmarks import bench_planning
+
+
+# Elke case op kleine schaal, zodat de generatoren en cases blijven werken
+def test_every_case_runs_at_small_size():
+    results = bench_planning.run([100], [5], repeat=1)
+    names = {key.split("[orders=")[0] for key in results}
+    assert names == {name for name, _, _ in bench_planning.CASES}
+    assert bench_planning.compare(results, results, tolerance=0.25) == []
+
+
+def test_regression_and_missing_baseline_fail(tmp_path, capsys):
+    baseline = {"case[orders=100,drivers=5]": {"seconds": 0.01, "peak_bytes": 1024}}
+    slower = {"case[orders=100,drivers=5]": {"seconds": 0.5, "peak_bytes": 1024}}
+    assert len(bench_planning.compare(slower, baseline, tolerance=0.25)) == 1
+
+    missing = str(tmp_path / "baselines.json")
+    assert bench_planning.main(["--quick", "--repeat", "1", "--only", "OrderBatch.from_orders", "--baseline", missing]) == 2
+    assert "Geen baseline gevonden" in capsys.readouterr().out
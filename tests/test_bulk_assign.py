@@ -0,0 +1,69 @@
+from app.routes import company as company_routes
+
+from conftest import login
+
+
+def _order(db, order_id):
+    rows = db.table("Orders").select("*").eq("id", order_id).execute().data
+    return rows[0] if rows else None
+
+
+def test_assigns_only_driver_and_status(client, db, farm, query_budget):
+    login(client, "bedrijf@test.local")
+    pending = [o for o in farm["orders"] if o["status"] == "pending"][:3]
+    driver_id = farm["drivers"][0]["id"]
+
+    with query_budget("routes.company_assign_drivers"):
+        response = client.post(
+            "/company/assign-drivers",
+            json={"assignments": [{"order_id": o["id"], "driver_id": driver_id} for o in pending]},
+        )
+    body = response.get_json()
+    assert (body["assigned"], body["skipped"], body["failed"]) == (3, 0, 0)
+    for original in pending:
+        row = _order(db, original["id"])
+        assert (row["driver_id"], row["status"]) == (driver_id, "accepted")
+        assert (row["Weight"], row["deadline"], row["address_id"]) == (
+            original["Weight"],
+            original["deadline"],
+            original["address_id"],
+        )
+
+
+# Een order die tussen de controle en de update geannuleerd wordt, komt niet terug
+def test_order_cancelled_meanwhile_is_skipped(client, db, farm, monkeypatch):
+    login(client, "bedrijf@test.local")
+    cancelled, kept = [o for o in farm["orders"] if o["status"] == "pending"][:2]
+    driver_id = farm["drivers"][1]["id"]
+    fetch_concurrently = company_routes.fetch_concurrently
+
+    def fetch_then_cancel(**loaders):
+        results = fetch_concurrently(**loaders)
+        db.table("Orders").delete().eq("id", cancelled["id"]).execute()
+        return results
+
+    monkeypatch.setattr(company_routes, "fetch_concurrently", fetch_then_cancel)
+    body = client.post(
+        "/company/assign-drivers",
+        json={"assignments": [{"order_id": o["id"], "driver_id": driver_id} for o in (cancelled, kept)]},
+    ).get_json()
+
+    assert _order(db, cancelled["id"]) is None
+    assert _order(db, kept["id"])["driver_id"] == driver_id
+    results = {r["order_id"]: r for r in body["results"]}
+    assert results[cancelled["id"]]["skipped"] and not results[cancelled["id"]]["ok"]
+    assert results[kept["id"]]["ok"]
+
+
+def test_accept_suggestions_leaves_assigned_orders_alone(client, db, farm):
+    login(client, "bedrijf@test.local")
+    accepted = {o["id"]: o["driver_id"] for o in farm["orders"] if o["status"] == "accepted"}
+
+    body = client.post("/company/assign-drivers", json={"accept_suggestions": True}).get_json()
+
+    assert body["assigned"] == sum(1 for o in farm["orders"] if o["status"] == "pending")
+    for order_id, driver_id in accepted.items():
+        assert _order(db, order_id)["driver_id"] == driver_id
+    for order in farm["orders"]:
+        if order["status"] == "completed":
+            assert _order(db, order["id"])["status"] == "completed"
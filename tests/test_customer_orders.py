@@ -0,0 +1,30 @@
+import re
+
+from app.cache import fragment_cache
+
+from conftest import login
+
+
+# Het aantal round-trips per pagina hangt niet af van het aantal orders op de pagina
+def test_customer_orders_round_trips_per_page(client, farm, query_budget):
+    login(client, "klant@test.local")
+
+    counts = {}
+    for page_size in (5, 30):
+        fragment_cache.clear()
+        with query_budget("routes.customer_orders", max_per_shape=1) as requests:
+            response = client.get(f"/customer/orders?page_size={page_size}")
+        assert response.status_code == 200
+        counts[page_size] = requests[0].query_count
+    assert counts[5] == counts[30]
+
+
+def test_customer_orders_next_page_within_budget(client, farm, query_budget):
+    login(client, "klant@test.local")
+    first = client.get("/customer/orders?page_size=10").get_data(as_text=True)
+    cursor = re.search(r"cursor=([\w-]+)", first)
+    assert cursor, "eerste pagina zonder cursor naar de volgende"
+
+    with query_budget("routes.customer_orders", max_per_shape=1):
+        response = client.get(f"/customer/orders?page_size=10&cursor={cursor.group(1)}")
+    assert response.status_code == 200
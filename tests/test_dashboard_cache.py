@@ -0,0 +1,63 @@
+from app.cache import DataVersions
+from app.routes.routes import invalidate_task_types
+
+from conftest import login
+
+
+def test_versions_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / "versions.db")
+    worker_a, worker_b = DataVersions(), DataVersions()
+    worker_a.use_sqlite(path)
+    worker_b.use_sqlite(path)
+
+    assert worker_b.get("driver", 7) == 0
+    worker_a.bump("driver", 7, None)
+    assert worker_b.get("driver", 7) == 1
+    assert worker_b.get("driver", 8) == 0
+    assert worker_b.get_many("driver", [7, 8]) == {7: 1, 8: 0}
+
+
+# Een gewijzigde taaktijd moet ook de gecachte chauffeurs- en klantdashboards vernieuwen
+def test_task_type_change_refreshes_driver_and_customer_dashboards(app, client, db, farm):
+    order = next(o for o in farm["orders"] if o["status"] == "accepted")
+    task_type = next(t for t in farm["task_types"] if t["id"] == order["task_type_id"])
+    driver = next(d for d in farm["drivers"] if d["id"] == order["driver_id"])
+
+    login(client, driver["email_address"])
+    driver_before = client.get("/driver/dashboard").get_data(as_text=True)
+    login(client, "klant@test.local")
+    customer_before = client.get("/customer/orders").get_data(as_text=True)
+
+    db.table("TaskTypes").update({"time_per_1000kg": 9.75, "task_type": "dorsen"}).eq("id", task_type["id"]).execute()
+    with app.app_context():
+        invalidate_task_types(farm["company"]["id"], task_type["id"])
+
+    login(client, driver["email_address"])
+    assert client.get("/driver/dashboard").get_data(as_text=True) != driver_before
+    login(client, "klant@test.local")
+    customer_after = client.get("/customer/orders").get_data(as_text=True)
+    assert customer_after != customer_before
+    assert "dorsen" in customer_after
+
+
+# Een taaktypewijziging verhoogt enkel versies: geen scan van de orders op het schrijfpad
+def test_task_type_change_runs_no_queries(app, farm):
+    from flask import g
+
+    with app.test_request_context("/zonder-budget"):
+        app.preprocess_request()
+        invalidate_task_types(farm["company"]["id"], farm["task_types"][0]["id"])
+        assert g.query_stats.query_count == 0
+
+
+# De gedeelde bestanden komen zonder pad in de instance-map, niet in de werkmap
+def test_shared_files_default_to_the_instance_folder(tmp_path):
+    from flask import Flask
+
+    from app import instance_file
+
+    app = Flask("agriflow_test", instance_path=str(tmp_path / "instance"))
+    assert instance_file(app, "DATA_VERSIONS_PATH", "data_versions.db") == str(tmp_path / "instance" / "data_versions.db")
+    assert (tmp_path / "instance").is_dir()
+    app.config["DATA_VERSIONS_PATH"] = "/srv/agriflow/versions.db"
+    assert instance_file(app, "DATA_VERSIONS_PATH", "data_versions.db") == "/srv/agriflow/versions.db"
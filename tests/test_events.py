@@ -0,0 +1,59 @@
+from app.events import SQLiteEventBus, get_event_bus
+from app.routes import routes
+
+from conftest import login
+
+
+def test_shared_bus_delivers_across_processes(tmp_path):
+    path = str(tmp_path / "events.db")
+    worker_a = SQLiteEventBus(path, poll_interval=0.01)
+    worker_b = SQLiteEventBus(path, poll_interval=0.01)
+
+    subscription = worker_b.subscribe(("company", 1))
+    published = worker_a.publish(("company", 1), "order.assigned", {"order_id": 5})
+    worker_a.publish(("company", 2), "order.assigned", {"order_id": 6})
+
+    event = subscription.get(timeout=1)
+    assert (event["id"], event["data"]) == (published["id"], {"order_id": 5})
+    assert subscription.get(timeout=0.05) is None
+
+    # Herverbinden bij een andere worker met Last-Event-ID levert de gemiste events
+    replay = worker_a.subscribe(("company", 1), last_event_id=published["id"] - 1)
+    assert replay.get(timeout=0)["id"] == published["id"]
+
+
+# Een sync-worker (zoals de testclient) houdt geen stream open: meteen antwoorden en pollen
+def test_sync_worker_polls_instead_of_streaming(client, farm):
+    login(client, "bedrijf@test.local")
+    company_id = farm["company"]["id"]
+    event = get_event_bus().publish(("company", company_id), "order.created", {"order_id": 1})
+
+    response = client.get("/company/events", headers={"Last-Event-ID": str(event["id"] - 1)})
+    body = response.get_data(as_text=True)
+    assert body.startswith("retry: 5000\n")
+    assert f"id: {event['id']}\nevent: order.created\n" in body
+
+    body = client.get("/company/events", headers={"Last-Event-ID": str(event["id"])}).get_data(as_text=True)
+    assert body == f"retry: 5000\nid: {event['id']}\n\n"
+
+
+def test_stream_limit_falls_back_to_polling(app, client, farm):
+    login(client, "bedrijf@test.local")
+    max_streams = app.config["SSE_MAX_STREAMS"]
+    app.config["SSE_MAX_STREAMS"] = 0
+    try:
+        response = client.get("/company/events", environ_overrides={"wsgi.multithread": True})
+        assert response.get_data(as_text=True).startswith("retry: 5000\n")
+    finally:
+        app.config["SSE_MAX_STREAMS"] = max_streams
+
+
+def test_threaded_worker_streams(client, farm):
+    login(client, "bedrijf@test.local")
+    response = client.get("/company/events", environ_overrides={"wsgi.multithread": True}, buffered=False)
+    try:
+        first = next(iter(response.response))
+        assert first.decode().startswith("retry: 3000\nid: ")
+    finally:
+        response.close()
+    assert routes._open_streams == 0
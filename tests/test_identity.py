@@ -0,0 +1,32 @@
+from app.instrumentation import query_budget
+
+
+def _identity_queries(requests):
+    return sum(
+        1
+        for stats in requests
+        for record in stats.records
+        if record.table in ("Client", "Companies", "Drivers")
+    )
+
+
+# Een sessie zonder gevonden gebruiker zoekt de identiteit maar één keer op
+def test_missing_identity_is_resolved_once(client, farm):
+    with client.session_transaction() as session:
+        session["email"] = "onbekend@test.local"
+        session["user_type"] = "driver"
+
+    with query_budget(10) as first:
+        client.get("/")
+    with query_budget(10) as second:
+        client.get("/")
+
+    assert _identity_queries(first) == 3
+    assert _identity_queries(second) == 0
+
+
+def test_login_resolves_identity_once(client, farm):
+    client.post("/login", data={"username": "chauffeur0@test.local"})
+    with query_budget(10) as requests:
+        client.get("/")
+    assert _identity_queries(requests) == 0
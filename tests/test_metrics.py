@@ -0,0 +1,21 @@
+import pytest
+
+
+@pytest.fixture
+def metrics_token(app):
+    app.config["METRICS_TOKEN"] = "geheim"
+    yield "geheim"
+    app.config["METRICS_TOKEN"] = ""
+
+
+def test_metrics_disabled_without_token(client):
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_requires_token(client, metrics_token):
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer fout"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": f"Bearer {metrics_token}"})
+    assert response.status_code == 200
+    assert "agriflow_requests_total" in response.get_data(as_text=True)
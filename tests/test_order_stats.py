@@ -0,0 +1,39 @@
+from app.routes.routes import rebuild_order_stats
+
+from conftest import login
+
+
+def _rollup(db, company_id):
+    rows = db.table("OrderStatsMonthly").select("*").eq("company_id", company_id).execute().data
+    return {(r["task_type_id"], r["month"]): (float(r["weight_kg"]), r["order_count"]) for r in rows}
+
+
+# Een dubbele submit mag de tonnage maar één keer meetellen
+def test_double_complete_counts_once(client, db, farm):
+    company_id = farm["company"]["id"]
+    rebuild_order_stats(company_id)
+    before = sum(count for _, count in _rollup(db, company_id).values())
+    order = next(o for o in farm["orders"] if o["status"] == "accepted")
+    driver = next(d for d in farm["drivers"] if d["id"] == order["driver_id"])
+
+    login(client, driver["email_address"])
+    for _ in range(2):
+        assert client.post(f"/driver/complete-order/{order['id']}").status_code == 302
+
+    after = sum(count for _, count in _rollup(db, company_id).values())
+    assert after == before + 1
+
+
+def test_rebuild_matches_incremental_rollup(client, db, farm):
+    company_id = farm["company"]["id"]
+    rebuild_order_stats(company_id)
+    for order in farm["orders"]:
+        if order["status"] != "accepted":
+            continue
+        driver = next(d for d in farm["drivers"] if d["id"] == order["driver_id"])
+        login(client, driver["email_address"])
+        client.post(f"/driver/complete-order/{order['id']}")
+    incremental = _rollup(db, company_id)
+
+    rebuild_order_stats(company_id)
+    assert _rollup(db, company_id) == incremental
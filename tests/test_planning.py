@@ -0,0 +1,154 @@
+import random
+from datetime import date, timedelta
+
+from app.algorithms import CapacityPlan, PlanningState, plan_driver_assignments
+from app.cache import data_versions, planning_cache
+from app.routes.routes import get_planning_state
+
+from conftest import insert, login
+
+
+def _drivers(count):
+    return [{"id": i + 1, "name": f"Chauffeur {i + 1}"} for i in range(count)]
+
+
+def _random_order(rng, order_id, drivers, today):
+    status = rng.choice(("pending", "pending", "accepted", "completed"))
+    deadline = rng.choice([None] + [(today + timedelta(days=d)).isoformat() for d in range(-2, 12)])
+    return {
+        "id": order_id,
+        "driver_id": rng.choice(drivers)["id"] if status != "pending" else None,
+        "status": status,
+        "deadline": deadline,
+        "task_type_id": rng.choice((1, 2, 3)),
+        "Weight": rng.randint(500, 9000),
+        "created_at": f"{today - timedelta(days=rng.randint(0, 9))}T08:00:00+00:00",
+    }
+
+
+# Na elke reeks incrementele wijzigingen moet de state gelijk zijn aan een volledige herberekening
+def test_incremental_updates_match_full_recompute():
+    rng = random.Random(7)
+    today = date.today()
+    drivers = _drivers(4)
+    custom_task_times = {1: 1.5, 2: 0.5, 3: 1.0}
+    orders = {order_id: _random_order(rng, order_id, drivers, today) for order_id in range(1, 61)}
+    state = PlanningState.build(drivers, list(orders.values()), custom_task_times)
+    assert state.check_consistency() == []
+
+    for step in range(200):
+        order_id = rng.randint(1, 80)
+        if rng.random() < 0.15:
+            state.remove(order_id)
+            orders.pop(order_id, None)
+        else:
+            orders[order_id] = _random_order(rng, order_id, drivers, today)
+            state.upsert(orders[order_id])
+        if step % 20 == 0:
+            assert state.check_consistency() == []
+    assert state.check_consistency() == []
+
+    rebuilt = PlanningState.build(drivers, list(orders.values()), custom_task_times, now=state.now)
+    assert rebuilt.suggestions() == state.suggestions()
+
+
+def test_order_is_planned_for_the_company_of_its_task_type(app, client, db, farm):
+    company_id = farm["company"]["id"]
+    other = insert(db, "Companies", {"name": "Ander Loonwerk", "emailaddress": "ander@test.local"})
+    with app.test_request_context():
+        state = get_planning_state(company_id)
+        other_state = get_planning_state(other["id"])
+    open_before = len(state)
+
+    login(client, "klant@test.local")
+    form = {
+        "address_id": farm["address"]["id"],
+        "task_type": farm["task_types"][0]["id"],
+        "deadline": (date.today() + timedelta(days=3)).isoformat(),
+        "product_type": "graan",
+        "weight": "2500",
+    }
+    # Taaktype van het ene bedrijf met het andere bedrijf in het formulier: geweigerd
+    response = client.post("/order", data={**form, "company_id": other["id"]})
+    assert "Ongeldig taaktype geselecteerd." in response.get_data(as_text=True)
+
+    assert client.post("/order", data={**form, "company_id": company_id}).status_code == 302
+    assert len(state) == open_before + 1
+    assert len(other_state) == 0
+    assert state.check_consistency() == []
+    with app.test_request_context():
+        assert get_planning_state(company_id) is state
+
+
+# Een schrijfactie in een andere worker verhoogt de gedeelde planningversie;
+# de kopie van deze worker is dan verouderd en wordt herbouwd
+def test_planning_written_by_another_worker_is_rebuilt(app, db, farm):
+    company_id = farm["company"]["id"]
+    with app.test_request_context():
+        state = get_planning_state(company_id)
+        assert get_planning_state(company_id) is state
+
+        order = next(o for o in farm["orders"] if o["status"] == "pending")
+        db.table("Orders").update({"status": "completed"}).eq("id", order["id"]).execute()
+        data_versions.bump("planning", company_id)
+
+        rebuilt = get_planning_state(company_id)
+    assert rebuilt is not state
+    assert rebuilt.priority_score(order["id"]) is None
+    assert planning_cache.get("Planning", company_id) is rebuilt
+
+
+# Een volle deadline-dag is geen reden om te weigeren als er vroeger nog tijd is
+def test_full_deadline_day_uses_earlier_capacity():
+    today = date.today()
+    deadline = (today + timedelta(days=2)).isoformat()
+    drivers = _drivers(1)
+    state = PlanningState.build(
+        drivers,
+        [
+            {"id": 1, "driver_id": 1, "status": "accepted", "deadline": deadline, "Weight": 11250},
+            {"id": 2, "driver_id": None, "status": "pending", "deadline": deadline, "Weight": 3000},
+            {"id": 3, "driver_id": None, "status": "pending", "deadline": deadline, "Weight": 3000},
+        ],
+    )
+    suggestions = state.suggestions()
+    assert {order_id: s["driver_id"] for order_id, s in suggestions.items()} == {2: 1, 3: 1}
+    # 36u tot de deadline, 12u bezet, twee keer 3,75u gepland
+    assert state.capacity.available_hours_until(1, date.fromisoformat(deadline)) == 24.0
+    assert min(s["available_hours"] for s in suggestions.values()) == 20.25
+    assert state.check_consistency() == []
+
+    # Zonder meerdaagse capaciteit past geen van beide op de volle dag
+    assert plan_driver_assignments(drivers, list(state._open.values()), state.workload, now=state.now) == {}
+
+
+# Orders zonder id (nog niet opgeslagen) met dezelfde deadline mogen het sorteren niet breken
+def test_capacity_plan_with_orders_without_id():
+    deadline = (date.today() + timedelta(days=1)).isoformat()
+    orders = [
+        {"driver_id": 1, "status": "accepted", "deadline": deadline, "Weight": 2000},
+        {"id": 5, "driver_id": 1, "status": "accepted", "deadline": deadline, "Weight": 2000},
+        {"driver_id": 1, "status": "accepted", "deadline": deadline, "Weight": 30000},
+    ]
+    plan = CapacityPlan.build(orders)
+    assert plan.late_orders(1) == [None]
+    assert plan.late_hours(1) == 30.75 + 2 * 2.75 - 24.0
+
+
+# Een toewijzing plant enkel die chauffeur opnieuw in; de dagen ervoor blijven staan
+def test_assignment_replans_from_first_changed_day():
+    today = date.today()
+    drivers = _drivers(2)
+    orders = [
+        {"id": i, "driver_id": None, "status": "pending", "deadline": (today + timedelta(days=i % 6)).isoformat(), "Weight": 4000}
+        for i in range(1, 25)
+    ]
+    state = PlanningState.build(drivers, orders)
+    state.suggestions()
+
+    late = next(o for o in orders if o["deadline"] == (today + timedelta(days=5)).isoformat())
+    state.upsert({**late, "driver_id": 2, "status": "accepted"})
+    capacity = state.capacity
+    assert capacity.available_hours_until(2, today + timedelta(days=5)) == 6 * 12.0 - 4.75
+    assert state._dirty_from > (today + timedelta(days=1)).toordinal()
+    assert state.check_consistency() == []
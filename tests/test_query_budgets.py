@@ -0,0 +1,93 @@
+import pytest
+
+from app.instrumentation import (
+    InstrumentedClient,
+    QueryBudgetExceeded,
+    QueryRecord,
+    RequestQueryStats,
+    check_query_budget,
+)
+
+from conftest import login
+
+
+def test_company_dashboard_within_budget(client, farm, query_budget):
+    login(client, "bedrijf@test.local")
+    with query_budget("routes.company_dashboard") as requests:
+        response = client.get("/company/dashboard")
+    assert response.status_code == 200
+    assert [stats.endpoint for stats in requests] == ["routes.company_dashboard"]
+    assert requests[0].query_count > 0
+
+
+def test_driver_dashboard_within_budget(client, farm, query_budget):
+    login(client, "chauffeur0@test.local")
+    with query_budget("routes.driver_dashboard"):
+        response = client.get("/driver/dashboard")
+    assert response.status_code == 200
+
+
+def test_order_page_within_budget(client, farm, query_budget):
+    login(client, "klant@test.local")
+    with query_budget("routes.order"):
+        response = client.get("/order")
+    assert response.status_code == 200
+
+
+def test_order_post_within_budget(client, farm, query_budget):
+    login(client, "klant@test.local")
+    task_type = farm["task_types"][0]
+    with query_budget("routes.order"):
+        response = client.post(
+            "/order",
+            data={
+                "company_id": farm["company"]["id"],
+                "task_type": task_type["id"],
+                "address_id": farm["address"]["id"],
+                "deadline": "2030-01-01",
+                "product_type": "graan",
+                "weight": "2500",
+            },
+        )
+    assert response.status_code == 302
+
+
+def test_repeated_query_shape_fails_after_the_request():
+    stats = RequestQueryStats("routes.example", guard_mode="raise", guard_threshold=2)
+    for _ in range(3):
+        stats.add(QueryRecord("Orders", "select", (("eq", "id"),), 0.0))
+    with pytest.raises(QueryBudgetExceeded, match="N\\+1"):
+        check_query_budget(stats)
+
+
+# Een N+1 in een route die fouten opvangt (except Exception) moet toch de request laten falen
+def test_swallowed_n_plus_one_still_fails(app, farm):
+    from flask import Response
+
+    from app.config import supabase
+
+    # Onbekend endpoint: geen totaalbudget, enkel de controle per filtervorm
+    with app.test_request_context("/zonder-budget"):
+        app.preprocess_request()
+        for order in farm["orders"]:
+            try:
+                supabase.table("Orders").select("id").eq("id", order["id"]).execute()
+            except Exception:
+                pass
+        with pytest.raises(QueryBudgetExceeded, match="N\\+1"):
+            app.process_response(Response("ok"))
+
+
+def test_company_home_within_budget(client, farm, query_budget):
+    login(client, "bedrijf@test.local")
+    with query_budget("routes.home"):
+        response = client.get("/")
+    assert response.status_code == 200
+    assert "Loonwerk Test" in response.get_data(as_text=True)
+
+
+# De client is ingepakt waar hij gemaakt wordt: de importvolgorde van de routes speelt geen rol
+def test_routes_use_the_instrumented_client():
+    from app.routes import routes
+
+    assert isinstance(routes.supabase, InstrumentedClient)
@@ -0,0 +1,86 @@
+from app.cache import TTLCache, data_versions
+from app.routes.routes import (
+    get_companies_list,
+    get_drivers_for_company,
+    get_task_type_company_id,
+    get_task_types_for_companies,
+    get_task_types_for_company,
+)
+
+from conftest import insert
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_the_ttl_of_their_table():
+    clock = FakeClock()
+    cache = TTLCache({"TaskTypes": 300.0}, default_ttl=60.0, clock=clock)
+    cache.set("TaskTypes", 1, "oogsten")
+    cache.set("Other", 1, "x")
+
+    clock.now += 60.0
+    assert cache.get("Other", 1) is None
+    assert cache.get("TaskTypes", 1) == "oogsten"
+    clock.now += 240.0
+    assert cache.get("TaskTypes", 1) is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2)
+    cache.set("TaskTypes", 1, "a")
+    cache.set("TaskTypes", 2, "b")
+    assert cache.get("TaskTypes", 1) == "a"
+    cache.set("TaskTypes", 3, "c")
+
+    assert cache.get("TaskTypes", 2) is None
+    assert cache.get("TaskTypes", 1) == "a"
+    assert cache.get("TaskTypes", 3) == "c"
+
+
+def test_none_is_not_cached():
+    cache = TTLCache()
+    calls = []
+
+    def load():
+        calls.append(1)
+        return None
+
+    assert cache.get_or_load("TaskTypes", 1, load) is None
+    assert cache.get_or_load("TaskTypes", 1, load) is None
+    assert len(calls) == 2
+
+
+# Een andere worker schrijft en verhoogt enkel de gedeelde versie: de kopie
+# in deze worker mag dan niet meer gebruikt worden
+def test_write_in_another_worker_replaces_cached_reference_data(app, db, farm):
+    company_id = farm["company"]["id"]
+    task_type = insert(db, "TaskTypes", {"task_type": "maaien", "company_id": company_id, "time_per_1000kg": 0.75})
+    with app.app_context():
+        assert len(get_task_types_for_company(company_id)) == 4
+        assert len(get_drivers_for_company(company_id)) == 3
+        assert get_task_type_company_id(task_type["id"]) == company_id
+        assert [c["id"] for c in get_companies_list()] == [company_id]
+
+        db.table("TaskTypes").delete().eq("id", task_type["id"]).execute()
+        insert(db, "Drivers", {"email_address": "nieuw@test.local", "name": "Nieuw", "company_id": company_id})
+        other = insert(db, "Companies", {"name": "Ander Loonwerk", "emailaddress": "ander@test.local"})
+        # Zonder versieverhoging blijft de gecachte kopie staan
+        assert len(get_task_types_for_company(company_id)) == 4
+
+        data_versions.bump("task_types", company_id)
+        data_versions.bump("task_type", task_type["id"])
+        data_versions.bump("drivers", company_id)
+        data_versions.bump("companies", "list")
+
+        assert len(get_task_types_for_company(company_id)) == 3
+        assert get_task_types_for_companies([company_id])[company_id] == get_task_types_for_company(company_id)
+        assert get_task_type_company_id(task_type["id"]) is None
+        assert len(get_drivers_for_company(company_id)) == 4
+        assert {c["id"] for c in get_companies_list()} == {company_id, other["id"]}
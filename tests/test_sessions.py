@@ -0,0 +1,159 @@
+import pytest
+from flask import Flask, session
+
+from app import sessions
+from app.sessions import MemorySessionStore, ServerSessionInterface, SQLiteSessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    clock = FakeClock()
+    if request.param == "memory":
+        store = MemorySessionStore(clock=clock)
+    else:
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"), clock=clock)
+    store.clock = clock
+    return store
+
+
+def test_store_load_save_touch_and_expiry(store):
+    clock = store.clock
+    assert store.load("abc") is None
+    store.save("abc", '{"email": "klant@test.local"}', clock.now + 60)
+    assert store.load("abc") == ('{"email": "klant@test.local"}', clock.now + 60)
+    assert len(store) == 1
+
+    store.touch("abc", clock.now + 120)
+    clock.now += 90
+    assert store.load("abc") is not None
+    clock.now += 30
+    assert store.load("abc") is None
+    assert len(store) == 0
+
+    store.save("def", "{}", clock.now + 60)
+    store.delete("def")
+    assert store.load("def") is None
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemorySessionStore(max_entries=2)
+    expires_at = sessions.time.time() + 60
+    store.save("a", "{}", expires_at)
+    store.save("b", "{}", expires_at)
+    assert store.load("a") is not None
+    store.save("c", "{}", expires_at)
+
+    assert store.load("b") is None
+    assert store.load("a") is not None
+    assert store.load("c") is not None
+    assert len(store) == 2
+
+
+def test_sqlite_store_purges_expired_sessions(tmp_path):
+    clock = FakeClock()
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), clock=clock, purge_every=2)
+    store.save("old", "{}", clock.now + 10)
+    clock.now += 20
+    store.save("new", "{}", clock.now + 10)
+    with store._connection() as connection:
+        assert [row[0] for row in connection.execute("SELECT sid FROM sessions")] == ["new"]
+
+
+# Na een fork (ander pid) opent de store een eigen pool i.p.v. de connecties van de ouder te gebruiken
+def test_sqlite_store_opens_a_new_pool_after_fork(tmp_path, monkeypatch):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), pool_size=2)
+    store.save("abc", "{}", sessions.time.time() + 60)
+    parent_pool = store._pool
+
+    monkeypatch.setattr(sessions.os, "getpid", lambda: -1)
+    assert store.load("abc") is not None
+    assert store._pool is not parent_pool
+    assert store._pool_pid == -1
+    assert set(store._pool.queue).isdisjoint(parent_pool.queue)
+
+
+@pytest.fixture
+def session_app(store):
+    app = Flask("agriflow_sessions_test")
+    app.secret_key = "test"
+    app.config["PERMANENT_SESSION_LIFETIME"] = 3600
+    app.session_interface = ServerSessionInterface(store, refresh_interval=60, clock=store.clock)
+
+    @app.route("/set/<value>")
+    def set_value(value):
+        session["value"] = value
+        return "ok"
+
+    @app.route("/get")
+    def get_value():
+        return session.get("value", "")
+
+    @app.route("/logout")
+    def logout():
+        session.clear()
+        return "ok"
+
+    return app
+
+
+def _cookie(client):
+    return client.get_cookie("session").value
+
+
+def test_cookie_holds_only_a_signed_id_of_constant_size(session_app):
+    client = session_app.test_client()
+    client.get("/set/kort")
+    small = _cookie(client)
+    client.get("/set/" + "x" * 3000)
+    large = _cookie(client)
+
+    assert len(small) == len(large)
+    assert "x" * 10 not in large
+    assert client.get("/get").get_data(as_text=True) == "x" * 3000
+
+    # Een vervalst id wordt genegeerd
+    client.set_cookie("session", large[:-2] + "xx")
+    assert client.get("/get").get_data(as_text=True) == ""
+
+
+def test_sliding_expiry_refreshes_at_most_once_per_interval(session_app, store):
+    clock = store.clock
+    client = session_app.test_client()
+    client.get("/set/a")
+    sid = session_app.session_interface._signer(session_app).unsign(_cookie(client)).decode("ascii")
+    _, expires_at = store.load(sid)
+    assert expires_at == clock.now + 3600
+
+    clock.now += 30
+    response = client.get("/get")
+    assert "Set-Cookie" not in response.headers
+    assert store.load(sid)[1] == expires_at
+
+    clock.now += 40
+    response = client.get("/get")
+    assert "Set-Cookie" in response.headers
+    assert store.load(sid)[1] == clock.now + 3600
+
+    # Zonder bezoek verloopt de sessie na de volledige levensduur
+    clock.now += 3601
+    assert client.get("/get").get_data(as_text=True) == ""
+
+
+def test_clear_rotates_the_session_id(session_app, store):
+    client = session_app.test_client()
+    client.get("/set/a")
+    old_cookie = _cookie(client)
+    client.get("/logout")
+    client.get("/set/b")
+    assert _cookie(client) != old_cookie
+
+    client.set_cookie("session", old_cookie)
+    assert client.get("/get").get_data(as_text=True) == ""
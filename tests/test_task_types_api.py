@@ -0,0 +1,64 @@
+from app.routes.routes import invalidate_task_types
+
+from conftest import insert, login
+
+
+def test_etag_match_returns_304_without_loading_task_types(client, farm, query_budget):
+    company_id = farm["company"]["id"]
+    first = client.get(f"/api/company/{company_id}/task-types")
+    assert first.status_code == 200
+    assert len(first.get_json()["task_types"]) == 3
+    assert first.headers["Cache-Control"] == "private, max-age=60"
+    etag = first.headers["ETag"]
+
+    with query_budget(0) as requests:
+        response = client.get(f"/api/company/{company_id}/task-types", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.get_data() == b""
+    assert requests[0].query_count == 0
+
+
+# Toevoegen en verwijderen via de bedrijfsroutes verhogen de taaktypeversie
+def test_etag_changes_after_add_and_delete(client, db, farm):
+    company_id = farm["company"]["id"]
+    url = f"/api/company/{company_id}/task-types"
+    etag = client.get(url).headers["ETag"]
+
+    login(client, "bedrijf@test.local")
+    client.post("/company/add-task-type", data={"task_type_name": "maaien", "time_per_1000kg": "0.75"})
+    added = client.get(url, headers={"If-None-Match": etag})
+    assert added.status_code == 200
+    assert "maaien" in [tt["name"] for tt in added.get_json()["task_types"]]
+    assert added.headers["ETag"] != etag
+
+    task_type_id = next(tt["id"] for tt in added.get_json()["task_types"] if tt["name"] == "maaien")
+    client.post(f"/company/delete-task-type/{task_type_id}")
+    deleted = client.get(url, headers={"If-None-Match": added.headers["ETag"]})
+    assert deleted.status_code == 200
+    assert "maaien" not in [tt["name"] for tt in deleted.get_json()["task_types"]]
+    assert deleted.headers["ETag"] not in (etag, added.headers["ETag"])
+
+
+def test_bulk_variant(app, client, db, farm):
+    company_id = farm["company"]["id"]
+    other = insert(db, "Companies", {"name": "Ander Loonwerk", "emailaddress": "ander@test.local"})
+    url = f"/api/task-types?company_ids={other['id']},{company_id}"
+
+    first = client.get(url)
+    assert first.status_code == 200
+    companies = first.get_json()["companies"]
+    assert len(companies[str(company_id)]["task_types"]) == 3
+    assert companies[str(other["id"])] == {"task_types": [], "has_task_types": False}
+    etag = first.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    # Een wijziging bij één van de bedrijven verandert de ETag van het geheel
+    insert(db, "TaskTypes", {"task_type": "maaien", "company_id": other["id"], "time_per_1000kg": 0.75})
+    with app.app_context():
+        invalidate_task_types(other["id"])
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.get_json()["companies"][str(other["id"])]["has_task_types"] is True
+
+    assert client.get("/api/task-types?company_ids=1,x").status_code == 400